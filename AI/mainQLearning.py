@@ -11,7 +11,9 @@ import matplotlib.pyplot as plt
 # user-library
 import qlearn
 from utils import load_data
+from utils import util
 from utils import log
+from utils import feature_schema
 
 routes = ["BCN_BUD",  # route 1
       "BUD_BCN",  # route 2
@@ -22,60 +24,21 @@ routes = ["BCN_BUD",  # route 1
       "SKP_MLH",  # route 7
       "SKP_MMX"]  # route 8
 
-# random price list
-randomPrices_train = [68.4391315136,
-                     67.4260645161,
-                     93.2808545727,
-                     77.4751720047,
-                     75.0340018399,
-                     73.9964736451,
-                     105.280932384,
-                     97.1720369004]
-randomPrices_test = [55.4820634921,
-                          57.8067301587,
-                          23.152037037,
-                          33.3727319588,
-                          35.3032044199,
-                          41.1180555556,
-                          56.3433402062,
-                          60.2546519337]
-# minimum price list
-minPrices_train = [44.4344444444,
-                       38.9605925926,
-                       68.6566666667,
-                       49.6566666667,
-                       48.2691891892,
-                       47.0833333333,
-                       68.982,
-                       63.1279459459]
-minPrices_test = [32.370952381,
-                       29.3775238095,
-                       11.3788888889,
-                       16.5284615385,
-                       18.6184615385,
-                       14.6111111111,
-                       21.5127692308,
-                       25.8050769231]
-
-# maximum price list
-maxPrices_train = [115.915925926,
-                        126.782814815,
-                        144.212222222,
-                        129.656666667,
-                        141.252972973,
-                        149.972222222,
-                        174.402,
-                        160.91172973
-                        ]
-
-maxPrices_test = [126.656666667,
-                       168.95847619,
-                       93.6011111111,
-                       90.5669230769,
-                       101.233846154,
-                       198.361111111,
-                       154.505076923,
-                       208.020461538]
+# named columns of the qlearning input: flight number dummy variables, departure date, state, current price
+qlearningSchema = feature_schema.get_qlearning_schema(routes)
+idx_departureDate = qlearningSchema.index("departureDate")
+idx_state = qlearningSchema.index("state")
+idx_price = qlearningSchema.index("price")
+
+def getBaselinePrices(isTrain):
+    """
+    Get the minimum, maximum and random prices of every route of the qlearning datas,
+    they are only computed again when the datas change, see util.loadBaselinePrices
+    :return: dict of lists "minPrices", "maxPrices", "randomPrices", one price per route
+    """
+    split = "train" if isTrain else "test"
+    return util.loadBaselinePrices('../AI/inputQLearning/qdata_{}.npy'.format(split), qlearningSchema,
+                                   randomLen=util.baselineRandomLens[split])
 
 class QLearningAgent():
     def __init__(self, datas):
@@ -85,14 +48,14 @@ class QLearningAgent():
         self.datas = datas # datas have same departure date
         self.actions = 2  # action=0 for buy; action=1 for wait.
 
-        states = np.unique(self.datas[:,9])
+        states = np.unique(self.datas[:, idx_state])
         self.maxStates = max(states) # states range from 0 to maxStates(totally maxStates+1)
         self.qlearning = qlearn.QLearn(self.actions, self.maxStates)
 
         # initialize the action = buy
         for i in range(self.datas.shape[0]):
-            state = self.datas[i, 9]
-            reward = -1 * self.datas[i, 10]
+            state = self.datas[i, idx_state]
+            reward = -1 * self.datas[i, idx_price]
             self.qlearning.updateQForState(state, 0, reward)
 
         # initialize the action = wait
@@ -133,8 +96,8 @@ class QLearningAgent():
         """
         price = float("inf")
         for i in range(self.datas.shape[0]):
-            if self.datas[i, 9] == state:
-                price = self.datas[i, 10]
+            if self.datas[i, idx_state] == state:
+                price = self.datas[i, idx_price]
         return price
 
     """
@@ -155,11 +118,11 @@ class QLearningAgent():
         price = float('+inf')
         minPrice = float('+inf')
         for i in range(self.datas.shape[0]):
-            if state == self.datas[i, 9]:
-                price = self.datas[i, 10] # get the current state price
-                minPrice = self.datas[i, 10] # initialize the minimum price
-            if state >= self.datas[i, 9] and self.datas[i, 10]<=minPrice:
-                minPrice = self.datas[i, 10]
+            if state == self.datas[i, idx_state]:
+                price = self.datas[i, idx_price] # get the current state price
+                minPrice = self.datas[i, idx_price] # initialize the minimum price
+            if state >= self.datas[i, idx_state] and self.datas[i, idx_price]<=minPrice:
+                minPrice = self.datas[i, idx_price]
         if state == 0:
             return price
 
@@ -199,21 +162,15 @@ def getDataFromRegression():
     # feature 8: departure date; feature 9: observed date state;
     # feature 10: minimum price; feature 11: maximum price
     # feature 12: current price
-    X_train = np.load('inputReg/X_train.npy')
-    price_train = X_train[:,12]
-    price_train = price_train.reshape((price_train.shape[0], 1))
+    regressionSchema = feature_schema.get_regression_schema(routes)
 
-    X_test = np.load('inputReg/X_test.npy')
-    price_test = X_test[:,12]
-    price_test = price_test.reshape((price_test.shape[0], 1))
-
-    # get the input data for qlearning
+    # get the input data for qlearning, only its columns are read from the regression data
     # feature 0~7: flight number dummy variables
     # feature 8: departure date; feature 9: observed date state;
     # feature 10: current price
-    qdata_train = np.concatenate((X_train[:,0:10], price_train), axis=1)
+    qdata_train = regressionSchema.load('inputReg/X_train.npy', qlearningSchema.features)
     np.save('inputQLearning/qdata_train', qdata_train)
-    qdata_test = np.concatenate((X_test[:,0:10], price_test), axis=1)
+    qdata_test = regressionSchema.load('inputReg/X_test.npy', qlearningSchema.features)
     np.save('inputQLearning/qdata_test', qdata_test)
 
 
@@ -278,23 +235,22 @@ def mainTrainOneRoute(filePrefix):
     # feature 0~7: flight number dummy variables
     # feature 8: departure date; feature 9: observed date state;
     # feature 10: current price
-    qdatas = np.load('inputQLearning/qdata_train.npy')
-    qdatas = qdatas[np.where(qdatas[:,8]>=20)[0], :]
-
-    # choose one route datas
-    flightNum = routes.index(filePrefix)
-    qdatas = qdatas[np.where(qdatas[:, flightNum]==1)[0], :]
+    qdatas = np.load('inputQLearning/qdata_train.npy', mmap_mode='r')
+    qdatas = qdatas[np.where(qdatas[:, idx_departureDate]>=20)[0], :]
 
-    # get all the departure dates
-    departureDates = np.unique(qdatas[:,8])
+    # choose one route datas, grouped by departure date in the table order
+    flightNum = qlearningSchema.routeIndex(filePrefix)
+    segmentIndex = load_data.get_input_segment_index(qdatas, qlearningSchema, isState=False)
+    rows, departureDates, departureOffsets = load_data.get_route_segments(segmentIndex, flightNum)
+    qdatas = qdatas[rows, :]
 
     # keep track of the maxStates for the route, finally states range from (0, routeMaxStates+1)
-    routeMaxStates = np.amax(qdatas[:,9])
+    routeMaxStates = np.amax(qdatas[:, idx_state])
 
     # keep the final Q Values for each departure date
     qvalues = []
-    for departureDate in departureDates:
-        datas = qdatas[np.where(qdatas[:,8]==departureDate)[0], :]
+    for departureIndex in range(len(departureDates)):
+        datas = qdatas[departureOffsets[departureIndex]:departureOffsets[departureIndex+1], :]
         agent = QLearningAgent(datas)
         maxStates = agent.qlearning.maxStates
         qvalues.append(agent.qlearning)
@@ -365,12 +321,12 @@ def evaluateOneRoute(chosenState, filePrefix="BCN_BUD", isTrain=False):
     # feature 8: departure date; feature 9: observed date state;
     # feature 10: current price
     if isTrain:
-        qdatas = np.load('inputQLearning/qdata_train.npy')
-        qdatas = qdatas[np.where(qdatas[:,8]>=20)[0], :]
+        qdatas = np.load('inputQLearning/qdata_train.npy', mmap_mode='r')
+        qdatas = qdatas[np.where(qdatas[:, idx_departureDate]>=20)[0], :]
     else:
 
-        qdatas = np.load('inputQLearning/qdata_test.npy')
-        qdatas = qdatas[np.where(qdatas[:,8]>=20)[0], :]
+        qdatas = np.load('inputQLearning/qdata_test.npy', mmap_mode='r')
+        qdatas = qdatas[np.where(qdatas[:, idx_departureDate]>=20)[0], :]
         """
         qdatas1 = np.load('inputQLearning/qdata_train.npy')
         qdatas1 = qdatas1[np.where(qdatas1[:,8]>=20)[0], :]
@@ -380,54 +336,42 @@ def evaluateOneRoute(chosenState, filePrefix="BCN_BUD", isTrain=False):
         """
 
 
-    # choose one route datas
-    flightNum = routes.index(filePrefix)
-    qdatas = qdatas[np.where(qdatas[:, flightNum]==1)[0], :]
-
-    # get the departure dates
-    departureDates = np.unique(qdatas[:, 8])
+    # choose one route datas, grouped by departure date in the table order
+    flightNum = qlearningSchema.routeIndex(filePrefix)
+    segmentIndex = load_data.get_input_segment_index(qdatas, qlearningSchema, isState=False)
+    rows, departureDates, departureOffsets = load_data.get_route_segments(segmentIndex, flightNum)
+    qdatas = qdatas[rows, :]
 
     # get the chosen state prices
     prices = np.empty(shape=(0, qdatas.shape[1]))
     lastBuyState = 0 # if no chosen state data, then use the last buy state
-    for departureDate in departureDates:
-        datas = qdatas[np.where(qdatas[:,8]==departureDate)[0], :]
-        data = datas[np.where(datas[:, 9]==chosenState)[0], :]
+    for departureIndex in range(len(departureDates)):
+        datas = qdatas[departureOffsets[departureIndex]:departureOffsets[departureIndex+1], :]
+        data = datas[np.where(datas[:, idx_state]==chosenState)[0], :]
         if data.shape[0] == 0:
-            data = datas[np.where(datas[:, 9]==lastBuyState)[0], :]
+            data = datas[np.where(datas[:, idx_state]==lastBuyState)[0], :]
         prices = np.concatenate((prices, data), axis=0)
-    prices = prices[:, 10]
+    prices = prices[:, idx_price]
 
 
     print "Counts: {}; Chosen Prices:{}".format(len(prices), prices)
     avgPrice = np.mean(prices)
 
-    if isTrain:
-        print "TRAIN:"
-        print "minimumPrice: {}".format(minPrices_train[flightNum])
-        print "maximumPrice: {}".format(maxPrices_train[flightNum])
-        print "randomPrice: {}".format(randomPrices_train[flightNum])
-        print "avgPredPrice: {}".format(avgPrice)
-
-        performance = (randomPrices_train[flightNum] - avgPrice) / randomPrices_train[flightNum] * 100
-        print "Performance: {}%".format(round(performance,2))
-        maxPerformance = (randomPrices_train[flightNum] - minPrices_train[flightNum]) / randomPrices_train[flightNum] * 100
-        print "Max Perfor: {}%".format(round(maxPerformance,2))
-        normalizedPefor = performance / maxPerformance * 100
-        print "Normalized perfor: {}%".format(round(normalizedPefor,2))
-    else:
-        print "TEST:"
-        print "minimumPrice: {}".format(minPrices_test[flightNum])
-        print "maximumPrice: {}".format(maxPrices_test[flightNum])
-        print "randomPrice: {}".format(randomPrices_test[flightNum])
-        print "avgPredPrice: {}".format(avgPrice)
-
-        performance = (randomPrices_test[flightNum] - avgPrice) / randomPrices_test[flightNum] * 100
-        print "Performance: {}%".format(round(performance,2))
-        maxPerformance = (randomPrices_test[flightNum] - minPrices_test[flightNum]) / randomPrices_test[flightNum] * 100
-        print "Max Perfor: {}%".format(round(maxPerformance,2))
-        normalizedPefor = performance / maxPerformance * 100
-        print "Normalized perfor: {}%".format(round(normalizedPefor,2))
+    baselinePrices = getBaselinePrices(isTrain)
+    minimumPrice = baselinePrices["minPrices"][flightNum]
+    randomPrice = baselinePrices["randomPrices"][flightNum]
+    print "TRAIN:" if isTrain else "TEST:"
+    print "minimumPrice: {}".format(minimumPrice)
+    print "maximumPrice: {}".format(baselinePrices["maxPrices"][flightNum])
+    print "randomPrice: {}".format(randomPrice)
+    print "avgPredPrice: {}".format(avgPrice)
+
+    performance = (randomPrice - avgPrice) / randomPrice * 100
+    print "Performance: {}%".format(round(performance,2))
+    maxPerformance = (randomPrice - minimumPrice) / randomPrice * 100
+    print "Max Perfor: {}%".format(round(maxPerformance,2))
+    normalizedPefor = performance / maxPerformance * 100
+    print "Normalized perfor: {}%".format(round(normalizedPefor,2))
 
     print "##########  End Evaluating  ##########"
 
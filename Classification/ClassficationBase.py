@@ -5,6 +5,7 @@ import json
 # user-library
 from utils import load_data
 from utils import util
+from utils import feature_schema
 
 # third-party library
 from sklearn.utils import shuffle
@@ -17,6 +18,23 @@ from sklearn.mixture import GMM
 
 class ClassificationBase(object):
 
+    # the inputs are memory-mapped when they are first used, see loadInput
+    X_train = load_data.lazy_input("X_train")
+    y_train = load_data.lazy_input("y_train")
+    y_train_price = load_data.lazy_input("y_train_price")
+    X_test = load_data.lazy_input("X_test")
+    y_test = load_data.lazy_input("y_test")
+    y_test_price = load_data.lazy_input("y_test_price")
+    y_pred = load_data.lazy_input("y_pred")
+
+    # the baseline prices of every route, see getBaselinePrices
+    randomPrices_train = util.baselineProperty("randomPrices", "train")
+    randomPrices_test = util.baselineProperty("randomPrices", "test")
+    minPrices_train = util.baselineProperty("minPrices", "train")
+    minPrices_test = util.baselineProperty("minPrices", "test")
+    maxPrices_train = util.baselineProperty("maxPrices", "train")
+    maxPrices_test = util.baselineProperty("maxPrices", "test")
+
     def __init__(self, isTrain, isOutlierRemoval=0, isNN=0):
         # indicate it is train data or not
         self.isTrain = isTrain
@@ -31,120 +49,16 @@ class ClassificationBase(object):
                       "OTP_CRL",  # route 6
                       "SKP_MLH",  # route 7
                       "SKP_MMX"]  # route 8
+        # named columns of the inputs
+        self.schema = feature_schema.get_classification_schema(self.routes)
+        self.evalSchema = feature_schema.get_evaluation_schema(self.schema)
 
-        """
-        For the large data set, these datas are from the function in util
-        """
-        # self.randomPrices_train = [62.404880201765373,
-        #                           64.389689785624228,
-        #                           58.365558867362232,
-        #                           53.396562847608401,
-        #                           57.555263421976903,
-        #                           56.881071560993696,
-        #                           80.610587319243578,
-        #                           81.273256281407001]
-        #
-        # self.randomPrices_test = [76.867777777777732,
-        #                           79.859555555555559,
-        #                           48.753285024154536,
-        #                           74.848996051889415,
-        #                           60.510405405405386,
-        #                           46.05193236714976,
-        #                           78.827685279187833,
-        #                           61.32490540540541]
-        #
-        # self.minPrices_train = [38.291886792452836,
-        #                         34.322716981132082,
-        #                         40.323333333333174,
-        #                         32.409354838709689,
-        #                         34.680000000000007,
-        #                         30.694444444444443,
-        #                         45.243290322580577,
-        #                         46.73057142857138]
-        #
-        # self.minPrices_test = [38.073333333333309,
-        #                        38.261333333333333,
-        #                        24.047971014492759,
-        #                        44.908032786885208,
-        #                        33.905806451612911,
-        #                        20.945652173913043,
-        #                        50.942655737704911,
-        #                        35.778774193548394]
-        #
-        # self.maxPrices_train = [126.02773584905646,
-        #                         150.12649056603769,
-        #                         119.43444444444427,
-        #                         109.10290322580629,
-        #                         125.22857142857143,
-        #                         171.72222222222223,
-        #                         165.93038709677407,
-        #                         178.90200000000002]
-        #
-        # self.maxPrices_test = [149.48999999999984,
-        #                        155.91466666666665,
-        #                        146.22188405797084,
-        #                        144.08836065573755,
-        #                        134.68645161290314,
-        #                        156.27173913043478,
-        #                        151.77216393442615,
-        #                        154.14329032258058]
-        """
-        For the smalle data set - these datas are from the function in util
-        """
-        # random price list
-        self.randomPrices_train = [68.4391315136,
-                             67.4260645161,
-                             93.2808545727,
-                             77.4751720047,
-                             75.0340018399,
-                             73.9964736451,
-                             105.280932384,
-                             97.1720369004]
-        self.randomPrices_test = [55.4820634921,
-                                  57.8067301587,
-                                  23.152037037,
-                                  33.3727319588,
-                                  35.3032044199,
-                                  41.1180555556,
-                                  56.3433402062,
-                                  60.2546519337]
-        # minimum price list
-        self.minPrices_train = [44.4344444444,
-                               38.9605925926,
-                               68.6566666667,
-                               49.6566666667,
-                               48.2691891892,
-                               47.0833333333,
-                               68.982,
-                               63.1279459459]
-        self.minPrices_test = [32.370952381,
-                               29.3775238095,
-                               11.3788888889,
-                               16.5284615385,
-                               18.6184615385,
-                               14.6111111111,
-                               21.5127692308,
-                               25.8050769231]
-
-        # maximum price list
-        self.maxPrices_train = [115.915925926,
-                                126.782814815,
-                                144.212222222,
-                                129.656666667,
-                                141.252972973,
-                                149.972222222,
-                                174.402,
-                                160.91172973
-                                ]
-
-        self.maxPrices_test = [126.656666667,
-                               168.95847619,
-                               93.6011111111,
-                               90.5669230769,
-                               101.233846154,
-                               198.361111111,
-                               154.505076923,
-                               208.020461538]
+        # the minimum, maximum and random prices of every route are computed from the evaluated datasets
+        # when they are first used, see getBaselinePrices
+        # (paths relative to the utils directory, see load_data.get_input_path)
+        self.baselineFiles = {"train": ('../Classification/inputClf_small/X_train.npy', '../Classification/inputClf_small/y_train_price.npy'),
+                              "test": ('../Classification/inputClf_small/X_test.npy', '../Classification/inputClf_small/y_test_price.npy')}
+        self.baselinePrices = {}
 
         # for currency change
         self.currency = [1,      # route 1 - Euro
@@ -161,31 +75,23 @@ class ClassificationBase(object):
         # feature 8: departure date; feature 9: observed date state;
         # feature 10: minimum price; feature 11: maximum price
         # output: prediction(buy or wait); output_price: price
-        # load training datasets
-        if isOutlierRemoval:
-            self.X_train = np.load('inputClf_GMMOutlierRemoval/X_train.npy')
-            self.y_train = np.load('inputClf_GMMOutlierRemoval/y_train.npy')
-            self.y_train_price = np.load('inputClf_GMMOutlierRemoval/y_train_price.npy')
-        else:
-            self.X_train = np.load('inputClf_small/X_train.npy')
-            self.y_train = np.load('inputClf_small/y_train.npy')
-            self.y_train_price = np.load('inputClf_small/y_train_price.npy')
+        # training datasets
+        trainPath = 'inputClf_GMMOutlierRemoval' if isOutlierRemoval else 'inputClf_small'
+        self.inputFiles = {"X_train": trainPath + '/X_train.npy',
+                           "y_train": trainPath + '/y_train.npy',
+                           "y_train_price": trainPath + '/y_train_price.npy'}
 
         # deal with unbalanced data
         #self.X_train, self.y_train = self.dealingUnbalancedData(self.X_train, self.y_train)
 
-        # load test datasets
+        # test datasets
+        self.testRows = None # boolean mask of the test rows kept, see getTestRows
+        self.segmentIndex = None # segment index of the test datasets, see getRouteSegments
         if isTrain:
-            self.X_test = np.load('inputClf_small/X_train.npy')
-            self.y_test = np.load('inputClf_small/y_train.npy')
-            self.y_test_price = np.load('inputClf_small/y_train_price.npy')
-            self.y_pred = np.empty(shape=(self.y_test.shape[0],1))
-
-            # choose the dates whose departureDate-queryDate gaps is larger than 20
-            self.y_test = self.y_test[np.where(self.X_test[:, 8]>20)[0], :]
-            self.y_test_price = self.y_test_price[np.where(self.X_test[:, 8]>20)[0], :]
-            self.y_pred = self.y_pred[np.where(self.X_test[:, 8]>20)[0], :]
-            self.X_test = self.X_test[np.where(self.X_test[:, 8]>20)[0], :]
+            # the train datasets are evaluated, the dates are chosen in getTestRows
+            self.inputFiles["X_test"] = 'inputClf_small/X_train.npy'
+            self.inputFiles["y_test"] = 'inputClf_small/y_train.npy'
+            self.inputFiles["y_test_price"] = 'inputClf_small/y_train_price.npy'
 
             """
             # split train and validation set
@@ -203,11 +109,62 @@ class ClassificationBase(object):
             self.y_pred = testMatrix[:, 13]
             """
         else:
-            self.X_test = np.load('inputClf_small/X_test.npy')
-            self.y_test = np.load('inputClf_small/y_test.npy')
-            self.y_test_price = np.load('inputClf_small/y_test_price.npy')
+            self.inputFiles["X_test"] = 'inputClf_small/X_test.npy'
+            self.inputFiles["y_test"] = 'inputClf_small/y_test.npy'
+            self.inputFiles["y_test_price"] = 'inputClf_small/y_test_price.npy'
 
-            self.y_pred = np.empty(shape=(self.y_test.shape[0],1))
+    def loadInput(self, name):
+        """
+        Load one input when it is first used, the .npy files are memory-mapped
+        :param name: input name, e.g. "X_train"
+        :return: the input
+        """
+        if name == "y_pred":
+            return np.empty(shape=(self.y_test.shape[0],1))
+        if self.isTrain and name in ["X_test", "y_test", "y_test_price"]:
+            return load_data.load_input(self.inputFiles[name], self.getTestRows())
+        return load_data.load_input(self.inputFiles[name])
+
+    def getBaselinePrices(self, split):
+        """
+        Get the baseline prices of every route of the train or test datasets, they are only computed
+        again when the datasets change, see util.loadBaselinePrices
+        :param split: "train" or "test"
+        :return: dict of lists "minPrices", "maxPrices", "randomPrices", one price per route
+        """
+        if split not in self.baselinePrices:
+            filePath, priceFilePath = self.baselineFiles[split]
+            self.baselinePrices[split] = util.loadBaselinePrices(filePath, self.schema, priceFilePath,
+                                                                 util.baselineRandomLens[split])
+        return self.baselinePrices[split]
+
+    def getTestRows(self):
+        """
+        In the train mode, choose the dates whose departureDate-queryDate gaps is larger than 20
+        :return: boolean mask of the test rows kept
+        """
+        if self.testRows is None:
+            X_test = load_data.load_input(self.inputFiles["X_test"])
+            self.testRows = X_test[:, self.schema.index("departureDate")] > 20
+        return self.testRows
+
+    def getRouteSegments(self, flightNum):
+        """
+        Get the departure dates of one route in the test datasets, the test datasets are sorted
+        by (route, departure date, state) once, see load_data.get_segment_index
+        :param flightNum: route index
+        :return: (rows, departureDates, departureOffsets), see load_data.get_route_segments
+        """
+        return load_data.get_route_segments(self.getSegmentIndex(), flightNum)
+
+    def getSegmentIndex(self):
+        """
+        Get the segment index of the test datasets, it is built once per X_test
+        :return: (rows, departureOffsets, departureDates, routeDepartureOffsets), see load_data.get_segment_index
+        """
+        if self.segmentIndex is None or self.segmentIndex[0] is not self.X_test:
+            self.segmentIndex = (self.X_test, load_data.get_input_segment_index(self.X_test, self.schema))
+        return self.segmentIndex[1]
 
 
     def priceNormalize(self):
@@ -223,29 +180,19 @@ class ClassificationBase(object):
         evalMatrix_train = np.concatenate((self.X_train, self.y_train, self.y_train_price), axis=1)
         evalMatrix_test = np.concatenate((self.X_test, self.y_test, self.y_test_price), axis=1)
 
-        matrixTrain = np.empty(shape=(0, evalMatrix_train.shape[1]))
-        matrixTest = np.empty(shape=(0, evalMatrix_train.shape[1]))
-        for i in range(len(self.routes)):
-            evalMatrix = evalMatrix_train[np.where(evalMatrix_train[:, i]==1)[0], :]
-            evalMatrix[:, 10] *= self.currency[i]
-            evalMatrix[:, 11] *= self.currency[i]
-            evalMatrix[:, 13] *= self.currency[i]
-            matrixTrain = np.concatenate((matrixTrain, evalMatrix), axis=0)
+        priceColumns = self.evalSchema.indexs(["minimumPrice", "maximumPrice", "outputPrice"])
+        # the rows keep their order
+        matrixTrain = load_data.normalize_currency(evalMatrix_train, self.evalSchema, priceColumns, self.currency)
+        matrixTest = load_data.normalize_currency(evalMatrix_test, self.evalSchema, priceColumns, self.currency)
 
-            evalMatrix = evalMatrix_test[np.where(evalMatrix_test[:, i]==1)[0], :]
-            evalMatrix[:, 10] *= self.currency[i]
-            evalMatrix[:, 11] *= self.currency[i]
-            evalMatrix[:, 13] *= self.currency[i]
-            matrixTest = np.concatenate((matrixTest, evalMatrix), axis=0)
+        self.X_train = matrixTrain[:, 0:len(self.schema)]
+        self.y_train = matrixTrain[:, self.evalSchema.index("output")]
+        self.y_train_price = matrixTrain[:, self.evalSchema.index("outputPrice")]
 
-        self.X_train = matrixTrain[:, 0:12]
-        self.y_train = matrixTrain[:, 12]
-        self.y_train_price = matrixTrain[:, 13]
 
-
-        self.X_test = matrixTest[:, 0:12]
-        self.y_test = matrixTest[:, 12]
-        self.y_test_price = matrixTest[:, 13]
+        self.X_test = matrixTest[:, 0:len(self.schema)]
+        self.y_test = matrixTest[:, self.evalSchema.index("output")]
+        self.y_test_price = matrixTest[:, self.evalSchema.index("outputPrice")]
 
 
         self.y_train = self.y_train.reshape((self.y_train.shape[0], 1))
@@ -265,11 +212,12 @@ class ClassificationBase(object):
         np.save('inputClf/y_test_price', self.y_test_price)
 
     def Standardization(self):
-        scaled = preprocessing.scale(self.X_train[:, 10:12])
-        self.X_train[:, 10:12] = scaled
+        priceColumns = self.schema.indexs(["minimumPrice", "maximumPrice"])
+        scaled = preprocessing.scale(self.X_train[:, priceColumns])
+        self.X_train[:, priceColumns] = scaled
 
-        scaled = preprocessing.scale(self.X_test[:, 10:12])
-        self.X_test[:, 10:12] = scaled
+        scaled = preprocessing.scale(self.X_test[:, priceColumns])
+        self.X_test[:, priceColumns] = scaled
 
     def load(self, dataset="large data set"):
         """
@@ -279,7 +227,7 @@ class ClassificationBase(object):
         """
         isOneOptimalState = False
         # Construct the input data
-        d = 12
+        d = len(self.schema)
         X_train = np.empty(shape=(0, d))
         y_train = np.empty(shape=(0,1))
         y_train_price = np.empty(shape=(0,1))
@@ -440,28 +388,26 @@ class ClassificationBase(object):
         # route index
         flightNum = self.routes.index(filePrefix)
 
+        # choose one route datas, grouped by departure date in the table order
+        segmentIndex = load_data.get_input_segment_index(self.X_test, self.schema, isState=False)
+        rows, departureDates_test, departureOffsets = load_data.get_route_segments(segmentIndex, flightNum)
+
         # concatenate the buy or wait info to get the total datas
         y_pred = self.y_pred.reshape((self.y_pred.shape[0],1))
-        X_test = np.concatenate((self.X_test, self.y_test, y_pred, self.y_test_price), axis=1)
-
-        # choose one route datas
-        X_test = X_test[np.where(X_test[:, flightNum]==1)[0], :]
+        X_test = np.concatenate((self.X_test[rows], self.y_test[rows], y_pred[rows], self.y_test_price[rows]), axis=1)
 
         # remove dummy variables
         # feature 0: departure date;  feature 1: observed date state
         # feature 2: minimum price; feature 3: maximum price
         # feature 4: output(buy or wait); feature 5: prediction
         # feature 7: current price
-        X_test = X_test[:, 8:15]
-
-        # group by the feature: departure date
-        departureDates_test = np.unique(X_test[:, 0])
+        X_test = X_test[:, self.schema.index("departureDate"):]
 
         # get the final datas, the observed data state should be from large to small(i.e. for time series)
         length_test = []
-        for departureDate in departureDates_test:
-            indexs = np.where(X_test[:, 0]==departureDate)[0]
-            datas = X_test[indexs, :]
+        for departureIndex in range(len(departureDates_test)):
+            departureDate = departureDates_test[departureIndex]
+            datas = X_test[departureOffsets[departureIndex]:departureOffsets[departureIndex+1], :]
             length_test.append(len(datas))
             print departureDate
             print datas
@@ -479,41 +425,35 @@ class ClassificationBase(object):
         y_train = self.y_train.reshape((self.y_train.shape[0],1))
         y_train_price = self.y_train_price.reshape((self.y_train_price.shape[0],1))
 
-        X_train = np.concatenate((self.X_train, y_train, y_train_price), axis=1)
+        # choose one route datas, grouped by departure date in the table order
+        segmentIndex = load_data.get_input_segment_index(self.X_train, self.schema, isState=False)
+        rows, departureDates_train, departureOffsets = load_data.get_route_segments(segmentIndex, flightNum)
 
-        # choose one route datas
-        X_train = X_train[np.where(X_train[:, flightNum]==1)[0], :]
+        X_train = np.concatenate((self.X_train[rows], y_train[rows], y_train_price[rows]), axis=1)
 
         # remove dummy variables
         # feature 0: departure date;  feature 1: observed date state
         # feature 2: minimum price; feature 3: maximum price
         # feature 4: prediction(buy or wait).
-        X_train = X_train[:, 8:14]
-
-        # group by the feature: departure date
-        departureDates_train = np.unique(X_train[:, 0])
+        X_train = X_train[:, self.schema.index("departureDate"):]
 
         # get the final datas, the observed data state should be from large to small(i.e. for time series)
         length_test = []
-        for departureDate in departureDates_train:
-            indexs = np.where(X_train[:, 0]==departureDate)[0]
-            datas = X_train[indexs, :]
+        for departureIndex in range(len(departureDates_train)):
+            departureDate = departureDates_train[departureIndex]
+            datas = X_train[departureOffsets[departureIndex]:departureOffsets[departureIndex+1], :]
             length_test.append(len(datas))
             print departureDate
             print datas
 
     def evaluateOneRoute(self, filePrefix="BCN_BUD"):
         """
-        Evaluate one route for one time
+        Evaluate one route for one time, from the current prediction: the model is fit
+        and predicts before, with training and predict, or once per seed with util.evaluateSeeds
         :param filePrefix: route
         :return: average price
         """
 
-        if self.isNN:
-            # if it is nn, then run multiple times
-            self.training()
-            self.predict()
-
         #X_test, y_pred = self.predict()
         X_test = self.X_test
         #y_pred = self.y_pred
@@ -527,60 +467,40 @@ class ClassificationBase(object):
             y_price = np.concatenate((y_price, [price]), axis=0)
         """
 
+        # route index
+        flightNum = self.routes.index(filePrefix)
+        # only the rows of the route are read, grouped by departure date
+        rows, departureDates, departureOffsets = self.getRouteSegments(flightNum)
+
         # feature 0~7: flight number dummy variables
         # feature 8: departure date; feature 9: observed date state;
         # feature 10: minimum price; feature 11: maximum price
         # fearure 12: prediction(buy or wait); feature 13: price
-        evalMatrix = np.concatenate((X_test, y_pred, y_test_price), axis=1)
+        evalMatrix = np.concatenate((X_test[rows], y_pred[rows], y_test_price[rows]), axis=1)
 
-        # route index
-        flightNum = self.routes.index(filePrefix)
-
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, flightNum]==1)[0], :]
-
-        # group by the feature 8: departure date
-        departureDates = np.unique(evalMatrix[:, 8])
+        idx_state = self.evalSchema.index("state")
+        idx_output = self.evalSchema.index("output")
+        idx_price = self.evalSchema.index("outputPrice")
 
         departureLen = len(departureDates)
         latestBuyDate = 11 # define the latest buy date state
-        totalPrice = 0
-        for departureDate in departureDates:
-            state = latestBuyDate # update the state for every departure date evaluation
-            global isFound # indicate whether some entries is predicted to be buy
-            isFound = 0
-            for i in range(evalMatrix.shape[0]):
-                # if no entry is buy, then buy the latest one
-                if evalMatrix[i, 8] == departureDate and evalMatrix[i, 9] == latestBuyDate:
-                    latestPrice = evalMatrix[i, 13]
-                # if many entries is buy, then buy the first one
-                if evalMatrix[i, 8] == departureDate and evalMatrix[i, 9] >= state and evalMatrix[i, 12] == 1:
-                    isFound = 1
-                    state = evalMatrix[i, 9]
-                    price = evalMatrix[i, 13]
-
-            if isFound == 1:
-                totalPrice += price
-            else:
-                totalPrice += latestPrice
-        #print isFound
-        avgPrice = totalPrice * 1.0 / departureLen
+        # the chosen price of every departure date, see util.simulateBuyPolicy
+        chosenPrices = util.simulateBuyPolicy(evalMatrix[:, idx_output], evalMatrix[:, idx_price], evalMatrix[:, idx_state],
+                                              departureOffsets, latestBuyDate)
+        avgPrice = np.sum(chosenPrices) * 1.0 / departureLen
         print "One Time avg price: {}".format(avgPrice)
         return avgPrice
 
 
 
-    def evaluateOneRouteForMultipleTimes(self, filePrefix="BCN_BUD", timesToRun=1):
+    def evaluateOneRouteForMultipleTimes(self, filePrefix="BCN_BUD", timesToRun=1, processes=1):
         """
         Rune the evaluation for the given route and run it multiple times(e.g. 100), to get the avarage performance
         :param filePrefix: route prefix
         :param timesToRun: the times to run the evaluation, and get the average.
+        :param processes: number of worker processes for the runs of the neural network
         :return: average price
         """
-
-        # fit and predict
-        self.training()
-        self.predict()
-
         # route index
         flightNum = self.routes.index(filePrefix)
 
@@ -589,30 +509,25 @@ class ClassificationBase(object):
         timesToRun = 1 # if it is neural network, please change this number to 20 or more
         if self.isNN:
             timesToRun = 20
-        totalPrice = 0
-        for i in range(timesToRun):
-            np.random.seed(i*i*i) # do not forget to set seed for the weight initialization
-            price = self.evaluateOneRoute(filePrefix)
-            totalPrice += price
+            # every run fits the network with its own seed, see util.evaluateSeeds
+            avgPrices = util.evaluateSeeds(self, [i*i*i for i in range(timesToRun)], processes)
+            avgPrice = np.mean(avgPrices[:, flightNum])
+        else:
+            # fit and predict
+            self.training()
+            self.predict()
+            avgPrice = self.evaluateOneRoute(filePrefix)
 
-        avgPrice = totalPrice * 1.0 / timesToRun
+        return self.getPerformance(flightNum, avgPrice)
 
+    def getPerformance(self, flightNum, avgPrice):
         """
-        Just use it one time - in the small dataset, I get these datas from hard code.
-        If you need to use the large dataset, please use this version.
+        Print the performance of the average price of a route, compared with its minimum, maximum and random price
+        :param flightNum: route index
+        :param avgPrice: average predicted price of the route
+        :return: (performance, normalized performance)
         """
-        # self.minPrices_train = util.getMinPriceForSpecific_train()
-        # self.minPrices_test = util.getMinPriceForSpecific_test()
-        #
-        # self.randomPrices_train = util.getRandomPriceForSpecific_train()
-        # self.randomPrices_test = util.getRandomPriceForSpecific_test()
-        #
-        # self.maxPrices_train = util.getMaxPriceForSpecific_train()
-        # self.maxPrices_test = util.getMaxPriceForSpecific_test()
-
-
         if self.isTrain:
-            #print "20 times avg price: {}".format(avgPrice)
             print "TRAIN:"
             print "minimumPrice: {}".format(self.minPrices_train[flightNum])
             print "maximumPrice: {}".format(self.maxPrices_train[flightNum])
@@ -626,7 +541,6 @@ class ClassificationBase(object):
             normalizedPefor = performance / maxPerformance * 100
             print "Normalized perfor: {}%".format(round(normalizedPefor,2))
         else:
-            #print "20 times avg price: {}".format(avgPrice)
             print "TEST:"
             print "minimumPrice: {}".format(self.minPrices_test[flightNum])
             print "maximumPrice: {}".format(self.maxPrices_test[flightNum])
@@ -645,18 +559,121 @@ class ClassificationBase(object):
 
         return (performance, normalizedPefor)
 
-    def evaluateAllRroutes(self):
+    def getRouteAvgPrices(self, thresholds=None):
+        """
+        Evaluate all the routes at once from the same prediction, see evaluateOneRoute
+        :param thresholds: None to evaluate the prediction self.y_pred, or an array of decision thresholds
+            to evaluate at once, an entry is buy if its score self.y_score is at least the threshold
+        :return: average price of every route, a (thresholds x routes) matrix for an array
+        """
+        rows, departureOffsets, departureDates, routeDepartureOffsets = self.getSegmentIndex()
+        if thresholds is None:
+            y_pred = self.y_pred.reshape(-1)[rows]
+        else:
+            # 1 for buy, 0 for wait, one row per threshold
+            y_score = self.y_score.reshape(-1)[rows]
+            y_pred = (y_score >= np.asarray(thresholds)[..., np.newaxis]).astype(np.float64)
+
+        latestBuyDate = 11 # define the latest buy date state
+        chosenPrices = util.simulateBuyPolicy(y_pred, self.y_test_price.reshape(-1)[rows], self.X_test[rows, self.schema.index("state")],
+                                              departureOffsets, latestBuyDate, routeDepartureOffsets)
+        return util.getRouteAvgPrices(chosenPrices, routeDepartureOffsets)
+
+    def sweepThresholds(self, thresholds):
+        """
+        Evaluate all the routes for every decision threshold at once, from the same prediction,
+        so the threshold is tuned with one fit. The model keeps the scores of the test datasets
+        in self.y_score when it predicts, e.g. ClassificationNN
+        :param thresholds: decision thresholds to evaluate, e.g. percentiles of self.y_score_train
+        :return: (avgPrices, performances, normalizedPerformances), (thresholds x routes) matrices
+        """
+        avgPrices = self.getRouteAvgPrices(np.asarray(thresholds, dtype=np.float64).reshape(-1))
+        performances, normalizedPerformances = self.getPerformances(avgPrices)
+        return avgPrices, performances, normalizedPerformances
+
+    def getPerformances(self, avgPrices):
+        """
+        Get the performance of the average prices of all the routes at once, see getPerformance
+        :param avgPrices: average predicted price of every route, the last axis is the route
+        :return: (performance, normalized performance), with the shape of avgPrices
+        """
+        if self.isTrain:
+            minPrices = np.asarray(self.minPrices_train)
+            randomPrices = np.asarray(self.randomPrices_train)
+        else:
+            minPrices = np.asarray(self.minPrices_test)
+            randomPrices = np.asarray(self.randomPrices_test)
+
+        performance = (randomPrices - avgPrices) / randomPrices * 100
+        maxPerformance = (randomPrices - minPrices) / randomPrices * 100
+        normalizedPefor = performance / maxPerformance * 100
+        return performance, normalizedPefor
+
+    def evaluateMultipleSeeds(self, seeds=None, processes=1):
+        """
+        Fit and evaluate the model once per seed(e.g. the neural network), the seeds run in worker processes,
+        print the mean and the variance over the seeds for every route
+        :param seeds: seed of every run, None for the 20 seeds of the neural network
+        :param processes: number of worker processes
+        :return: per-route table, one (route, avgPrice, performance, normalizedPerformance) per route,
+            every measure is a (mean, variance) pair over the seeds
+        """
+        if seeds is None:
+            seeds = [i*i*i for i in range(20)]
+        avgPrices = util.evaluateSeeds(self, seeds, processes)
+        return self.getSeedRouteTable(avgPrices)
+
+    def getSeedRouteTable(self, avgPrices):
+        """
+        Print the mean and the variance over the seeds of the performance of every route
+        :param avgPrices: average price of every (seed, route), see util.evaluateSeeds
+        :return: per-route table, one (route, avgPrice, performance, normalizedPerformance) per route,
+            every measure is a (mean, variance) pair over the seeds
+        """
+        performances, normalizedPerformances = self.getPerformances(avgPrices)
+
+        routeTable = []
+        for i in range(len(self.routes)):
+            measures = [(np.mean(measure[:, i]), np.var(measure[:, i]))
+                        for measure in [avgPrices, performances, normalizedPerformances]]
+            routeTable.append(tuple([self.routes[i]] + measures))
+            print "Route: {}".format(self.routes[i])
+            print "avgPredPrice: {}, variance: {}".format(measures[0][0], measures[0][1])
+            print "Performance: {}%, variance: {}".format(round(measures[1][0],2), measures[1][1])
+            print "Normalized perfor: {}%, variance: {}".format(round(measures[2][0],2), measures[2][1])
+
+        return routeTable
+
+    def evaluateAllRroutes(self, processes=1):
         """
         Evaluate all the routes, print the performance for every route
         and the average performance for all the routes.
+        The model is fit and predicts once(once per run for the neural network),
+        every route is evaluated from the same prediction.
+        :param processes: number of worker processes for the runs of the neural network
+        :return: per-route table, one (route, avgPrice, performance, normalizedPerformance) per route,
+            for the neural network every measure is a (mean, variance) pair over the runs, see getSeedRouteTable
         """
         performance = 0
         normalizedPerformance = 0
 
+        if self.isNN:
+            timesToRun = 20
+            # every run fits the network with its own seed, see util.evaluateSeeds
+            seedAvgPrices = util.evaluateSeeds(self, [i*i*i for i in range(timesToRun)], processes)
+            avgPrices = np.mean(seedAvgPrices, axis=0)
+        else:
+            # perform fit and predict
+            self.training()
+            self.predict()
+            avgPrices = self.getRouteAvgPrices()
+
         normPerforms = []
+        routeTable = []
         for i in range(8):
             print "Route: {}".format(i)
-            [perfor, normaPerfor] = self.evaluateOneRouteForMultipleTimes(self.routes[i])
+            [perfor, normaPerfor] = self.getPerformance(i, avgPrices[i])
+            routeTable.append((self.routes[i], avgPrices[i], perfor, normaPerfor))
             normPerforms.append(normaPerfor)
             performance += perfor
             normalizedPerformance += normaPerfor
@@ -672,6 +689,11 @@ class ClassificationBase(object):
         print "Average Normalized Performance: {}%".format(normalizedPerformance)
         print "Normalized Performance Variance: {}".format(np.var(normPerforms))
 
+        if self.isNN:
+            # the mean and the variance over the runs
+            return self.getSeedRouteTable(seedAvgPrices)
+        return routeTable
+
 
 
 """
@@ -5,6 +5,7 @@ import json
 # user-library
 import ClassficationBase
 from utils import util
+from utils import load_data
 
 
 # third-party library
@@ -101,44 +102,30 @@ class ClassificationHmmGeneralize(ClassficationBase.ClassificationBase):
         y_general_price = self.y_general_price
         y_general_index = self.y_general_index
 
-        # get the data for the one route
-        X_general = X_general[np.where(y_general_index==flightNum)[0], :]
-        y_pred = y_pred[np.where(y_general_index==flightNum)[0], :]
-        y_general_price = y_general_price[np.where(y_general_index==flightNum)[0], :]
+        # get the data for the one route, grouped by departure date and sorted by state,
+        # the parsed general data has the columns of the specific input(self.schema)
+        segmentIndex = load_data.get_segment_index(y_general_index.ravel(), X_general[:, self.schema.index("departureDate")],
+                                                   X_general[:, self.schema.index("state")], len(self.routes_general))
+        rows, departureDates, departureOffsets = load_data.get_route_segments(segmentIndex, flightNum)
+        X_general = X_general[rows, :]
+        y_pred = y_pred[rows, :]
+        y_general_price = y_general_price[rows, :]
 
         # feature 0~7: flight number dummy variables
         # feature 8: departure date; feature 9: observed date state;
         # feature 10: minimum price; feature 11: maximum price
         # fearure 12: prediction(buy or wait); feature 13: price
         evalMatrix = np.concatenate((X_general, y_pred, y_general_price), axis=1)
-
-
-        # group by the feature 8: departure date
-        departureDates = np.unique(evalMatrix[:, 8])
+        idx_state = self.evalSchema.index("state")
+        idx_output = self.evalSchema.index("output")
+        idx_price = self.evalSchema.index("outputPrice")
 
         departureLen = len(departureDates)
         latestBuyDate = 2 # define the latest buy date state
-        totalPrice = 0
-        for departureDate in departureDates:
-            state = latestBuyDate # update the state for every departure date evaluation
-            global isFound # indicate whether some entries is predicted to be buy
-            isFound = 0
-            for i in range(evalMatrix.shape[0]):
-                # if no entry is buy, then buy the latest one
-                if evalMatrix[i, 8] == departureDate and evalMatrix[i, 9] == latestBuyDate:
-                    latestPrice = evalMatrix[i, 13]
-                # if many entries is buy, then buy the first one
-                if evalMatrix[i, 8] == departureDate and evalMatrix[i, 9] >= state and evalMatrix[i, 12] == 1:
-                    isFound = 1
-                    state = evalMatrix[i, 9]
-                    price = evalMatrix[i, 13]
-
-            if isFound == 1:
-                totalPrice += price
-            else:
-                totalPrice += latestPrice
-        #print isFound
-        avgPrice = totalPrice * 1.0 / departureLen
+        # the chosen price of every departure date, see util.simulateBuyPolicy
+        chosenPrices = util.simulateBuyPolicy(evalMatrix[:, idx_output], evalMatrix[:, idx_price], evalMatrix[:, idx_state],
+                                              departureOffsets, latestBuyDate)
+        avgPrice = np.sum(chosenPrices) * 1.0 / departureLen
         print "One Time avg price: {}".format(avgPrice)
         return avgPrice
 
@@ -152,16 +139,10 @@ class ClassificationHmmGeneralize(ClassficationBase.ClassificationBase):
         # route index
         flightNum = self.routes_general.index(filePrefix)
 
-        # get the minimum, and randomly picked prices
-        minPrices = [12.490000000000006, 46.368000000000009, 17.351111111111116, 23.601111111111116, 26.128888888888895, 29.65666666666667, 17.527777777777779, 29.680555555555557, 71.902777777777771, 32.337999999999994, 34.990000000000002, 22.89777777777779]
-        randomPrices = [24.542071668533051, 59.881070866141727, 33.500638297872356, 47.674268426842659, 45.421868131868116, 58.903186813186799, 34.173292273236285, 69.906774916013433, 135.9368131868132, 57.227615384615383, 56.451417322834651, 45.018514851485136]
-        maxPrices = [66.378888888888866, 92.521846153846141, 73.045555555555509, 101.93444444444435, 87.101111111111038, 113.76777777777768, 90.583333333333329, 176.20833333333334, 292.04166666666669, 101.71300000000006, 98.528461538461499, 101.92833333333331]
-
-
-
-
-        minimumPrice = minPrices[flightNum]
-        randomPrice = randomPrices[flightNum]
+        # get the minimum, and randomly picked prices of the general routes
+        baselinePrices = util.getGeneralBaselinePrices()
+        minimumPrice = baselinePrices["minPrices"][flightNum]
+        randomPrice = baselinePrices["randomPrices"][flightNum]
 
         timesToRun = 20 # if it is neural network, please change this number to 20 or more
         totalPrice = 0
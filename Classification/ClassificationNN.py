@@ -64,6 +64,9 @@ class ClassificationNN(ClassficationBase.ClassificationBase):
         # predict the test data
         y_pred_train = self.net1.predict(self.X_train)
         self.y_pred = self.net1.predict(self.X_test)
+        # keep the scores to tune the threshold, see sweepThresholds
+        self.y_score_train = y_pred_train
+        self.y_score = self.y_pred.copy()
 
         # 1 for buy, 0 for wait
         median = np.median(y_pred_train)
@@ -5,6 +5,8 @@ import json
 # user-library
 import ClassficationBase
 from utils import util
+from utils import load_data
+from utils import feature_schema
 
 
 # third-party library
@@ -32,6 +34,8 @@ class ClassificationUniformGeneralize(ClassficationBase.ClassificationBase):
 
         # feature 12: output; feature 13: current price
         # feature 14: flight index
+        self.generalSchema = feature_schema.get_classification_schema(load_data.routes_general)
+        self.generalEvalSchema = feature_schema.get_evaluation_schema(self.generalSchema)
         self.X_general = np.load('inputGeneralClf_small/X_train.npy')
         self.y_general = np.load('inputGeneralClf_small/y_train.npy')
         self.y_general = self.y_general.reshape((self.y_general.shape[0], 1))
@@ -78,7 +82,7 @@ class ClassificationUniformGeneralize(ClassficationBase.ClassificationBase):
         """
         self.X_generals = []
         for i in range(8):
-            tmp = self.X_general[:, 12:16]
+            tmp = self.generalSchema.select(self.X_general, self.generalSchema.features, isRoutes=False)
             pattern = patterns[i]
             pattern = np.tile(pattern, (tmp.shape[0],1))
             tmp = np.concatenate((pattern, tmp), axis=1)
@@ -140,44 +144,29 @@ class ClassificationUniformGeneralize(ClassficationBase.ClassificationBase):
         y_general_price = self.y_general_price
         y_general_index = self.y_general_index
 
-        # get the data for the one route
-        X_general = X_general[np.where(y_general_index==flightNum)[0], :]
-        y_pred = y_pred[np.where(y_general_index==flightNum)[0], :]
-        y_general_price = y_general_price[np.where(y_general_index==flightNum)[0], :]
+        # get the data for the one route, grouped by departure date and sorted by state
+        segmentIndex = load_data.get_segment_index(y_general_index.ravel(), X_general[:, self.generalSchema.index("departureDate")],
+                                                   X_general[:, self.generalSchema.index("state")], len(self.routes_general))
+        rows, departureDates, departureOffsets = load_data.get_route_segments(segmentIndex, flightNum)
+        X_general = X_general[rows, :]
+        y_pred = y_pred[rows, :]
+        y_general_price = y_general_price[rows, :]
 
         # feature 0~11: flight number dummy variables
         # feature 12: departure date; feature 13: observed date state;
         # feature 14: minimum price; feature 15: maximum price
         # fearure 16: prediction(buy or wait); feature 17: price
         evalMatrix = np.concatenate((X_general, y_pred, y_general_price), axis=1)
-
-
-        # group by the feature 8: departure date
-        departureDates = np.unique(evalMatrix[:, 12])
+        idx_state = self.generalEvalSchema.index("state")
+        idx_output = self.generalEvalSchema.index("output")
+        idx_price = self.generalEvalSchema.index("outputPrice")
 
         departureLen = len(departureDates)
         latestBuyDate = 2 # define the latest buy date state
-        totalPrice = 0
-        for departureDate in departureDates:
-            state = latestBuyDate # update the state for every departure date evaluation
-            global isFound # indicate whether some entries is predicted to be buy
-            isFound = 0
-            for i in range(evalMatrix.shape[0]):
-                # if no entry is buy, then buy the latest one
-                if evalMatrix[i, 12] == departureDate and evalMatrix[i, 13] == latestBuyDate:
-                    latestPrice = evalMatrix[i, 17]
-                # if many entries is buy, then buy the first one
-                if evalMatrix[i, 12] == departureDate and evalMatrix[i, 13] >= state and evalMatrix[i, 16] == 1:
-                    isFound = 1
-                    state = evalMatrix[i, 13]
-                    price = evalMatrix[i, 17]
-
-            if isFound == 1:
-                totalPrice += price
-            else:
-                totalPrice += latestPrice
-        #print isFound
-        avgPrice = totalPrice * 1.0 / departureLen
+        # the chosen price of every departure date, see util.simulateBuyPolicy
+        chosenPrices = util.simulateBuyPolicy(evalMatrix[:, idx_output], evalMatrix[:, idx_price], evalMatrix[:, idx_state],
+                                              departureOffsets, latestBuyDate)
+        avgPrice = np.sum(chosenPrices) * 1.0 / departureLen
         print "One Time avg price: {}".format(avgPrice)
         return avgPrice
 
@@ -191,16 +180,10 @@ class ClassificationUniformGeneralize(ClassficationBase.ClassificationBase):
         # route index
         flightNum = self.routes_general.index(filePrefix)
 
-        # get the minimum, and randomly picked prices
-        minPrices = [12.490000000000006, 46.368000000000009, 17.351111111111116, 23.601111111111116, 26.128888888888895, 29.65666666666667, 17.527777777777779, 29.680555555555557, 71.902777777777771, 32.337999999999994, 34.990000000000002, 22.89777777777779]
-        randomPrices = [24.542071668533051, 59.881070866141727, 33.500638297872356, 47.674268426842659, 45.421868131868116, 58.903186813186799, 34.173292273236285, 69.906774916013433, 135.9368131868132, 57.227615384615383, 56.451417322834651, 45.018514851485136]
-        maxPrices = [66.378888888888866, 92.521846153846141, 73.045555555555509, 101.93444444444435, 87.101111111111038, 113.76777777777768, 90.583333333333329, 176.20833333333334, 292.04166666666669, 101.71300000000006, 98.528461538461499, 101.92833333333331]
-
-
-
-
-        minimumPrice = minPrices[flightNum]
-        randomPrice = randomPrices[flightNum]
+        # get the minimum, and randomly picked prices of the general routes
+        baselinePrices = util.getGeneralBaselinePrices()
+        minimumPrice = baselinePrices["minPrices"][flightNum]
+        randomPrice = baselinePrices["randomPrices"][flightNum]
 
         timesToRun = 20 # if it is neural network, please change this number to 20 or more
         totalPrice = 0
@@ -3,6 +3,8 @@ import numpy as np
 
 # user-library
 from HmmClassifier import HmmClassifier
+from utils import feature_schema
+from utils import load_data
 
 
 routes_specific = ["BCN_BUD",  # route 1
@@ -218,50 +220,72 @@ def getFeaturesForGeneralRoutes_Classification():
                 [0,0,0,0,0,0,1,0],
                 [0,0,0,0,0,0,0,1]]
 
+    """
+    named columns of the general datas, the specific datas, and the result
+    """
+    generalSchema = feature_schema.get_evaluation_schema(feature_schema.get_classification_schema(routes_general))
+    specificSchema = feature_schema.get_evaluation_schema(feature_schema.get_classification_schema(routes_specific))
+    # the general datas without the dummy variables
+    byDateSchema = generalSchema.prune(generalSchema.features, isRoutes=False)
+    idx_state = byDateSchema.index("state")
+    # the specific patterns take the place of the dummy variables, +1 for flightNum
+    resultSchema = specificSchema.append(["flightIndex"])
+
     # +3, 1 for y_result, 1 for y_result_price, 1 for flightNum
-    X_result = np.empty(shape=(0, 12+3))
+    X_result = np.empty(shape=(0, len(resultSchema)))
 
-    # keep different specific routes separately
+    # group the general and the specific datas by (route, departure date) once, in the table order
+    generalIndex = load_data.get_input_segment_index(X_general, generalSchema, isState=False)
+    specificIndex = load_data.get_input_segment_index(X_specific, specificSchema, isState=False)
+
+    # keep different specific routes separately, with their departure dates
     routesSpecific = []
     for flightNum in range(len(routes_specific)):
-        tmpSpecific = X_specific[np.where(X_specific[:, flightNum]==1)[0], :]
-        routesSpecific.append(tmpSpecific)
+        rows, specificDates, specificOffsets = load_data.get_route_segments(specificIndex, flightNum)
+        routesSpecific.append((X_specific[rows, :], specificDates, specificOffsets))
 
 
     for flightNum in range(len(routes_general)):
-        # choose one route datas
-        tmpGeneral = X_general[np.where(X_general[:, flightNum]==1)[0], :]
+        # choose one route datas, grouped by departure date
+        rows, departureDates, departureOffsets = load_data.get_route_segments(generalIndex, flightNum)
         # feature 0: departure date;  feature 1: observed date state
         # feature 2: minimum price by now; feature 3: maximum price by now
         # feature 4: output; feature 5: current price
-        tmpGeneral = tmpGeneral[:, 12:18]
-
-        # group by the feature: departure date
-        departureDates = np.unique(tmpGeneral[:, 0])
+        tmpGeneral = generalSchema.select(X_general[rows, :], byDateSchema.features, isRoutes=False)
 
         # get the final datas, the observed data state should be from large to small(i.e. for time series)
-        for departureDate in departureDates:
-            indexs = np.where(tmpGeneral[:, 0]==departureDate)[0]
+        for departureIndex in range(len(departureDates)):
+            departureDate = departureDates[departureIndex]
             # get the datas of same departureDate
-            datasByDate = tmpGeneral[indexs, :]
+            datasByDate = tmpGeneral[departureOffsets[departureIndex]:departureOffsets[departureIndex+1], :]
+
+            # get the datas of same departureDate in every specific route, empty if it is not observed
+            referencesByDate = []
+            for tmpSpecific, specificDates, specificOffsets in routesSpecific:
+                g = np.searchsorted(specificDates, departureDate)
+                if g < len(specificDates) and specificDates[g] == departureDate:
+                    referencesByDate.append(tmpSpecific[specificOffsets[g]:specificOffsets[g+1], :])
+                else:
+                    referencesByDate.append(tmpSpecific[0:0, :])
             """
             # sort by the observed date state, from large to small(i.e. for time series)
             """
             #datasByDate = datasByDate[(10-datasByDate[:,1]).argsort()]
 
             # group by the feature: state
-            states = np.unique(datasByDate[:,1])
+            states = np.unique(datasByDate[:, idx_state])
             for state in states:
                 maxState = max(states)
                 #print "State: {}, MaxState: {}".format(state, maxState)
-                datasByDateAndState = datasByDate[np.where((datasByDate[:, 1]>=state) & (datasByDate[:, 1]<=maxState))[0], :]
+                datasByDateAndState = datasByDate[np.where((datasByDate[:, idx_state]>=state) & (datasByDate[:, idx_state]<=maxState))[0], :]
                 referenceSeqs = []
                 isNoUse = 0
                 for ii in range(len(routes_specific)):
-                    referenceSeq_i = routesSpecific[ii][np.where(routesSpecific[ii][:,8]==departureDate)[0],:]
-                    referenceSeq_i = referenceSeq_i[np.where((referenceSeq_i[:,9]>=state) & (referenceSeq_i[:,9]<=maxState))[0], :]
+                    referenceSeq_i = referencesByDate[ii]
+                    referenceStates = referenceSeq_i[:, specificSchema.index("state")]
+                    referenceSeq_i = referenceSeq_i[np.where((referenceStates>=state) & (referenceStates<=maxState))[0], :]
 
-                    referenceSeq_i = referenceSeq_i[:,13]
+                    referenceSeq_i = referenceSeq_i[:, specificSchema.index("outputPrice")]
 
                     """ keep the seqeunce long enough"""
                     if referenceSeq_i.shape[0] < 31:
@@ -275,26 +299,26 @@ def getFeaturesForGeneralRoutes_Classification():
                     #print "no use"
                     idx = 0
                 else:
-                    inputSeq = datasByDateAndState[:,5]
+                    inputSeq = datasByDateAndState[:, byDateSchema.index("outputPrice")]
                     inputSeq = inputSeq.reshape((inputSeq.shape[0], 1))
                     hmmClassifier = HmmClassifier(referenceSeqs, inputSeq)
                     #print "idx: {}".format(hmmClassifier.predict())
                     idx = hmmClassifier.predict()
 
-                datasByDateAndState = datasByDate[np.where((datasByDate[:, 1]==state) )[0], :]
+                datasByDateAndState = datasByDate[np.where((datasByDate[:, idx_state]==state) )[0], :]
                 datasByDateAndState = datasByDateAndState[0,:]
                 datasByDateAndState = datasByDateAndState.reshape((1,datasByDateAndState.shape[0]))
 
                 flightIndex = np.array([flightNum]).reshape((1,1))
-                X_i = np.concatenate((np.array(patterns[idx]).reshape(1,8),datasByDateAndState, flightIndex), axis=1)
+                X_i = np.concatenate((np.array(patterns[idx]).reshape(1,len(routes_specific)),datasByDateAndState, flightIndex), axis=1)
                 X_result = np.concatenate((X_result, X_i), axis=0)
 
 
 
-    y_result = X_result[:,12]
-    y_result_price = X_result[:,13]
-    y_index = X_result[:,14]
-    X_result = X_result[:, 0:12]
+    y_result = X_result[:, resultSchema.index("output")]
+    y_result_price = X_result[:, resultSchema.index("outputPrice")]
+    y_index = X_result[:, resultSchema.index("flightIndex")]
+    X_result = X_result[:, 0:resultSchema.index("output")]
 
     np.save('../Classification/inputGeneralClf_HmmParsed/X_train', X_result)
     np.save('../Classification/inputGeneralClf_HmmParsed/y_train', y_result)
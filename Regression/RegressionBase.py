@@ -5,6 +5,7 @@ import json
 # user-library
 from utils import load_data
 from utils import util
+from utils import feature_schema
 
 # third-party library
 from sklearn.utils import shuffle
@@ -14,6 +15,23 @@ from sklearn import preprocessing
 
 class RegressionBase(object):
 
+    # the inputs are memory-mapped when they are first used, see loadInput
+    X_train = load_data.lazy_input("X_train")
+    y_train = load_data.lazy_input("y_train")
+    y_train_price = load_data.lazy_input("y_train_price")
+    X_test = load_data.lazy_input("X_test")
+    y_test = load_data.lazy_input("y_test")
+    y_test_price = load_data.lazy_input("y_test_price")
+    y_pred = load_data.lazy_input("y_pred")
+
+    # the baseline prices of every route, see getBaselinePrices
+    randomPrices_train = util.baselineProperty("randomPrices", "train")
+    randomPrices_test = util.baselineProperty("randomPrices", "test")
+    minPrices_train = util.baselineProperty("minPrices", "train")
+    minPrices_test = util.baselineProperty("minPrices", "test")
+    maxPrices_train = util.baselineProperty("maxPrices", "train")
+    maxPrices_test = util.baselineProperty("maxPrices", "test")
+
     def __init__(self, isTrain, isNN=0):
         # indicate it is train data or not
         self.isTrain = isTrain
@@ -27,64 +45,19 @@ class RegressionBase(object):
                       "OTP_CRL",  # route 6
                       "SKP_MLH",  # route 7
                       "SKP_MMX"]  # route 8
-
-        """
-        For the small data set, the datas are from functions in util
-        """
-        # random price list
-        self.randomPrices_train = [68.4391315136,
-                             67.4260645161,
-                             93.2808545727,
-                             77.4751720047,
-                             75.0340018399,
-                             73.9964736451,
-                             105.280932384,
-                             97.1720369004]
-        self.randomPrices_test = [55.4820634921,
-                                  57.8067301587,
-                                  23.152037037,
-                                  33.3727319588,
-                                  35.3032044199,
-                                  41.1180555556,
-                                  56.3433402062,
-                                  60.2546519337]
-        # minimum price list
-        self.minPrices_train = [44.4344444444,
-                               38.9605925926,
-                               68.6566666667,
-                               49.6566666667,
-                               48.2691891892,
-                               47.0833333333,
-                               68.982,
-                               63.1279459459]
-        self.minPrices_test = [32.370952381,
-                               29.3775238095,
-                               11.3788888889,
-                               16.5284615385,
-                               18.6184615385,
-                               14.6111111111,
-                               21.5127692308,
-                               25.8050769231]
-
-        # maximum price list
-        self.maxPrices_train = [115.915925926,
-                                126.782814815,
-                                144.212222222,
-                                129.656666667,
-                                141.252972973,
-                                149.972222222,
-                                174.402,
-                                160.91172973
-                                ]
-
-        self.maxPrices_test = [126.656666667,
-                               168.95847619,
-                               93.6011111111,
-                               90.5669230769,
-                               101.233846154,
-                               198.361111111,
-                               154.505076923,
-                               208.020461538]
+        # named columns of the inputs
+        self.schema = feature_schema.get_regression_schema(self.routes)
+        self.evalSchema = feature_schema.get_evaluation_schema(self.schema)
+        # priceNormalize and getRegressionOutput work on the classification datasets
+        self.clfSchema = feature_schema.get_classification_schema(self.routes)
+        self.clfEvalSchema = feature_schema.get_evaluation_schema(self.clfSchema)
+
+        # the minimum, maximum and random prices of every route are computed from the evaluated datasets
+        # when they are first used, see getBaselinePrices
+        # (paths relative to the utils directory, see load_data.get_input_path)
+        self.baselineFiles = {"train": ('../Regression/inputReg_small/X_train.npy', '../Regression/inputReg_small/y_train_price.npy'),
+                              "test": ('../Regression/inputReg_small/X_test.npy', '../Regression/inputReg_small/y_test_price.npy')}
+        self.baselinePrices = {}
 
         # for currency change
         self.currency = [1,      # route 1 - Euro
@@ -102,27 +75,23 @@ class RegressionBase(object):
         # feature 10: minimum price; feature 11: maximum price
         # feature 12: current price
         # output: prediction(buy or wait); output_price: price
-        # load training datasets
-        self.X_train = np.load('inputReg_small/X_train.npy')
-        self.y_train = np.load('inputReg_small/y_train.npy')
-        self.y_train_price = np.load('inputReg_small/y_train_price.npy')
-
-        # load test datasets
+        # training datasets
+        self.inputFiles = {"X_train": 'inputReg_small/X_train.npy',
+                           "y_train": 'inputReg_small/y_train.npy',
+                           "y_train_price": 'inputReg_small/y_train_price.npy'}
+
+        # test datasets
+        self.testRows = None # boolean mask of the test rows kept, see getTestRows
+        self.segmentIndex = None # segment index of the test datasets, see getRouteSegments
         if isTrain:
-            self.X_test = np.load('inputReg_small/X_train.npy')
-            self.y_test = np.load('inputReg_small/y_train.npy')
-            self.y_test_price = np.load('inputReg_small/y_train_price.npy')
-            self.y_pred = np.empty(shape=(self.y_test.shape[0],1))
-
-            # choose the dates whose departureDate-queryDate gaps is larger than 20
-            self.y_test = self.y_test[np.where(self.X_test[:, 8]>20)[0], :]
-            self.y_test_price = self.y_test_price[np.where(self.X_test[:, 8]>20)[0], :]
-            self.y_pred = self.y_pred[np.where(self.X_test[:, 8]>20)[0], :]
-            self.X_test = self.X_test[np.where(self.X_test[:, 8]>20)[0], :]
+            # the train datasets are evaluated, the dates are chosen in getTestRows
+            self.inputFiles["X_test"] = 'inputReg_small/X_train.npy'
+            self.inputFiles["y_test"] = 'inputReg_small/y_train.npy'
+            self.inputFiles["y_test_price"] = 'inputReg_small/y_train_price.npy'
         else:
-            self.X_test = np.load('inputReg_small/X_test.npy')
-            self.y_test = np.load('inputReg_small/y_test.npy')
-            self.y_test_price = np.load('inputReg_small/y_test_price.npy')
+            self.inputFiles["X_test"] = 'inputReg_small/X_test.npy'
+            self.inputFiles["y_test"] = 'inputReg_small/y_test.npy'
+            self.inputFiles["y_test_price"] = 'inputReg_small/y_test_price.npy'
 
             # """
             # TODO:
@@ -133,7 +102,58 @@ class RegressionBase(object):
             # self.y_test_price = self.y_test_price[np.where(self.X_test[:,9]<=100)[0], :]
             # self.X_test = self.X_test[np.where(self.X_test[:,9]<=100)[0], :]
 
-            self.y_pred = np.empty(shape=(self.y_test.shape[0],1))
+    def loadInput(self, name):
+        """
+        Load one input when it is first used, the .npy files are memory-mapped
+        :param name: input name, e.g. "X_train"
+        :return: the input
+        """
+        if name == "y_pred":
+            return np.empty(shape=(self.y_test.shape[0],1))
+        if self.isTrain and name in ["X_test", "y_test", "y_test_price"]:
+            return load_data.load_input(self.inputFiles[name], self.getTestRows())
+        return load_data.load_input(self.inputFiles[name])
+
+    def getBaselinePrices(self, split):
+        """
+        Get the baseline prices of every route of the train or test datasets, they are only computed
+        again when the datasets change, see util.loadBaselinePrices
+        :param split: "train" or "test"
+        :return: dict of lists "minPrices", "maxPrices", "randomPrices", one price per route
+        """
+        if split not in self.baselinePrices:
+            filePath, priceFilePath = self.baselineFiles[split]
+            self.baselinePrices[split] = util.loadBaselinePrices(filePath, self.schema, priceFilePath,
+                                                                 util.baselineRandomLens[split])
+        return self.baselinePrices[split]
+
+    def getTestRows(self):
+        """
+        In the train mode, choose the dates whose departureDate-queryDate gaps is larger than 20
+        :return: boolean mask of the test rows kept
+        """
+        if self.testRows is None:
+            X_test = load_data.load_input(self.inputFiles["X_test"])
+            self.testRows = X_test[:, self.schema.index("departureDate")] > 20
+        return self.testRows
+
+    def getRouteSegments(self, flightNum):
+        """
+        Get the departure dates of one route in the test datasets, the test datasets are sorted
+        by (route, departure date, state) once, see load_data.get_segment_index
+        :param flightNum: route index
+        :return: (rows, departureDates, departureOffsets), see load_data.get_route_segments
+        """
+        return load_data.get_route_segments(self.getSegmentIndex(), flightNum)
+
+    def getSegmentIndex(self):
+        """
+        Get the segment index of the test datasets, it is built once per X_test
+        :return: (rows, departureOffsets, departureDates, routeDepartureOffsets), see load_data.get_segment_index
+        """
+        if self.segmentIndex is None or self.segmentIndex[0] is not self.X_test:
+            self.segmentIndex = (self.X_test, load_data.get_input_segment_index(self.X_test, self.schema))
+        return self.segmentIndex[1]
 
     def priceNormalize(self):
         """
@@ -148,28 +168,18 @@ class RegressionBase(object):
         evalMatrix_train = np.concatenate((self.X_train, self.y_train, self.y_train_price), axis=1)
         evalMatrix_test = np.concatenate((self.X_test, self.y_test, self.y_test_price), axis=1)
 
-        matrixTrain = np.empty(shape=(0, evalMatrix_train.shape[1]))
-        matrixTest = np.empty(shape=(0, evalMatrix_train.shape[1]))
-        for i in range(len(self.routes)):
-            evalMatrix = evalMatrix_train[np.where(evalMatrix_train[:, i]==1)[0], :]
-            evalMatrix[:, 10] *= self.currency[i]
-            evalMatrix[:, 11] *= self.currency[i]
-            evalMatrix[:, 13] *= self.currency[i]
-            matrixTrain = np.concatenate((matrixTrain, evalMatrix), axis=0)
-
-            evalMatrix = evalMatrix_test[np.where(evalMatrix_test[:, i]==1)[0], :]
-            evalMatrix[:, 10] *= self.currency[i]
-            evalMatrix[:, 11] *= self.currency[i]
-            evalMatrix[:, 13] *= self.currency[i]
-            matrixTest = np.concatenate((matrixTest, evalMatrix), axis=0)
-
-        self.X_train = matrixTrain[:, 0:12]
-        self.y_train = matrixTrain[:, 12]
-        self.y_train_price = matrixTrain[:, 13]
-
-        self.X_test = matrixTest[:, 0:12]
-        self.y_test = matrixTest[:, 12]
-        self.y_test_price = matrixTest[:, 13]
+        priceColumns = self.clfEvalSchema.indexs(["minimumPrice", "maximumPrice", "outputPrice"])
+        # the rows keep their order
+        matrixTrain = load_data.normalize_currency(evalMatrix_train, self.clfEvalSchema, priceColumns, self.currency)
+        matrixTest = load_data.normalize_currency(evalMatrix_test, self.clfEvalSchema, priceColumns, self.currency)
+
+        self.X_train = matrixTrain[:, 0:len(self.clfSchema)]
+        self.y_train = matrixTrain[:, self.clfEvalSchema.index("output")]
+        self.y_train_price = matrixTrain[:, self.clfEvalSchema.index("outputPrice")]
+
+        self.X_test = matrixTest[:, 0:len(self.clfSchema)]
+        self.y_test = matrixTest[:, self.clfEvalSchema.index("output")]
+        self.y_test_price = matrixTest[:, self.clfEvalSchema.index("outputPrice")]
 
         self.y_train = self.y_train.reshape((self.y_train.shape[0], 1))
         self.y_train_price = self.y_train_price.reshape((self.y_train_price.shape[0], 1))
@@ -179,11 +189,12 @@ class RegressionBase(object):
     def Standardization(self):
         # feature 10: minimum price so far; feature 11: maximum price so far
         # feature 12: current price
-        scaled = preprocessing.scale(self.X_train[:, 10:13])
-        self.X_train[:, 10:13] = scaled
+        priceColumns = self.schema.indexs(["minimumPrice", "maximumPrice", "price"])
+        scaled = preprocessing.scale(self.X_train[:, priceColumns])
+        self.X_train[:, priceColumns] = scaled
 
-        scaled = preprocessing.scale(self.X_test[:, 10:13])
-        self.X_test[:, 10:13] = scaled
+        scaled = preprocessing.scale(self.X_test[:, priceColumns])
+        self.X_test[:, priceColumns] = scaled
 
     def getRegressionOutput(self):
         """
@@ -191,43 +202,27 @@ class RegressionBase(object):
         :return: Save the regression datasets into inputReg
         """
 
+        idx_output = self.clfEvalSchema.index("output")
+        idx_currentPrice = self.clfEvalSchema.index("outputPrice")
+
         # Construct train data
-        X_tmp = np.empty(shape=(0, 14))
-        for flightNum in range(len(self.routes)):
-            # concatenate the buy or wait info to get the total datas
-            y_train = self.y_train.reshape((self.y_train.shape[0],1))
-            y_train_price = self.y_train_price.reshape((self.y_train_price.shape[0],1))
-
-            X_train = np.concatenate((self.X_train, y_train, y_train_price), axis=1)
-
-            # choose one route datas
-            X_train = X_train[np.where(X_train[:, flightNum]==1)[0], :]
-
-            # remove dummy variables
-            # feature 8: departure date;  feature 9: observed date state
-            # feature 10: minimum price; feature 11: maximum price
-            # feature 12: prediction(buy or wait); feature 13: current price
-            X_train = X_train[:, 0:14]
-
-            # group by the feature: departure date
-            departureDates_train = np.unique(X_train[:, 8])
-
-            # get the final datas, the observed data state should be from large to small(i.e. for time series)
-            for departureDate in departureDates_train:
-                indexs = np.where(X_train[:, 8]==departureDate)[0]
-                datas = X_train[indexs, :]
-                minPrice = min(datas[:, 10])
-                datas[:, 12] = minPrice
-                """
-                print departureDate
-                print minPrice
-                print datas
-                """
-                X_tmp = np.concatenate((X_tmp, datas), axis=0)
-
-        X_train = X_tmp[:, 0:12]
-        y_train = X_tmp[:, 12]
-        y_train_price = X_tmp[:, 13]
+        # concatenate the buy or wait info to get the total datas
+        y_train = self.y_train.reshape((self.y_train.shape[0],1))
+        y_train_price = self.y_train_price.reshape((self.y_train_price.shape[0],1))
+
+        X_train = np.concatenate((self.X_train, y_train, y_train_price), axis=1)
+
+        # feature 8: departure date;  feature 9: observed date state
+        # feature 10: minimum price; feature 11: maximum price
+        # feature 12: prediction(buy or wait); feature 13: current price
+        X_train = X_train[:, 0:len(self.clfEvalSchema)]
+
+        # the output is the minimum price of the departure date
+        X_tmp = load_data.set_departure_minimum_price(X_train, self.clfEvalSchema)
+
+        X_train = X_tmp[:, 0:idx_output]
+        y_train = X_tmp[:, idx_output]
+        y_train_price = X_tmp[:, idx_currentPrice]
         y_train = y_train.reshape((y_train.shape[0], 1))
         y_train_price = y_train_price.reshape((y_train_price.shape[0], 1))
 
@@ -239,42 +234,23 @@ class RegressionBase(object):
 
 
         # Construct test data
-        X_tmp = np.empty(shape=(0, 14))
-        for flightNum in range(len(self.routes)):
-            # concatenate the buy or wait info to get the total datas
-            y_test = self.y_test.reshape((self.y_test.shape[0],1))
-            y_test_price = self.y_test_price.reshape((self.y_test_price.shape[0],1))
-
-            X_test = np.concatenate((self.X_test, y_test, y_test_price), axis=1)
-
-            # choose one route datas
-            X_test = X_test[np.where(X_test[:, flightNum]==1)[0], :]
-
-            # remove dummy variables
-            # feature 8: departure date;  feature 9: observed date state
-            # feature 10: minimum price; feature 11: maximum price
-            # feature 12: prediction(buy or wait); feature 13: current price
-            X_test = X_test[:, 0:14]
-
-            # group by the feature: departure date
-            departureDates_test = np.unique(X_test[:, 8])
-
-            # get the final datas, the observed data state should be from large to small(i.e. for time series)
-            for departureDate in departureDates_test:
-                indexs = np.where(X_test[:, 8]==departureDate)[0]
-                datas = X_test[indexs, :]
-                minPrice = min(datas[:, 10])
-                datas[:, 12] = minPrice
-                """
-                print departureDate
-                print minPrice
-                print datas
-                """
-                X_tmp = np.concatenate((X_tmp, datas), axis=0)
-
-        X_test = X_tmp[:, 0:12]
-        y_test = X_tmp[:, 12]
-        y_test_price = X_tmp[:, 13]
+        # concatenate the buy or wait info to get the total datas
+        y_test = self.y_test.reshape((self.y_test.shape[0],1))
+        y_test_price = self.y_test_price.reshape((self.y_test_price.shape[0],1))
+
+        X_test = np.concatenate((self.X_test, y_test, y_test_price), axis=1)
+
+        # feature 8: departure date;  feature 9: observed date state
+        # feature 10: minimum price; feature 11: maximum price
+        # feature 12: prediction(buy or wait); feature 13: current price
+        X_test = X_test[:, 0:len(self.clfEvalSchema)]
+
+        # the output is the minimum price of the departure date
+        X_tmp = load_data.set_departure_minimum_price(X_test, self.clfEvalSchema)
+
+        X_test = X_tmp[:, 0:idx_output]
+        y_test = X_tmp[:, idx_output]
+        y_test_price = X_tmp[:, idx_currentPrice]
         y_test = y_test.reshape((y_test.shape[0], 1))
         y_test_price = y_test_price.reshape((y_test_price.shape[0], 1))
         X_test = np.concatenate((X_test, y_test_price), axis=1)
@@ -327,28 +303,26 @@ class RegressionBase(object):
         # route index
         flightNum = self.routes.index(filePrefix)
 
+        # choose one route datas, grouped by departure date in the table order
+        segmentIndex = load_data.get_input_segment_index(self.X_test, self.schema, isState=False)
+        rows, departureDates_test, departureOffsets = load_data.get_route_segments(segmentIndex, flightNum)
+
         # concatenate the buy or wait info to get the total datas
         y_pred = self.y_pred.reshape((self.y_pred.shape[0],1))
-        X_test = np.concatenate((self.X_test, self.y_test, y_pred, self.y_test_price), axis=1)
-
-        # choose one route datas
-        X_test = X_test[np.where(X_test[:, flightNum]==1)[0], :]
+        X_test = np.concatenate((self.X_test[rows], self.y_test[rows], y_pred[rows], self.y_test_price[rows]), axis=1)
 
         # remove dummy variables
         # feature 0: departure date;  feature 1: observed date state
         # feature 2: minimum price; feature 3: maximum price
         # feature 4: current price; feature 5: output;
         # feature 6: prediction; feature 7: current price
-        X_test = X_test[:, 8:16]
-
-        # group by the feature: departure date
-        departureDates_test = np.unique(X_test[:, 0])
+        X_test = X_test[:, self.schema.index("departureDate"):]
 
         # get the final datas, the observed data state should be from large to small(i.e. for time series)
         length_test = []
-        for departureDate in departureDates_test:
-            indexs = np.where(X_test[:, 0]==departureDate)[0]
-            datas = X_test[indexs, :]
+        for departureIndex in range(len(departureDates_test)):
+            departureDate = departureDates_test[departureIndex]
+            datas = X_test[departureOffsets[departureIndex]:departureOffsets[departureIndex+1], :]
             length_test.append(len(datas))
             print departureDate
             print "[minimum price, maximum price, current price, output, prediction]"
@@ -367,26 +341,24 @@ class RegressionBase(object):
         y_train = self.y_train.reshape((self.y_train.shape[0],1))
         y_train_price = self.y_train_price.reshape((self.y_train_price.shape[0],1))
 
-        X_train = np.concatenate((self.X_train, y_train, y_train_price), axis=1)
+        # choose one route datas, grouped by departure date in the table order
+        segmentIndex = load_data.get_input_segment_index(self.X_train, self.schema, isState=False)
+        rows, departureDates_train, departureOffsets = load_data.get_route_segments(segmentIndex, flightNum)
 
-        # choose one route datas
-        X_train = X_train[np.where(X_train[:, flightNum]==1)[0], :]
+        X_train = np.concatenate((self.X_train[rows], y_train[rows], y_train_price[rows]), axis=1)
 
         # remove dummy variables
         # feature 0: departure date;  feature 1: observed date state
         # feature 2: minimum price; feature 3: maximum price
         # feature 4: current price; feature 5: expected minimum price;
         # feature 6: current price
-        X_train = X_train[:, 8:15]
-
-        # group by the feature: departure date
-        departureDates_train = np.unique(X_train[:, 0])
+        X_train = X_train[:, self.schema.index("departureDate"):]
 
         # get the final datas, the observed data state should be from large to small(i.e. for time series)
         length_test = []
-        for departureDate in departureDates_train:
-            indexs = np.where(X_train[:, 0]==departureDate)[0]
-            datas = X_train[indexs, :]
+        for departureIndex in range(len(departureDates_train)):
+            departureDate = departureDates_train[departureIndex]
+            datas = X_train[departureOffsets[departureIndex]:departureOffsets[departureIndex+1], :]
             length_test.append(len(datas))
             print departureDate
             print datas
@@ -399,10 +371,15 @@ class RegressionBase(object):
         :return: average price
         """
 
-        X_test = self.X_test
+        # route index
+        flightNum = self.routes.index(filePrefix)
+        # only the rows of the route are read, grouped by departure date
+        rows, departureDates, departureOffsets = self.getRouteSegments(flightNum)
+
+        X_test = self.X_test[rows]
         #y_pred = self.y_pred
-        y_test_price = self.y_test_price
-        y_pred = self.y_pred.reshape((self.y_pred.shape[0], 1))
+        y_test_price = self.y_test_price[rows]
+        y_pred = self.y_pred.reshape((self.y_pred.shape[0], 1))[rows]
         y_buy = np.zeros(shape=(y_pred.shape[0], y_pred.shape[1]))
         y_buy[np.where((y_test_price<y_pred+priceTolerance)==True)[0], :] = 1  # to indicate whether buy or not
 
@@ -413,56 +390,30 @@ class RegressionBase(object):
         # fearure 13: prediction(buy or wait); feature 14: current price
         evalMatrix = np.concatenate((X_test, y_buy, y_test_price), axis=1)
 
-        # route index
-        flightNum = self.routes.index(filePrefix)
-
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, flightNum]==1)[0], :]
-
-        # group by the feature 8: departure date
-        departureDates = np.unique(evalMatrix[:, 8])
+        idx_state = self.evalSchema.index("state")
+        idx_output = self.evalSchema.index("output")
+        idx_price = self.evalSchema.index("outputPrice")
 
         departureLen = len(departureDates)
         latestBuyDate = 11 # define the latest buy date state
-        totalPrice = 0
-        for departureDate in departureDates:
-            state = latestBuyDate  # update the state for every departure date evaluation
-            global isFound # indicate whether some entries is predicted to be buy
-            isFound = 0
-            for i in range(evalMatrix.shape[0]):
-                # if no entry is buy, then buy the latest one
-                if evalMatrix[i, 8] == departureDate and evalMatrix[i, 9] == latestBuyDate:
-                    latestPrice = evalMatrix[i, 14]
-                # if many entries is buy, then buy the first one
-                if evalMatrix[i, 8] == departureDate and evalMatrix[i, 9] >= state and evalMatrix[i, 13] == 1:
-                    isFound = 1
-                    state = evalMatrix[i, 9]
-                    price = evalMatrix[i, 14]
-
-            if isFound == 1:
-                totalPrice += price
-                #print "departure date: {}, price: {}".format(departureDate, price)
-            else:
-                totalPrice += latestPrice
-                #print "departure date: {}, lastprice: {}".format(departureDate, latestPrice)
-
-        avgPrice = totalPrice * 1.0 / departureLen
+        # the chosen price of every departure date, see util.simulateBuyPolicy
+        chosenPrices = util.simulateBuyPolicy(evalMatrix[:, idx_output], evalMatrix[:, idx_price], evalMatrix[:, idx_state],
+                                              departureOffsets, latestBuyDate)
+        avgPrice = np.sum(chosenPrices) * 1.0 / departureLen
         print "One Time avg price: {}".format(avgPrice)
         return avgPrice
 
 
 
-    def evaluateOneRouteForMultipleTimes(self, filePrefix, priceTolerance=0, timesToRun=1):
+    def evaluateOneRouteForMultipleTimes(self, filePrefix, priceTolerance=0, timesToRun=1, processes=1):
         """
         Rune the evaluation for the given route and run it multiple times(e.g. 100), to get the avarage performance
         :param filePrefix: route prefix
+        :param priceTolerance: price to be tolerated
         :param timesToRun: the times to run the evaluation, and get the average.
+        :param processes: number of worker processes for the runs of the neural network
         :return: average price
         """
-        # perform fit and predict
-        self.training()
-        self.predict()
-
-
         # route index
         flightNum = self.routes.index(filePrefix)
 
@@ -470,13 +421,15 @@ class RegressionBase(object):
         timesToRun = 1 # if it is neural network, please change this number to 20 or more
         if self.isNN:
             timesToRun = 20
-        totalPrice = 0
-        for i in range(timesToRun):
-            np.random.seed(i*i*i) # do not forget to set seed for the weight initialization
-            price = self.evaluateOneRoute(filePrefix, priceTolerance)
-            totalPrice += price
-
-        avgPrice = totalPrice * 1.0 / timesToRun
+            # every run fits the network with its own seed, see util.evaluateSeeds
+            avgPrices = util.evaluateSeeds(self, [i*i*i for i in range(timesToRun)], processes,
+                                           priceTolerance=priceTolerance)
+            avgPrice = np.mean(avgPrices[:, flightNum])
+        else:
+            # fit and predict
+            self.training()
+            self.predict()
+            avgPrice = self.evaluateOneRoute(filePrefix, priceTolerance)
 
 
         """
@@ -486,8 +439,16 @@ class RegressionBase(object):
         print "Random price: {}".format(randomPrice)
         return avgPrice
         """
+        return self.getPerformance(flightNum, avgPrice)
+
+    def getPerformance(self, flightNum, avgPrice):
+        """
+        Print the performance of the average price of a route, compared with its minimum, maximum and random price
+        :param flightNum: route index
+        :param avgPrice: average predicted price of the route
+        :return: (performance, normalized performance)
+        """
         if self.isTrain:
-            #print "20 times avg price: {}".format(avgPrice)
             print "TRAIN:"
             print "minimumPrice: {}".format(self.minPrices_train[flightNum])
             print "maximumPrice: {}".format(self.maxPrices_train[flightNum])
@@ -501,7 +462,6 @@ class RegressionBase(object):
             normalizedPefor = performance / maxPerformance * 100
             print "Normalized perfor: {}%".format(round(normalizedPefor,2))
         else:
-            #print "20 times avg price: {}".format(avgPrice)
             print "TEST:"
             print "minimumPrice: {}".format(self.minPrices_test[flightNum])
             print "maximumPrice: {}".format(self.maxPrices_test[flightNum])
@@ -517,10 +477,98 @@ class RegressionBase(object):
 
         return (performance, normalizedPefor)
 
-    def evaluateAllRroutes(self):
+    def getRouteAvgPrices(self, priceTolerance=0):
+        """
+        Evaluate all the routes at once from the same prediction, see evaluateOneRoute
+        :param priceTolerance: price to be tolerated, or an array of price tolerances to evaluate at once
+        :return: average price of every route, a (price tolerances x routes) matrix for an array
+        """
+        rows, departureOffsets, departureDates, routeDepartureOffsets = self.getSegmentIndex()
+        y_test_price = self.y_test_price.reshape(-1)[rows]
+        y_pred = self.y_pred.reshape(-1)[rows]
+        # to indicate whether buy or not, one row per price tolerance
+        priceTolerance = np.asarray(priceTolerance, dtype=np.float64)
+        y_buy = (y_test_price < y_pred + priceTolerance[..., np.newaxis]).astype(np.float64)
+
+        latestBuyDate = 11 # define the latest buy date state
+        chosenPrices = util.simulateBuyPolicy(y_buy, y_test_price, self.X_test[rows, self.schema.index("state")],
+                                              departureOffsets, latestBuyDate, routeDepartureOffsets)
+        return util.getRouteAvgPrices(chosenPrices, routeDepartureOffsets)
+
+    def sweepPriceTolerance(self, priceTolerances):
+        """
+        Evaluate all the routes for every price tolerance at once, from the same prediction,
+        so the price tolerance is tuned with one fit
+        :param priceTolerances: price tolerances to evaluate
+        :return: (avgPrices, performances, normalizedPerformances), (price tolerances x routes) matrices
+        """
+        avgPrices = self.getRouteAvgPrices(np.asarray(priceTolerances, dtype=np.float64).reshape(-1))
+        performances, normalizedPerformances = self.getPerformances(avgPrices)
+        return avgPrices, performances, normalizedPerformances
+
+    def getPerformances(self, avgPrices):
+        """
+        Get the performance of the average prices of all the routes at once, see getPerformance
+        :param avgPrices: average predicted price of every route, the last axis is the route
+        :return: (performance, normalized performance), with the shape of avgPrices
+        """
+        if self.isTrain:
+            minPrices = np.asarray(self.minPrices_train)
+            randomPrices = np.asarray(self.randomPrices_train)
+        else:
+            minPrices = np.asarray(self.minPrices_test)
+            randomPrices = np.asarray(self.randomPrices_test)
+
+        performance = (randomPrices - avgPrices) / randomPrices * 100
+        maxPerformance = (randomPrices - minPrices) / randomPrices * 100
+        normalizedPefor = performance / maxPerformance * 100
+        return performance, normalizedPefor
+
+    def evaluateMultipleSeeds(self, seeds=None, processes=1, priceTolerance=0):
+        """
+        Fit and evaluate the model once per seed(e.g. the neural network), the seeds run in worker processes,
+        print the mean and the variance over the seeds for every route
+        :param seeds: seed of every run, None for the 20 seeds of the neural network
+        :param processes: number of worker processes
+        :param priceTolerance: price to be tolerated
+        :return: per-route table, one (route, avgPrice, performance, normalizedPerformance) per route,
+            every measure is a (mean, variance) pair over the seeds
+        """
+        if seeds is None:
+            seeds = [i*i*i for i in range(20)]
+        avgPrices = util.evaluateSeeds(self, seeds, processes, priceTolerance=priceTolerance)
+        return self.getSeedRouteTable(avgPrices)
+
+    def getSeedRouteTable(self, avgPrices):
+        """
+        Print the mean and the variance over the seeds of the performance of every route
+        :param avgPrices: average price of every (seed, route), see util.evaluateSeeds
+        :return: per-route table, one (route, avgPrice, performance, normalizedPerformance) per route,
+            every measure is a (mean, variance) pair over the seeds
+        """
+        performances, normalizedPerformances = self.getPerformances(avgPrices)
+
+        routeTable = []
+        for i in range(len(self.routes)):
+            measures = [(np.mean(measure[:, i]), np.var(measure[:, i]))
+                        for measure in [avgPrices, performances, normalizedPerformances]]
+            routeTable.append(tuple([self.routes[i]] + measures))
+            print "Route: {}".format(self.routes[i])
+            print "avgPredPrice: {}, variance: {}".format(measures[0][0], measures[0][1])
+            print "Performance: {}%, variance: {}".format(round(measures[1][0],2), measures[1][1])
+            print "Normalized perfor: {}%, variance: {}".format(round(measures[2][0],2), measures[2][1])
+
+        return routeTable
+
+    def evaluateAllRroutes(self, processes=1):
         """
         Evaluate all the routes, print the performance for every route
         and the average performance for all the routes.
+        The model is fit and predicts once(once per run for the neural network),
+        every route is evaluated from the same prediction.
+        :param processes: number of worker processes for the runs of the neural network
+        :return: per-route table, one (route, avgPrice, performance, normalizedPerformance) per route,
+            for the neural network every measure is a (mean, variance) pair over the runs, see getSeedRouteTable
         """
         isTrain = 1 # 1 for train, 0 for test
 
@@ -528,10 +576,24 @@ class RegressionBase(object):
         normalizedPerformance = 0
         priceTolerance = 5 # price to be tolerated
 
+        if self.isNN:
+            timesToRun = 20
+            # every run fits the network with its own seed, see util.evaluateSeeds
+            seedAvgPrices = util.evaluateSeeds(self, [i*i*i for i in range(timesToRun)], processes,
+                                               priceTolerance=priceTolerance)
+            avgPrices = np.mean(seedAvgPrices, axis=0)
+        else:
+            # perform fit and predict
+            self.training()
+            self.predict()
+            avgPrices = self.getRouteAvgPrices(priceTolerance)
+
         normPerforms = []
+        routeTable = []
         for i in range(8):
             print "Route: {}".format(i)
-            [perfor, normaPerfor] = self.evaluateOneRouteForMultipleTimes(self.routes[i], priceTolerance)
+            [perfor, normaPerfor] = self.getPerformance(i, avgPrices[i])
+            routeTable.append((self.routes[i], avgPrices[i], perfor, normaPerfor))
             normPerforms.append(normaPerfor)
             performance += perfor
             normalizedPerformance += normaPerfor
@@ -547,3 +609,8 @@ class RegressionBase(object):
         print "Average Normalized Performance: {}%".format(normalizedPerformance)
         print "Normalized Performance Variance: {}".format(np.var(normPerforms))
 
+        if self.isNN:
+            # the mean and the variance over the runs
+            return self.getSeedRouteTable(seedAvgPrices)
+        return routeTable
+
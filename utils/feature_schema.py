@@ -0,0 +1,118 @@
+# system-library
+import numpy as np
+
+"""
+Named columns of the feature matrices, shared by every stage of the pipeline,
+so a stage asks for "state" instead of column 9(specific) or 13(general).
+"""
+# features after the flight number dummy variables, in the classification input
+classificationFeatures = ["departureDate", # departure date interval from "20151109"
+                          "state",         # observed days before departure date
+                          "minimumPrice",  # minimum price before the observed date
+                          "maximumPrice"]  # maximum price before the observed date
+
+# the regression input has one more feature than classification
+regressionFeatures = classificationFeatures + ["price"] # current price
+
+# the qlearning input
+qlearningFeatures = ["departureDate", "state", "price"]
+
+# columns appended to an input to get the evaluation matrix
+outputFeatures = ["output",      # buy or wait(classification), predicted minimum price(regression)
+                  "outputPrice"] # current price
+
+
+class FeatureSchema(object):
+    """
+    The columns of a feature matrix: one flight number dummy variable per route, then the named features.
+    e.g. for the specific classification input:
+    feature 0~7: flight number dummy variables
+    feature 8: departure date; feature 9: observed date state;
+    feature 10: minimum price; feature 11: maximum price
+    """
+    def __init__(self, routes, features):
+        self.routes = list(routes)
+        self.features = list(features)
+        self.columns = self.routes + self.features
+
+    def __len__(self):
+        return len(self.columns)
+
+    def index(self, name):
+        """
+        Get the column index of a feature, or of the dummy variable of a route
+        :param name: feature name or route prefix
+        :return: column index
+        """
+        return self.columns.index(name)
+
+    def indexs(self, names):
+        """
+        Get the column indexs of the features
+        """
+        return [self.index(name) for name in names]
+
+    def routeIndex(self, filePrefix):
+        """
+        Get the route index, i.e. the column of its dummy variable
+        """
+        return self.routes.index(filePrefix)
+
+    def append(self, features):
+        """
+        Get the schema of the matrix with the features appended as the last columns
+        """
+        return FeatureSchema(self.routes, self.features + list(features))
+
+    def prune(self, features, isRoutes=True):
+        """
+        Get the schema of the matrix which only keeps the given features
+        :param features: kept features, in this order
+        :param isRoutes: keep the flight number dummy variables or not
+        """
+        return FeatureSchema(self.routes if isRoutes else [], features)
+
+    def select(self, matrix, features, isRoutes=True):
+        """
+        Choose the columns of the given features of a matrix of this schema
+        :return: matrix of the schema self.prune(features, isRoutes)
+        """
+        return matrix[:, self.indexs(self.prune(features, isRoutes).columns)]
+
+    def load(self, filePath, features=None, isRoutes=True):
+        """
+        Load a saved matrix of this schema, only the given features are copied into memory,
+        the file is memory-mapped.
+        :param filePath: .npy file
+        :param features: kept features, None to keep all the features
+        :param isRoutes: keep the flight number dummy variables or not
+        :return: matrix of the schema self.prune(features, isRoutes)
+        """
+        matrix = np.load(filePath, mmap_mode='r')
+        if features is None:
+            features = self.features
+        return self.select(matrix, features, isRoutes)
+
+def get_classification_schema(routes):
+    """
+    Schema of the classification input
+    """
+    return FeatureSchema(routes, classificationFeatures)
+
+def get_regression_schema(routes):
+    """
+    Schema of the regression input
+    """
+    return FeatureSchema(routes, regressionFeatures)
+
+def get_qlearning_schema(routes):
+    """
+    Schema of the qlearning input
+    """
+    return FeatureSchema(routes, qlearningFeatures)
+
+def get_evaluation_schema(schema):
+    """
+    Schema of the evaluation matrix of an input: input, output, output price
+    """
+    return schema.append(outputFeatures)
@@ -1,10 +1,16 @@
 # system-library
 import json
 import os
+import cPickle
+import hashlib
+import shutil
+import multiprocessing
+from datetime import datetime
 import numpy as np
 
 # user-library
 import util as util
+import feature_schema
 
 """
 # data prepare for the specific data set
@@ -90,48 +96,615 @@ def check_if_only_one_flightNum(datas):
 
 
 
-def load_data_with_prefix_and_dataset(filePrefix="BCN_BUD", dataset="Specific"):
+def get_routes_for_dataset(dataset="Specific"):
     """
-    load the data in the 'dataset' with 'filePrefix'
-    :param filePrefix: choose which route
+    Get the default route prefixes of the dataset
     :param dataset: dataset name('Specific' or 'General')
-    :return: decoded data
+    :return: route prefixes
+    """
+    if dataset == "General":
+        return routes_general
+    return routes_specific
+
+def get_currency_for_routes(routes, dataset="Specific"):
+    """
+    Get the rate to Euro for every route, routes with unknown currency are kept as they are
+    :param routes: route prefixes
+    :param dataset: dataset name('Specific' or 'General')
+    :return: currency rate list, same order as routes
+    """
+    if dataset == "General":
+        rates = dict(zip(routes_general, currency_general))
+    else:
+        rates = dict(zip(routes_specific, currency_specific))
+
+    return [rates.get(route, 1) for route in routes]
+
+def iter_snapshot_entries(fp, chunkSize=65536):
+    """
+    Read the top level json array of a snapshot file entry by entry, so only one chunk of the file
+    and the current entry are kept in memory, instead of the whole decoded file.
+    The null entries are filtered out.
+    :param fp: opened snapshot file
+    :param chunkSize: bytes read from the file at a time
+    :return: generator of the non-null entries, raise ValueError if the file is not a json array
+    """
+    decoder = json.JSONDecoder()
+    whitespace = " \t\n\r"
+    buffer = ""
+    pos = 0
+    isEof = False
+    expect = "[" # "[": start of the array; "entry": an entry or "]"; "value": an entry; ",": "," or "]"; "": nothing
+    while True:
+        while pos < len(buffer) and buffer[pos] in whitespace:
+            pos += 1
+        if pos == len(buffer):
+            if isEof:
+                if expect != "":
+                    raise ValueError("Unexpected end of the snapshot file")
+                return
+            chunk = fp.read(chunkSize)
+            isEof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        if expect == "":
+            raise ValueError("Extra data after the snapshot array")
+        if expect == "[":
+            if buffer[pos] != "[":
+                raise ValueError("The snapshot file is not a json array")
+            expect = "entry"
+            pos += 1
+            continue
+        if expect == "," or (expect == "entry" and buffer[pos] == "]"):
+            if buffer[pos] == "]":
+                expect = ""
+            elif buffer[pos] == "," and expect == ",":
+                expect = "value"
+            else:
+                raise ValueError("Expecting , or ] in the snapshot file")
+            pos += 1
+            continue
+
+        # decode one entry, it is accepted when it is followed by something, so that it is not cut by the chunk
+        try:
+            entry, end = decoder.raw_decode(buffer, pos)
+            nextPos = end
+            while nextPos < len(buffer) and buffer[nextPos] in whitespace:
+                nextPos += 1
+            isComplete = nextPos < len(buffer) or isEof
+        except ValueError:
+            if isEof:
+                raise
+            isComplete = False
+        if isComplete:
+            pos = end
+            expect = ","
+            if is_not_nullprice(entry):
+                yield entry
+            continue
+
+        # read more of the file
+        chunk = fp.read(chunkSize)
+        isEof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+def parse_snapshot_files(args):
+    """
+    Parse the snapshot files of one observed date directory into typed columns.
+    It is a module level function, so that it can be sent to the worker processes.
+    :param args: (datasetPath, date, files), date is the observed date directory name
+    :return: columns(dict) of every file, the same order as files; None if it is not a json file
+        "departure": departure date ordinal; "observed": observed date ordinal;
+        "state": observed days before departure; "localPrice": price in the route currency;
+        "currencies": currency symbols in the file
+    """
+    datasetPath, date, files = args
+    currentPath = datasetPath + "/" + date
+    observedDate = util.getDateOrdinal(date.replace("-", ""))
+
+    fileColumns = []
+    for file in files:
+        # stream the non-null entries, only the departure dates and prices are kept
+        departureDates = []
+        prices = []
+        try:
+            with open(os.path.join(currentPath, file), 'r') as fp:
+                for data in iter_snapshot_entries(fp):
+                    departureDates.append(data["Date"]) #"Date" is the departure date
+                    prices.append(data["MinimumPrice"])
+        except ValueError:
+            print "Not a json file"
+            fileColumns.append(None)
+            continue
+
+        departure = util.getDateOrdinals(departureDates)
+        observed = np.empty(departure.shape, dtype=np.int32)
+        observed.fill(observedDate)
+        # parse all the prices of the file at once
+        localPrice, currencies = util.getPrices(prices)
+        fileColumns.append({"departure": departure,
+                            "observed": observed,
+                            "state": np.abs(departure - observed) - 1,
+                            "localPrice": localPrice,
+                            "currencies": sorted(set(currencies))})
+
+    return fileColumns
+
+def map_jobs(function, jobs, processes=1):
+    """
+    Run the function on every job, in worker processes or in this process
+    :param function: module level function, so that it can be sent to the worker processes
+    :param jobs: arguments of every call
+    :param processes: number of worker processes, 1 to run the jobs in this process
+    :return: results of the jobs, in the order of the jobs
+    """
+    if processes > 1 and len(jobs) > 1:
+        # pool.map keeps the order of the jobs
+        pool = multiprocessing.Pool(min(processes, len(jobs)))
+        try:
+            return pool.map(function, jobs)
+        finally:
+            pool.close()
+            pool.join()
+    return map(function, jobs)
+
+# change it when the manifest entries change
+snapshotManifestVersion = 1
+
+def get_snapshot_manifest_path(dataset="Specific"):
+    """
+    The snapshot manifest of 'dataset' is kept in utils/data/<dataset>.manifest
     """
     currentDir = os.path.dirname(os.path.realpath(__file__))
-    observeDatesDirs = os.listdir(currentDir + "/data/" + dataset) # path directory of each observed date in the dataset
+    return currentDir + "/data/" + dataset + ".manifest"
 
-    filePaths = [] # keep all the file paths start with "filePrefix"
-    data_decoded = [] # keep all the schedules start with "filePrefix"
+def get_snapshot_route(file):
+    """
+    Get the route of a snapshot file from its name, e.g. "BCN_BUD" of "BCN_BUD_20151109.json"
+    :param file: file name
+    :return: route, None if it is not a snapshot file
+    """
+    name, extension = os.path.splitext(file)
+    if extension != ".json":
+        return None
 
-    for date in observeDatesDirs:
-        currentPath = currentDir + "/data/" + dataset + "/" + date
+    # the route is the first two adjacent airport codes in the name
+    codes = name.split("_")
+    for i in range(len(codes)-1):
+        if all(len(code) == 3 and code.isalpha() and code.isupper() for code in codes[i:i+2]):
+            return codes[i] + "_" + codes[i+1]
+    return None
 
-        try:
-            files = os.listdir(currentPath) # file names in currect date directory
-            for file in files:
-                try:
-                    if filePrefix in file:
-                        filePath = os.path.join(currentPath, file)
-                        filePaths.append(filePath)
-
-                        fp = open(filePath, 'r')
-                        datas_with_specific_date = json.load(fp)
-                        # add observed data
-                        for data in datas_with_specific_date:
-                            #"Date" is the departure date, "ObservedDate" is the observed date
-                            data["ObservedDate"] = date.replace("-", "")
-                            data["State"] = util.days_between(data["Date"], data["ObservedDate"]) - 1
-                        data_decoded += datas_with_specific_date # do not use append function
-
-                except:
-                    print "Not a json file"
-        except:
+def get_file_checksum(filePath):
+    """
+    Get the md5 checksum of the file
+    """
+    md5 = hashlib.md5()
+    with open(filePath, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), ""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+def load_snapshot_manifest(dataset="Specific"):
+    """
+    Scan the 'dataset' once and list its snapshot files, so the loaders only open the files they need.
+    The checksum of a file is only computed again when its size or mtime changed since the last scan.
+    :param dataset: dataset name('Specific' or 'General')
+    :return: list of (file path relative to the dataset, route, observed date ordinal, size, mtime, checksum),
+        in the order the dataset is walked
+    """
+    currentDir = os.path.dirname(os.path.realpath(__file__))
+    datasetPath = currentDir + "/data/" + dataset
+    manifestPath = get_snapshot_manifest_path(dataset)
+
+    previousManifest = []
+    if os.path.exists(manifestPath):
+        with open(manifestPath, 'r') as fp:
+            meta = json.load(fp)
+        if meta.get("version") == snapshotManifestVersion:
+            previousManifest = [(str(filePath), str(route), observedDate, size, mtime, str(checksum))
+                                for filePath, route, observedDate, size, mtime, checksum in meta["files"]]
+    previousEntries = dict((entry[0], entry) for entry in previousManifest)
+
+    manifest = []
+    for date in os.listdir(datasetPath): # path directory of each observed date in the dataset
+        currentPath = datasetPath + "/" + date
+        if not os.path.isdir(currentPath):
             print "Not a directory, MAC OS contains .DS_Store file."
+            continue
+        try:
+            observedDate = util.getDateOrdinal(date.replace("-", ""))
+        except ValueError:
+            print "Not an observed date directory: " + date
+            continue
+
+        for file in os.listdir(currentPath): # file names in currect date directory
+            route = get_snapshot_route(file)
+            if route is None:
+                continue
+            filePath = date + "/" + file
+            fileStat = os.stat(os.path.join(currentPath, file))
+            previousEntry = previousEntries.get(filePath)
+            if previousEntry is not None and previousEntry[3:5] == (fileStat.st_size, fileStat.st_mtime):
+                checksum = previousEntry[5]
+            else:
+                checksum = get_file_checksum(os.path.join(currentPath, file))
+            manifest.append((filePath, route, observedDate, fileStat.st_size, fileStat.st_mtime, checksum))
+
+    if manifest != previousManifest:
+        with open(manifestPath + ".tmp", 'w') as fp:
+            json.dump({"version": snapshotManifestVersion, "files": manifest}, fp)
+        os.rename(manifestPath + ".tmp", manifestPath)
 
-    # filter the null entries
-    data_decoded = filter(is_not_nullprice, data_decoded)
+    return manifest
 
-    return data_decoded
+def is_route_file(route, filePrefix):
+    """
+    Check whether the snapshot file of 'route' belongs to the route prefix,
+    e.g. "BCN_BUD" belongs to "BCN_BUD" and "BCN", but not to "CN_BU"
+    """
+    return route == filePrefix or route.startswith(filePrefix + "_")
+
+# change it when the cached columns change
+snapshotCacheVersion = 4
+
+def get_snapshot_cache_path(dataset="Specific"):
+    """
+    The parsed snapshots of 'dataset' are cached in utils/data/<dataset>.cache
+    """
+    currentDir = os.path.dirname(os.path.realpath(__file__))
+    return currentDir + "/data/" + dataset + ".cache"
+
+def load_snapshot_cache(dataset="Specific"):
+    """
+    Load the parsed snapshot cache of the dataset
+    :return: dict, key: file path relative to the dataset; value: (checksum, columns)
+    """
+    cachePath = get_snapshot_cache_path(dataset)
+    if not os.path.exists(cachePath):
+        return {}
+    try:
+        with open(cachePath, 'rb') as fp:
+            cache = cPickle.load(fp)
+    except (EOFError, cPickle.UnpicklingError):
+        print "Broken snapshot cache, parse the dataset again."
+        return {}
+    if not isinstance(cache, dict) or cache.get("version") != snapshotCacheVersion:
+        return {}
+
+    return cache["files"]
+
+def save_snapshot_cache(cache, dataset="Specific"):
+    """
+    Save the parsed snapshot cache of the dataset, replace the old one in one step.
+    """
+    cachePath = get_snapshot_cache_path(dataset)
+    with open(cachePath + ".tmp", 'wb') as fp:
+        cPickle.dump({"version": snapshotCacheVersion, "files": cache}, fp, cPickle.HIGHEST_PROTOCOL)
+    os.rename(cachePath + ".tmp", cachePath)
+
+# change it when the store columns change
+snapshotStoreVersion = 4
+
+# the column files of the observation store, and their types
+storeColumns = [("route", np.int16),
+                ("departure", np.int32),
+                ("observed", np.int32),
+                ("state", np.int32),
+                ("price", np.float64),
+                ("localPrice", np.float64),
+                ("routeOffsets", np.int64),
+                ("departureRows", np.int64),
+                ("departureOffsets", np.int64),
+                ("departureDates", np.int32),
+                ("routeDepartureOffsets", np.int64)]
+
+def get_snapshot_store_path(dataset="Specific", routes=None):
+    """
+    The observation store of 'dataset' is the directory utils/data/<dataset>.store,
+    if the routes are not the default ones of the dataset, the directory name contains their hash.
+    """
+    currentDir = os.path.dirname(os.path.realpath(__file__))
+    if routes is None or list(routes) == get_routes_for_dataset(dataset):
+        return currentDir + "/data/" + dataset + ".store"
+    return currentDir + "/data/" + dataset + "_" + hashlib.md5("|".join(routes)).hexdigest()[0:8] + ".store"
+
+def save_column_directory(path, columns, columnTypes, meta):
+    """
+    Save the columns as one .npy file per column and the meta data as store.json in the directory 'path',
+    the old directory is replaced in one step.
+    :param columns: dict of the columns
+    :param columnTypes: [(column, dtype)] of the saved columns
+    :param meta: json serializable dict
+    """
+    tmpPath = path + ".tmp"
+    if os.path.exists(tmpPath):
+        shutil.rmtree(tmpPath)
+    os.mkdir(tmpPath)
+    for column, dtype in columnTypes:
+        np.save(tmpPath + "/" + column + ".npy", np.asarray(columns[column], dtype=dtype))
+    with open(tmpPath + "/store.json", 'w') as fp:
+        json.dump(meta, fp)
+
+    # replace the old directory
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.rename(tmpPath, path)
+
+def open_column_directory(path, columnTypes, version):
+    """
+    Open a directory saved by save_column_directory, the columns are memory-mapped, read only.
+    :param version: expected meta["version"]
+    :return: (columns, meta), None if there is no directory or it has another version
+    """
+    if not os.path.exists(path + "/store.json"):
+        return None
+    with open(path + "/store.json", 'r') as fp:
+        meta = json.load(fp)
+    if meta.get("version") != version:
+        return None
+
+    columns = {}
+    for column, dtype in columnTypes:
+        columns[column] = np.load(path + "/" + column + ".npy", mmap_mode='r')
+
+    return columns, meta
+
+def save_snapshot_store(table, sources, storePath):
+    """
+    Save the columnar table as one .npy file per column, and the snapshot files it is built from.
+    :param table: table from load_snapshot_table
+    :param sources: [(file path relative to the dataset, checksum)]
+    :param storePath: store directory
+    """
+    save_column_directory(storePath, table, storeColumns,
+                          {"version": snapshotStoreVersion, "routes": table["routes"], "currencies": table["currencies"],
+                           "routeSources": table["routeSources"], "sources": sources})
+
+def open_snapshot_store(storePath):
+    """
+    Open the observation store, the columns are memory-mapped, read only.
+    :param storePath: store directory
+    :return: (table, sources), None if there is no store
+    """
+    store = open_column_directory(storePath, storeColumns, snapshotStoreVersion)
+    if store is None:
+        return None
+    table, meta = store
+
+    table["routes"] = [str(route) for route in meta["routes"]]
+    table["currencies"] = meta["currencies"]
+    table["routeSources"] = get_route_sources(meta["routeSources"])
+    sources = [(str(filePath), str(checksum)) for filePath, checksum in meta["sources"]]
+
+    return table, sources
+
+def get_route_sources(routeSources):
+    """
+    Get the route sources read from json as tuples, see load_snapshot_table
+    """
+    return [[(str(filePath), str(checksum), int(rows)) for filePath, checksum, rows in files] for files in routeSources]
+
+def build_departure_index(departure, routeOffsets):
+    """
+    Group the rows of every route by departure date, so that the rows of one (route, departure date)
+    pair are a contiguous range of the index.
+    :param departure: departure date ordinal of every row
+    :param routeOffsets: the rows of route i are routeOffsets[i]:routeOffsets[i+1]
+    :return: (departureRows, departureOffsets, departureDates, routeDepartureOffsets)
+        the rows of departure group g are departureRows[departureOffsets[g]:departureOffsets[g+1]], in table order;
+        departureDates[g] is the departure date ordinal of group g;
+        the groups of route i are routeDepartureOffsets[i]:routeDepartureOffsets[i+1],
+        in the order their departure dates are first observed
+    """
+    departureRows = [np.empty(0, dtype=np.int64)]
+    groupLens = [np.empty(0, dtype=np.int64)]
+    departureDates = [np.empty(0, dtype=np.int32)]
+    routeDepartureLens = []
+    for i in range(len(routeOffsets)-1):
+        start, end = routeOffsets[i], routeOffsets[i+1]
+        distinctDates, firstIndexs, inverse = np.unique(departure[start:end], return_index=True, return_inverse=True)
+        # number the departure dates by the first time they are observed
+        firstOrder = np.argsort(firstIndexs)
+        groupIds = np.empty(len(distinctDates), dtype=np.int64)
+        groupIds[firstOrder] = np.arange(len(distinctDates))
+        groupIds = groupIds[inverse]
+
+        departureRows.append(start + np.argsort(groupIds, kind='mergesort'))
+        groupLens.append(np.bincount(groupIds, minlength=len(distinctDates)))
+        departureDates.append(distinctDates[firstOrder])
+        routeDepartureLens.append(len(distinctDates))
+
+    departureRows = np.concatenate(departureRows).astype(np.int64)
+    departureOffsets = np.cumsum([0] + list(np.concatenate(groupLens))).astype(np.int64)
+    departureDates = np.concatenate(departureDates).astype(np.int32)
+    routeDepartureOffsets = np.cumsum([0] + routeDepartureLens).astype(np.int64)
+
+    return departureRows, departureOffsets, departureDates, routeDepartureOffsets
+
+# keep the columnar tables in memory, key: (dataset, routes)
+snapshotTables = {}
+
+def load_snapshot_table(dataset="Specific", routes=None, isRefresh=False, processes=1, isCached=True):
+    """
+    Walk the 'dataset' once and parse every snapshot file once, for all the routes.
+    :param dataset: dataset name('Specific' or 'General')
+    :param routes: route prefixes, default is all the routes of the dataset
+    :param isRefresh: walk the dataset again even if the table is already loaded
+    :param processes: number of worker processes parsing the observed date directories,
+        1 to parse them in this process. The table is the same for any number of processes.
+    :param isCached: keep the parsed snapshots in utils/data/<dataset>.cache,
+        then only the new or changed files(by checksum in the manifest) are parsed.
+        The table is also kept in the observation store utils/data/<dataset>.store,
+        and its columns are memory-mapped instead of loaded.
+    :return: columnar table(dict), one row per observation:
+        "routes": route prefixes, the route id is the index in it
+        "route": route id; "departure": departure date ordinal;
+        "observed": observed date ordinal; "state": observed days before departure;
+        "price": price in Euro; "localPrice": price in the route currency;
+        "routeOffsets": the rows of route i are routeOffsets[i]:routeOffsets[i+1];
+        "departureRows", "departureOffsets", "departureDates", "routeDepartureOffsets":
+            the (route, departure date) index, see build_departure_index;
+        "currencies": currency symbols found in the prices of every route;
+        "routeSources": the snapshot files of every route, [(file path, checksum, rows)] in table order
+    """
+    if routes is None:
+        routes = get_routes_for_dataset(dataset)
+    key = (dataset, tuple(routes))
+    if key in snapshotTables and not isRefresh:
+        return snapshotTables[key]
+
+    currentDir = os.path.dirname(os.path.realpath(__file__))
+    datasetPath = currentDir + "/data/" + dataset
+    manifest = load_snapshot_manifest(dataset)
+
+    # find the snapshot files of the routes
+    snapshotFiles = [] # (file path relative to the dataset, route ids, checksum)
+    observeDatesDirs = [] # observed date directories, in the walk order
+    for filePath, fileRoute, observedDate, size, mtime, checksum in manifest:
+        # one file can match several route prefixes, but it is only parsed once
+        routeIds = [i for i in range(len(routes)) if is_route_file(fileRoute, routes[i])]
+        if routeIds:
+            snapshotFiles.append((filePath, routeIds, checksum))
+            date = filePath.split("/")[0]
+            if not observeDatesDirs or observeDatesDirs[-1] != date:
+                observeDatesDirs.append(date)
+    sources = [(filePath, checksum) for filePath, routeIds, checksum in snapshotFiles]
+
+    # nothing changed since the store was built, just map it
+    storePath = get_snapshot_store_path(dataset, routes)
+    if isCached:
+        store = open_snapshot_store(storePath)
+        if store is not None and store[0]["routes"] == list(routes) and store[1] == sources:
+            snapshotTables[key] = store[0]
+            return store[0]
+
+    # only parse the files which are not in the cache, or changed since they were cached
+    cache = load_snapshot_cache(dataset) if isCached else {}
+    staleFiles = {}
+    for filePath, routeIds, checksum in snapshotFiles:
+        if filePath not in cache or cache[filePath][0] != checksum:
+            date, file = filePath.split("/")
+            staleFiles.setdefault(date, []).append(file)
+
+    jobs = [(datasetPath, date, staleFiles[date]) for date in observeDatesDirs if date in staleFiles]
+    jobColumns = map_jobs(parse_snapshot_files, jobs, processes)
+
+    parsedFiles = {}
+    for (datasetPath, date, files), fileColumns in zip(jobs, jobColumns):
+        for file, columns in zip(files, fileColumns):
+            parsedFiles[date + "/" + file] = columns
+
+    # merge in the walk order, so the table does not depend on the cache or the processes
+    routeColumns = [[] for route in routes] # keep the file columns of every route
+    routeSources = [[] for route in routes] # and where they come from
+    for filePath, routeIds, checksum in snapshotFiles:
+        if filePath in parsedFiles:
+            cache[filePath] = (checksum, parsedFiles[filePath])
+        columns = cache[filePath][1]
+        if columns is None:
+            continue
+        for routeId in routeIds:
+            routeColumns[routeId].append(columns)
+            routeSources[routeId].append((filePath, checksum, len(columns["state"])))
+
+    if isCached:
+        # evict the deleted files
+        existingFiles = set(entry[0] for entry in manifest)
+        deletedFiles = [filePath for filePath in cache if filePath not in existingFiles]
+        for filePath in deletedFiles:
+            del cache[filePath]
+        if parsedFiles or deletedFiles:
+            save_snapshot_cache(cache, dataset)
+
+    # build the columns, rows are grouped by route
+    fileColumns = [columns for routeFiles in routeColumns for columns in routeFiles]
+    routeOffsets = np.cumsum([0] + [sum(len(columns["state"]) for columns in routeFiles) for routeFiles in routeColumns])
+    route = np.repeat(np.arange(len(routes)), np.diff(routeOffsets)).astype(np.int16)
+
+    table = {"routes": list(routes), "route": route, "routeOffsets": routeOffsets, "routeSources": routeSources,
+             "currencies": [sorted(set(currency for columns in routeFiles for currency in columns["currencies"])) for routeFiles in routeColumns]}
+    for column in ["departure", "observed", "state", "localPrice"]:
+        table[column] = np.concatenate([np.empty(0, dtype=dict(storeColumns)[column])] + [columns[column] for columns in fileColumns])
+    table["price"] = table["localPrice"] * np.array(get_currency_for_routes(routes, dataset), dtype=np.float64)[route]
+    table["departureRows"], table["departureOffsets"], table["departureDates"], table["routeDepartureOffsets"] = \
+        build_departure_index(table["departure"], routeOffsets)
+
+    if isCached:
+        save_snapshot_store(table, sources, storePath)
+        table = open_snapshot_store(storePath)[0]
+    snapshotTables[key] = table
+
+    return table
+
+def get_route_rows(table, filePrefix):
+    """
+    Get the row range of one route in the columnar table
+    :param table: table from load_snapshot_table
+    :param filePrefix: route prefix
+    :return: (start, end), the rows of the route are start:end
+    """
+    routeId = table["routes"].index(filePrefix)
+    return table["routeOffsets"][routeId], table["routeOffsets"][routeId+1]
+
+# keep the date strings, key: date ordinal
+dateStrings = {}
+
+def get_date_string(ordinal):
+    """
+    Get the date string("%Y%m%d") of the date ordinal
+    """
+    if ordinal not in dateStrings:
+        dateStrings[ordinal] = datetime.fromordinal(ordinal).strftime("%Y%m%d")
+    return dateStrings[ordinal]
+
+def get_records(table, indexs):
+    """
+    Build the observation entries of the given rows, the raw json entries are not kept,
+    so they only have the fields used here: "Date", "ObservedDate", "State",
+    and "MinimumPrice" which is already a number(in the route currency).
+    :param table: table from load_snapshot_table
+    :param indexs: row indexs in the table
+    :return: decoded data
+    """
+    departure = table["departure"][indexs]
+    observed = table["observed"][indexs]
+    state = table["state"][indexs]
+    localPrice = table["localPrice"][indexs]
+
+    records = []
+    for i in range(len(state)):
+        records.append({"Date": get_date_string(int(departure[i])),
+                        "ObservedDate": get_date_string(int(observed[i])),
+                        "State": int(state[i]),
+                        "MinimumPrice": float(localPrice[i])})
+    return records
+
+def load_route_table(filePrefix="BCN_BUD", dataset="Specific"):
+    """
+    Get the columnar table containing the route, walk the dataset only if it is not loaded yet
+    :param filePrefix: choose which route
+    :param dataset: dataset name('Specific' or 'General')
+    :return: table from load_snapshot_table
+    """
+    if filePrefix in get_routes_for_dataset(dataset):
+        return load_snapshot_table(dataset)
+    return load_snapshot_table(dataset, [filePrefix])
+
+def load_data_with_prefix_and_dataset(filePrefix="BCN_BUD", dataset="Specific"):
+    """
+    load the data in the 'dataset' with 'filePrefix'
+    :param filePrefix: choose which route
+    :param dataset: dataset name('Specific' or 'General')
+    :return: decoded data
+    """
+    table = load_route_table(filePrefix, dataset)
+    start, end = get_route_rows(table, filePrefix)
+
+    return get_records(table, np.arange(start, end))
 
 
 def load_data_with_daysBeforeTakeoff_and_sameFlightNum(days, filePrefix="BCN_BUD", dataset="Specific"):
@@ -144,58 +717,64 @@ def load_data_with_daysBeforeTakeoff_and_sameFlightNum(days, filePrefix="BCN_BUD
     :param dataset: dataset name('Specific' or 'General')
     :return: data with same flight number and the same days before takeoff
     """
-    datas = load_data_with_prefix_and_dataset(filePrefix, dataset)
-    output = [data for data in datas if util.days_between(data["ObservedDate"], data["Date"]) == days]
+    table = load_route_table(filePrefix, dataset)
+    start, end = get_route_rows(table, filePrefix)
+
+    gaps = np.abs(table["departure"][start:end] - table["observed"][start:end])
+    output = get_records(table, start + np.where(gaps == days)[0])
 
     return output
 
-def get_departure_len(filePrefix="BCN_BUD", dataset="Specific"):
+def get_route_departures(table, filePrefix):
     """
-    So far, used in QLearning, return the total departure date length in the chosen dataset.
+    Get the different departure dates of one route, in the order they are first observed
+    :param table: table from load_snapshot_table
+    :param filePrefix: route prefix
+    :return: departure date ordinals
     """
-    datas = load_data_with_prefix_and_dataset(filePrefix, dataset)
+    routeId = table["routes"].index(filePrefix)
+    routeDepartureOffsets = table["routeDepartureOffsets"]
 
-    # get different departure data in the same flight number,
-    # to compute the Q Values for such (flight number, departure date) pair.
-    departureDates = []
-    [departureDates.append(data["Date"]) for data in datas]
-    departureDates = util.remove_duplicates(departureDates)
+    return table["departureDates"][routeDepartureOffsets[routeId]:routeDepartureOffsets[routeId+1]]
 
-    return len(departureDates)
+def get_departure_rows(table, filePrefix, departureIndex):
+    """
+    Get the rows of one departure date of the route from the departure index, in table order
+    :param table: table from load_snapshot_table
+    :param filePrefix: route prefix
+    :param departureIndex: index of the departure date in get_route_departures
+    :return: row indexs in the table
+    """
+    routeId = table["routes"].index(filePrefix)
+    routeDepartureOffsets = table["routeDepartureOffsets"]
+    if departureIndex < 0:
+        departureIndex += routeDepartureOffsets[routeId+1] - routeDepartureOffsets[routeId]
+    group = routeDepartureOffsets[routeId] + departureIndex
+    if departureIndex < 0 or group >= routeDepartureOffsets[routeId+1]:
+        raise IndexError("departure index out of range")
 
+    return table["departureRows"][table["departureOffsets"][group]:table["departureOffsets"][group+1]]
 
-def load_data_with_departureIndex(departureIndex, filePrefix="BCN_BUD", dataset="Specific"):
+def get_departure_len(filePrefix="BCN_BUD", dataset="Specific"):
     """
-    Given the departureIndex, return the dataset with specific departure date in the chosen dataset.
+    So far, used in QLearning, return the total departure date length in the chosen dataset.
     """
-    datas = load_data_with_prefix_and_dataset(filePrefix, dataset)
+    table = load_route_table(filePrefix, dataset)
 
     # get different departure data in the same flight number,
     # to compute the Q Values for such (flight number, departure date) pair.
-    departureDates = []
-    [departureDates.append(data["Date"]) for data in datas]
-    departureDates = util.remove_duplicates(departureDates)
+    return len(get_route_departures(table, filePrefix))
 
-    # choose the departure date by departureIndex
-    departureDate = departureDates[departureIndex]
-    print "Evaluating departure date " + departureDate + "..."
 
+def load_data_with_departureIndex(departureIndex, filePrefix="BCN_BUD", dataset="Specific"):
     """
-    # remove duplicate observedDate-departureDate pair
-    observedDates = []
-    [observedDates.append(data["ObservedDate"]) for data in datas if data["Date"]==departureDate]
-    observedDates = util.remove_duplicates(observedDates)
-    states = len(observedDates)
-    #print states
+    Given the departureIndex, return the dataset with specific departure date in the chosen dataset.
     """
+    table = load_route_table(filePrefix, dataset)
 
-
-    specificDatas = []
-    specificDatas = [data for data in datas if data["Date"]==departureDate]
-
-    #states = []
-    #[states.append(data["State"]) for data in specificDatas]
-    #print max(states)
+    # choose the departure date by departureIndex
+    specificDatas = get_records(table, get_departure_rows(table, filePrefix, departureIndex))
+    print "Evaluating departure date " + specificDatas[0]["Date"] + "..."
 
     return specificDatas
 
@@ -203,22 +782,15 @@ def load_data_with_departureDate(departureDate, filePrefix="BCN_BUD", dataset="S
     """
     Given the departureIndex, return the dataset with specific departure date in the chosen dataset.
     """
-    datas = load_data_with_prefix_and_dataset(filePrefix, dataset)
+    table = load_route_table(filePrefix, dataset)
 
     print "Evaluating departure date " + departureDate + "..."
 
-    """
-    # remove duplicate observedDate-departureDate pair
-    observedDates = []
-    [observedDates.append(data["ObservedDate"]) for data in datas if data["Date"]==departureDate]
-    observedDates = util.remove_duplicates(observedDates)
-    states = len(observedDates)
-    #print states
-    """
-
-
-    specificDatas = []
-    specificDatas = [data for data in datas if data["Date"]==departureDate]
+    departure = util.getDateOrdinal(departureDate)
+    departureIndexs = np.where(get_route_departures(table, filePrefix) == departure)[0]
+    if len(departureIndexs) == 0:
+        return []
+    specificDatas = get_records(table, get_departure_rows(table, filePrefix, departureIndexs[0]))
 
     return specificDatas
 
@@ -229,13 +801,8 @@ def getMinimumPrice(datas):
     :param datas: input dataset(in QLearning and Neural Nets, it should have same departure date)
     :return: minimum price in the dataset
     """
-    minimumPrice = util.getPrice(datas[0]["MinimumPrice"]) # in our json data files, MinimumPrice means the price in that day
-    for data in datas:
-        price = util.getPrice(data["MinimumPrice"])
-        minimumPrice = price if price<minimumPrice else minimumPrice
-    minimumPrice = minimumPrice
-
-    return minimumPrice
+    # in our json data files, MinimumPrice means the price in that day
+    return min(util.getPrice(data["MinimumPrice"]) for data in datas)
 
 def getOptimalState(datas):
     """
@@ -259,12 +826,8 @@ def getMaximumPrice(datas):
     :param datas: input dataset(in QLearning and Neural Nets, it should have same departure date)
     :return: maximum price in the dataset
     """
-    maximumPrice = util.getPrice(datas[0]["MinimumPrice"]) # in our json data files, MinimumPrice means the price in that day
-    for data in datas:
-        price = util.getPrice(data["MinimumPrice"])
-        maximumPrice = price if price>maximumPrice else maximumPrice
-
-    return maximumPrice
+    # in our json data files, MinimumPrice means the price in that day
+    return max(util.getPrice(data["MinimumPrice"]) for data in datas)
 
 def getChosenPrice(state, datas):
     """
@@ -290,8 +853,9 @@ def getMinimumPreviousPrice(departureDate, state, datas):
 
     minimumPreviousPrice = util.getPrice(specificDatas[0]["MinimumPrice"])
     for data in specificDatas:
-        if util.getPrice(data["MinimumPrice"]) < minimumPreviousPrice and data["State"]>=state:
-            minimumPreviousPrice = util.getPrice(data["MinimumPrice"])
+        price = util.getPrice(data["MinimumPrice"])
+        if price < minimumPreviousPrice and data["State"]>=state:
+            minimumPreviousPrice = price
 
     return minimumPreviousPrice
 
@@ -308,320 +872,682 @@ def getMaximumPreviousPrice(departureDate, state, datas):
 
     maximumPreviousPrice = util.getPrice(specificDatas[0]["MinimumPrice"])
     for data in specificDatas:
-        if util.getPrice(data["MinimumPrice"]) > maximumPreviousPrice and data["State"]>=state:
-            maximumPreviousPrice = util.getPrice(data["MinimumPrice"])
+        price = util.getPrice(data["MinimumPrice"])
+        if price > maximumPreviousPrice and data["State"]>=state:
+            maximumPreviousPrice = price
 
     return maximumPreviousPrice
 
-"""
-# step 1. The main data load function - for classification for specific dataset
-"""
-def load_for_classification_for_Specific(dataset="Specific", routes=routes_specific):
-    """
-    Load the data for classification
+def get_departure_price_features(price, state, rows, departureOffsets):
+    """
+    Get the minimum/maximum previous price and the buy label of the rows grouped by departure date,
+    see get_previous_price_features.
+    Every departure date is sorted by state once, then the running min/max are cumulative.
+    :param price: price of every row of the route
+    :param state: observed days before departure of every row of the route
+    :param rows: the rows of departure group g are rows[departureOffsets[g]:departureOffsets[g+1]], in table order
+    :param departureOffsets: offsets of the departure groups in rows, from 0 to len(rows)
+    :return: (minimumPreviousPrice, maximumPreviousPrice, isMinimumPrice), one per element of rows
+    """
+    if len(rows) == 0:
+        return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64), np.zeros(0, dtype=bool)
+    price = np.asarray(price[rows], dtype=np.float64)
+    state = np.asarray(state[rows])
+    departureLen = len(departureOffsets) - 1
+    group = np.repeat(np.arange(departureLen), np.diff(departureOffsets))
+
+    # first observed price and minimum price of every departure date
+    firstPrice = price[departureOffsets[:-1]]
+    minimumPrice = np.minimum.reduceat(price, departureOffsets[:-1])
+    isMinimumPrice = price == minimumPrice[group]
+
+    # sort every departure date by state descending, the departure dates keep their order
+    order = np.lexsort((-state, group))
+
+    # running min/max of the price ranks, the keys of one departure date never reach the next one
+    distinctPrices, priceRanks = np.unique(price, return_inverse=True)
+    ranks = priceRanks[order].astype(np.int64)
+    minimumKeys = (departureLen - 1 - group) * len(distinctPrices)
+    maximumKeys = group * len(distinctPrices)
+    runningMinimum = np.minimum.accumulate(minimumKeys + ranks) - minimumKeys
+    runningMaximum = np.maximum.accumulate(maximumKeys + ranks) - maximumKeys
+
+    # the rows with the same state see each other, take the value at the end of the same state
+    sortedState = state[order]
+    isStateEnd = np.ones(len(order), dtype=bool)
+    isStateEnd[:-1] = (group[1:] != group[:-1]) | (sortedState[1:] != sortedState[:-1])
+    stateEnds = np.where(isStateEnd)[0]
+    stateIds = np.concatenate(([0], np.cumsum(isStateEnd[:-1])))
+    runningMinimum = distinctPrices[runningMinimum[stateEnds[stateIds]]]
+    runningMaximum = distinctPrices[runningMaximum[stateEnds[stateIds]]]
+
+    minimumPreviousPrice = np.empty(len(rows), dtype=np.float64)
+    maximumPreviousPrice = np.empty(len(rows), dtype=np.float64)
+    minimumPreviousPrice[order] = np.minimum(firstPrice[group], runningMinimum)
+    maximumPreviousPrice[order] = np.maximum(firstPrice[group], runningMaximum)
+
+    return minimumPreviousPrice, maximumPreviousPrice, isMinimumPrice
+
+def get_route_departure_groups(table, filePrefix):
+    """
+    Get the departure groups of the route from the departure index
+    :return: (departureDates, departureOffsets), group g has the departure date departureDates[g],
+        its rows are table["departureRows"][departureOffsets[g]:departureOffsets[g+1]]
+    """
+    routeId = table["routes"].index(filePrefix)
+    routeDepartureOffsets = table["routeDepartureOffsets"]
+    first, last = routeDepartureOffsets[routeId], routeDepartureOffsets[routeId+1]
+    return np.asarray(table["departureDates"][first:last]), np.asarray(table["departureOffsets"][first:last+1])
+
+def get_previous_price_features(table, filePrefix):
+    """
+    Get the minimum/maximum previous price and the buy label of every row of the route at once,
+    the same as getMinimumPreviousPrice, getMaximumPreviousPrice and getMinimumPrice row by row:
+    the previous prices are taken over the rows of the same departure date observed no later(State >= state),
+    and the first observed row of the departure date; the row is a buy if it has the minimum price of the departure date.
+    :param table: table from load_snapshot_table
+    :param filePrefix: route prefix
+    :return: (minimumPreviousPrice, maximumPreviousPrice, isMinimumPrice), one per row of the route, in table order
+    """
+    start, end = get_route_rows(table, filePrefix)
+    minimumPreviousPrice = np.empty(end-start, dtype=np.float64)
+    maximumPreviousPrice = np.empty(end-start, dtype=np.float64)
+    isMinimumPrice = np.zeros(end-start, dtype=bool)
+    if end == start:
+        return minimumPreviousPrice, maximumPreviousPrice, isMinimumPrice
+
+    # the rows of the route grouped by departure date, from the departure index
+    departureDates, departureOffsets = get_route_departure_groups(table, filePrefix)
+    rows = np.asarray(table["departureRows"][departureOffsets[0]:departureOffsets[-1]]) - start
+    departureOffsets = departureOffsets - departureOffsets[0]
+
+    features = get_departure_price_features(table["localPrice"][start:end], table["state"][start:end], rows, departureOffsets)
+    minimumPreviousPrice[rows], maximumPreviousPrice[rows], isMinimumPrice[rows] = features
+
+    return minimumPreviousPrice, maximumPreviousPrice, isMinimumPrice
+
+def get_route_row_mapping(routeSources, previousRouteSources):
+    """
+    Match the rows of a route to the rows of the route in a previous table, by the snapshot files they come from
+    :param routeSources: [(file path, checksum, rows)] of the route, in table order
+    :param previousRouteSources: [(file path, checksum, rows)] of the route in the previous table
+    :return: (rows, previousRows), the matched rows relative to the route;
+        None if the files kept are not in the same order, then the first observed rows can be others
+    """
+    previousStarts = {}
+    previousStart = 0
+    for filePath, checksum, fileRows in previousRouteSources:
+        previousStarts[(filePath, checksum)] = previousStart
+        previousStart += fileRows
+
+    rows = [np.empty(0, dtype=np.int64)]
+    previousRows = [np.empty(0, dtype=np.int64)]
+    start = 0
+    lastPreviousStart = -1
+    for filePath, checksum, fileRows in routeSources:
+        previousStart = previousStarts.get((filePath, checksum))
+        if previousStart is not None:
+            if previousStart < lastPreviousStart:
+                return None
+            lastPreviousStart = previousStart
+            rows.append(np.arange(start, start+fileRows, dtype=np.int64))
+            previousRows.append(np.arange(previousStart, previousStart+fileRows, dtype=np.int64))
+        start += fileRows
+
+    return np.concatenate(rows), np.concatenate(previousRows)
+
+def update_previous_price_features(table, filePrefix, previousFeatures, previousDeparture, previousRouteSources):
+    """
+    Get the previous price features of the route from the ones of a previous table, e.g. before a new observed day.
+    The rows of the files kept take their previous features, only the departure dates with new rows or removed rows
+    are computed again. The buy label looks at the whole departure date, so the older rows of them can change too.
+    :param table: table from load_snapshot_table
+    :param filePrefix: route prefix
+    :param previousFeatures: (minimumPreviousPrice, maximumPreviousPrice, isMinimumPrice) of the route in the previous table
+    :param previousDeparture: departure date ordinals of the route in the previous table
+    :param previousRouteSources: snapshot files of the route in the previous table, see load_snapshot_table
+    :return: (minimumPreviousPrice, maximumPreviousPrice, isMinimumPrice), the same as get_previous_price_features
+    """
+    routeId = table["routes"].index(filePrefix)
+    mapping = get_route_row_mapping(table["routeSources"][routeId], previousRouteSources)
+    if mapping is None:
+        return get_previous_price_features(table, filePrefix)
+    rows, previousRows = mapping
+
+    start, end = get_route_rows(table, filePrefix)
+    features = (np.empty(end-start, dtype=np.float64), np.empty(end-start, dtype=np.float64), np.zeros(end-start, dtype=bool))
+    for column, previousColumn in zip(features, previousFeatures):
+        column[rows] = previousColumn[previousRows]
+
+    # the departure dates with new rows or removed rows
+    departure = np.asarray(table["departure"][start:end])
+    isNew = np.ones(end-start, dtype=bool)
+    isNew[rows] = False
+    isRemoved = np.ones(len(previousDeparture), dtype=bool)
+    isRemoved[previousRows] = False
+    changedDates = np.union1d(departure[isNew], np.asarray(previousDeparture)[isRemoved])
+    if len(changedDates) == 0:
+        return features
+
+    # only the rows of the changed departure dates are computed again
+    departureDates, departureOffsets = get_route_departure_groups(table, filePrefix)
+    changed = np.where(np.in1d(departureDates, changedDates))[0]
+    changedLens = np.diff(departureOffsets)[changed]
+    changedOffsets = np.cumsum(np.concatenate(([0], changedLens))).astype(np.int64)
+    changedRows = np.repeat(departureOffsets[changed] - changedOffsets[:-1], changedLens) + np.arange(changedOffsets[-1])
+    changedRows = np.asarray(table["departureRows"][changedRows]) - start
+
+    changedFeatures = get_departure_price_features(table["localPrice"][start:end], table["state"][start:end], changedRows, changedOffsets)
+    for column, values in zip(features, changedFeatures):
+        column[changedRows] = values
+
+    return features
+
+# change it when the price features change, the parsed snapshots take part in them
+priceFeatureVersion = [1, snapshotCacheVersion, snapshotStoreVersion]
+
+# the column files of the price features, and their types;
+# the departure dates and the route offsets are kept for the next update
+priceFeatureColumns = [("minimumPreviousPrice", np.float64),
+                       ("maximumPreviousPrice", np.float64),
+                       ("isMinimumPrice", np.bool_),
+                       ("departure", np.int32),
+                       ("routeOffsets", np.int64)]
+
+# keep the price features in memory, key: (dataset, routes); value: (table, price features)
+priceFeatureTables = {}
+
+def get_price_feature_path(dataset="Specific", routes=None):
+    """
+    The price features of 'dataset' are kept in the directory utils/data/<dataset>.features,
+    next to the observation store of the same routes
+    """
+    storePath = get_snapshot_store_path(dataset, routes)
+    return storePath[:-len(".store")] + ".features"
+
+def compute_route_price_features(args):
+    """
+    Compute the previous price features of one route, update the saved ones if isUpdate.
+    It is a module level function, so that it can be sent to the worker processes.
+    :param args: (dataset, routes, filePrefix, isUpdate)
+    :return: (minimumPreviousPrice, maximumPreviousPrice, isMinimumPrice) of the route
+    """
+    dataset, routes, filePrefix, isUpdate = args
+    table = load_snapshot_table(dataset, routes)
+    if not isUpdate:
+        return get_previous_price_features(table, filePrefix)
+
+    previousColumns, meta = open_column_directory(get_price_feature_path(dataset, routes), priceFeatureColumns, priceFeatureVersion)
+    routeId = routes.index(filePrefix)
+    start, end = previousColumns["routeOffsets"][routeId], previousColumns["routeOffsets"][routeId+1]
+    previousFeatures = [previousColumns[column][start:end] for column in ["minimumPreviousPrice", "maximumPreviousPrice", "isMinimumPrice"]]
+    return update_previous_price_features(table, filePrefix, previousFeatures, previousColumns["departure"][start:end],
+                                          get_route_sources(meta["routeSources"])[routeId])
+
+def load_price_features(dataset="Specific", routes=None, processes=1):
+    """
+    Get the previous price features and buy labels of every row of the table, see get_previous_price_features.
+    They are kept in utils/data/<dataset>.features with the snapshot files they come from,
+    when a new observed day arrives only the departure dates observed that day are computed again,
+    see update_previous_price_features.
     :param dataset: dataset name('Specific' or 'General')
-    :return: X_train, y_train, X_test, y_test
+    :param routes: route prefixes, default is all the routes of the dataset
+    :param processes: number of worker processes to parse the dataset and to compute the routes
+    :return: dict of columns "minimumPreviousPrice", "maximumPreviousPrice", "isMinimumPrice", in table order
+    """
+    if routes is None:
+        routes = get_routes_for_dataset(dataset)
+    routes = list(routes)
+    key = (dataset, tuple(routes))
+    table = load_snapshot_table(dataset, routes, processes=processes)
+    if key in priceFeatureTables and priceFeatureTables[key][0] is table:
+        return priceFeatureTables[key][1]
+
+    featurePath = get_price_feature_path(dataset, routes)
+    previous = open_column_directory(featurePath, priceFeatureColumns, priceFeatureVersion)
+    isUpdate = previous is not None and previous[1]["routes"] == routes
+    if isUpdate and get_route_sources(previous[1]["routeSources"]) == table["routeSources"]:
+        # nothing changed since the last time
+        features = previous[0]
+    else:
+        jobs = [(dataset, routes, filePrefix, isUpdate) for filePrefix in routes]
+        routeFeatures = map_jobs(compute_route_price_features, jobs, processes)
+        columns = {"departure": table["departure"], "routeOffsets": table["routeOffsets"]}
+        for i, column in enumerate(["minimumPreviousPrice", "maximumPreviousPrice", "isMinimumPrice"]):
+            columns[column] = np.concatenate([np.empty(0, dtype=dict(priceFeatureColumns)[column])] +
+                                             [features[i] for features in routeFeatures])
+        save_column_directory(featurePath, columns, priceFeatureColumns,
+                              {"version": priceFeatureVersion, "routes": routes, "routeSources": table["routeSources"]})
+        features = open_column_directory(featurePath, priceFeatureColumns, priceFeatureVersion)[0]
+    priceFeatureTables[key] = (table, features)
+
+    return features
+
+def get_route_features(table, filePrefix, routes, priceFeatures=None):
+    """
+    Construct the classification features, buy labels and prices of every entry of the route at once
+    :param table: table from load_snapshot_table
+    :param filePrefix: route prefix
+    :param routes: routes of the flight number dummy variables
+    :param priceFeatures: price features of the table from load_price_features, None to compute them
+    :return: X(classification schema), y, y_price, departure date ordinals; one row per entry, in table order
+    """
+    start, end = get_route_rows(table, filePrefix)
+    departure = np.asarray(table["departure"][start:end])
+    if priceFeatures is None:
+        minimumPreviousPrice, maximumPreviousPrice, isMinimumPrice = get_previous_price_features(table, filePrefix)
+    else:
+        minimumPreviousPrice, maximumPreviousPrice, isMinimumPrice = \
+            [priceFeatures[column][start:end] for column in ["minimumPreviousPrice", "maximumPreviousPrice", "isMinimumPrice"]]
+
+    schema = feature_schema.get_classification_schema(routes)
+    X = np.zeros(shape=(end-start, len(schema)))
+    # feature 1: flight number -> dummy variables
+    X[:, schema.index(filePrefix)] = 1
+    # feature 2: departure date interval from "20151109", because the first observed date is 20151109
+    X[:, schema.index("departureDate")] = np.abs(departure - util.getDateOrdinal("20151109"))
+    # feature 3: observed days before departure date
+    X[:, schema.index("state")] = table["state"][start:end]
+    # feature 4: minimum price before the observed date
+    X[:, schema.index("minimumPrice")] = minimumPreviousPrice
+    # feature 5: maximum price before the observed date
+    X[:, schema.index("maximumPrice")] = maximumPreviousPrice
+
+    # output: multiple entries can be buy
+    y = isMinimumPrice.astype(np.float64).reshape((end-start, 1))
+    # keep price info
+    y_price = np.array(table["localPrice"][start:end], dtype=np.float64).reshape((end-start, 1))
+
+    return X, y, y_price, departure
+
+def construct_route_features(args):
+    """
+    Construct the features of one route, see get_route_features.
+    It is a module level function, so that it can be sent to the worker processes,
+    a worker takes the table from the observation store(or the memory of the parent) instead of the pipe.
+    :param args: (dataset, routes, filePrefix)
+    :return: X, y, y_price, departure date ordinals of the route
+    """
+    dataset, routes, filePrefix = args
+    table = load_snapshot_table(dataset, routes)
+    return get_route_features(table, filePrefix, routes, load_price_features(dataset, routes))
+
+def get_input_path(filePath):
+    """
+    The inputs are kept relative to the utils directory, e.g. 'inputSpecificRaw/X_train'
+    or '../Classification/inputClf_small/X_train', get the path of one from any working directory
     """
-    isOneOptimalState = False
-    # Construct the input data
-    dim = routes.__len__() + 4
-    X_train = np.empty(shape=(0, dim))
-    y_train = np.empty(shape=(0,1))
-    y_train_price = np.empty(shape=(0,1))
-    X_test = np.empty(shape=(0,dim))
-    y_test = np.empty(shape=(0,1))
-    y_test_price = np.empty(shape=(0,1))
-
-    for filePrefix in routes:
-        datas = load_data_with_prefix_and_dataset(filePrefix, dataset)
-        for data in datas:
-            print "Construct route {}, State {}, departureDate {}...".format(filePrefix, data["State"], data["Date"])
-            x_i = []
-            # feature 1: flight number -> dummy variables
-            for i in range(len(routes)):
-                """
-                !!!need to change!
-                """
-                if i == routes.index(filePrefix):
-                    x_i.append(1)
-                else:
-                    x_i.append(0)
-
-            # feature 2: departure date interval from "20151109", because the first observed date is 20151109
-            departureDate = data["Date"]
-            """
-            !!!maybe need to change the first observed date
-            """
-            departureDateGap = util.days_between(departureDate, "20151109")
-            x_i.append(departureDateGap)
-
-            # feature 3: observed days before departure date
-            state = data["State"]
-            x_i.append(state)
-
-            # feature 4: minimum price before the observed date
-            minimumPreviousPrice = getMinimumPreviousPrice(data["Date"], state, datas)
-            x_i.append(minimumPreviousPrice)
-
-            # feature 5: maximum price before the observed date
-            maximumPreviousPrice = getMaximumPreviousPrice(data["Date"], state, datas)
-            x_i.append(maximumPreviousPrice)
-
-            # output
-            y_i = [0]
-            specificDatas = []
-            specificDatas = [data2 for data2 in datas if data2["Date"]==departureDate]
-
-            # if isOneOptimalState:
-            #     # Method 1: only 1 entry is buy
-            #     optimalState = getOptimalState(specificDatas)
-            #     if data["State"] == optimalState:
-            #        y_i = [1]
-            # else:
-            #     # Method 2: multiple entries can be buy
-            #     minPrice = getMinimumPrice(specificDatas)
-            #     if util.getPrice(data["MinimumPrice"]) == minPrice:
-            #         y_i = [1]
-
-            #Method 2: multiple entries can be buy
-            minPrice = getMinimumPrice(specificDatas)
-            if util.getPrice(data["MinimumPrice"]) == minPrice:
-                y_i = [1]
-
-
-            # keep price info
-            y_price = [util.getPrice(data["MinimumPrice"])]
-
-            if int(departureDate) < 20160229 and int(departureDate) >= 20151129: # choose date between "20151129-20160229(20160115)" as training data
-                X_train = np.concatenate((X_train, [x_i]), axis=0)
-                y_train = np.concatenate((y_train, [y_i]), axis=0)
-                y_train_price = np.concatenate((y_train_price, [y_price]), axis=0)
-            elif int(departureDate) < 20160508 and int(departureDate) >= 20160229: # choose date before "20160508(20160220)" as test data
-                X_test = np.concatenate((X_test, [x_i]), axis=0)
-                y_test = np.concatenate((y_test, [y_i]), axis=0)
-                y_test_price = np.concatenate((y_test_price, [y_price]), axis=0)
-            else:
-                pass
+    currentDir = os.path.dirname(os.path.realpath(__file__))
+    return os.path.normpath(os.path.join(currentDir, filePath))
+
+def save_array(filePath, array):
+    """
+    Save the array as filePath.npy like np.save, the old file is replaced in one step,
+    so a reader never sees a half written input after an update.
+    :param filePath: path relative to the utils directory, without .npy
+    """
+    filePath = get_input_path(filePath)
+    with open(filePath + ".npy.tmp", 'wb') as fp:
+        np.save(fp, array)
+    os.rename(filePath + ".npy.tmp", filePath + ".npy")
+
+def load_array(filePath, mmap_mode=None):
+    """
+    Load the array saved by save_array
+    :param filePath: path relative to the utils directory, without .npy
+    """
+    return np.load(get_input_path(filePath) + ".npy", mmap_mode=mmap_mode)
+
+def load_input(filePath, rows=None):
+    """
+    Memory-map a prepared input, its pages are only read when they are used,
+    and writes to it stay in memory(copy on write), the file is never changed.
+    :param filePath: .npy file
+    :param rows: boolean mask of the rows kept, None to keep all the rows
+    :return: the input, a copy of the rows kept if rows is given
+    """
+    matrix = np.load(filePath, mmap_mode='c')
+    if rows is None:
+        return matrix
+    return matrix[rows]
+
+def lazy_input(name):
+    """
+    A property of the input 'name' of a model, it is loaded by instance.loadInput(name) when it is first used,
+    setting the property replaces the input.
+    """
+    def getInput(self):
+        if name not in self.__dict__:
+            self.__dict__[name] = self.loadInput(name)
+        return self.__dict__[name]
 
-            # X_train = np.concatenate((X_train, [x_i]), axis=0)
-            # y_train = np.concatenate((y_train, [y_i]), axis=0)
-            # y_train_price = np.concatenate((y_train_price, [y_price]), axis=0)
+    def setInput(self, value):
+        self.__dict__[name] = value
 
-        # end of for datas
+    return property(getInput, setInput)
+
+def get_route_ids(X, routeLen):
+    """
+    Get the route index of every row from the flight number dummy variables
+    :param X: input, the first routeLen features are the flight number dummy variables
+    :param routeLen: number of routes
+    :return: route index of every row, routeLen for the rows without a flight number
+    """
+    routeIds = np.argmax(X[:, 0:routeLen], axis=1)
+    routeIds[X[np.arange(X.shape[0]), routeIds] != 1] = routeLen
+    return routeIds
+
+def get_segment_index(routeIds, departure, state=None, routeLen=None):
+    """
+    Sort the rows once by (route, departure date, state), so that the rows of every route and
+    every (route, departure date) pair are contiguous, with CSR-style offsets.
+    The sort is stable, the rows with the same keys keep the table order.
+    :param routeIds: route index of every row, the rows out of range(routeLen) are left out, see get_route_ids
+    :param departure: departure date of every row
+    :param state: observed date state of every row, None to keep the table order in a departure date
+    :param routeLen: number of routes, None for max(routeIds)+1
+    :return: (rows, departureOffsets, departureDates, routeDepartureOffsets), see build_departure_index,
+        the departure dates of a route are increasing, like np.unique
+    """
+    routeIds = np.asarray(routeIds)
+    departure = np.asarray(departure)
+    if routeLen is None:
+        routeLen = int(routeIds.max()) + 1 if len(routeIds) > 0 else 0
+    if state is None:
+        rows = np.lexsort((departure, routeIds))
+    else:
+        rows = np.lexsort((np.asarray(state), departure, routeIds))
+    rows = rows[(routeIds[rows] >= 0) & (routeIds[rows] < routeLen)]
+
+    sortedRoutes = routeIds[rows]
+    sortedDeparture = departure[rows]
+    isStart = np.ones(len(rows), dtype=bool)
+    isStart[1:] = (sortedRoutes[1:] != sortedRoutes[:-1]) | (sortedDeparture[1:] != sortedDeparture[:-1])
+    starts = np.where(isStart)[0]
+
+    departureOffsets = np.append(starts, len(rows)).astype(np.int64)
+    departureDates = sortedDeparture[starts]
+    routeDepartureOffsets = np.searchsorted(sortedRoutes[starts], np.arange(routeLen+1)).astype(np.int64)
+
+    return rows.astype(np.int64), departureOffsets, departureDates, routeDepartureOffsets
+
+def get_input_segment_index(X, schema, isState=True):
+    """
+    Get the segment index of an input, see get_segment_index
+    :param X: input of the schema, or a matrix which starts with the columns of the schema
+    :param schema: feature_schema.FeatureSchema of the input
+    :param isState: sort every departure date by state, or keep the table order
+    """
+    routeLen = len(schema.routes)
+    departure = X[:, schema.index("departureDate")]
+    state = X[:, schema.index("state")] if isState else None
+    return get_segment_index(get_route_ids(X, routeLen), departure, state, routeLen)
+
+def get_route_segments(segmentIndex, routeId):
+    """
+    Get the departure dates of one route in a segment index
+    :return: (rows, departureDates, departureOffsets), the rows of the route in segment order,
+        the rows of departure date g are rows[departureOffsets[g]:departureOffsets[g+1]]
+    """
+    rows, departureOffsets, departureDates, routeDepartureOffsets = segmentIndex
+    first, last = routeDepartureOffsets[routeId], routeDepartureOffsets[routeId+1]
+    offsets = departureOffsets[first:last+1]
+    return rows[offsets[0]:offsets[-1]], departureDates[first:last], offsets - offsets[0]
+
+def save_inputs(directory, arrays):
+    """
+    Save the arrays of one input into the directory, it is created if needed
+    :param directory: path relative to the utils directory
+    :param arrays: [(name, array)]
+    """
+    if not os.path.isdir(get_input_path(directory)):
+        os.makedirs(get_input_path(directory))
+    for name, array in arrays:
+        save_array(directory + "/" + name, array)
+
+"""
+# step 1. The main data load function - for classification for specific dataset
+"""
+def get_classification_input_for_Specific(dataset="Specific", routes=routes_specific, processes=1):
+    """
+    Construct the classification input in memory, see load_for_classification_for_Specific
+    :return: X_train, y_train, y_train_price, X_test, y_test, y_test_price
+    """
+    # Construct the input data, one block per route, joined once
+    dim = len(feature_schema.get_classification_schema(routes))
+    X_trains = [np.empty(shape=(0, dim))]
+    y_trains = [np.empty(shape=(0,1))]
+    y_train_prices = [np.empty(shape=(0,1))]
+    X_tests = [np.empty(shape=(0,dim))]
+    y_tests = [np.empty(shape=(0,1))]
+    y_test_prices = [np.empty(shape=(0,1))]
+
+    # parse the dataset once for all the routes, only the departure dates observed since the last time
+    # get new price features, then construct every route on its own
+    load_price_features(dataset, routes, processes)
+    routeFeatures = map_jobs(construct_route_features, [(dataset, routes, filePrefix) for filePrefix in routes], processes)
+    for filePrefix, (X_route, y_route, y_route_price, departure) in zip(routes, routeFeatures):
+        print "Construct route {}, {} entries...".format(filePrefix, len(departure))
+
+        # choose date between "20151129-20160229(20160115)" as training data
+        isTrain = (departure >= util.getDateOrdinal("20151129")) & (departure < util.getDateOrdinal("20160229"))
+        X_trains.append(X_route[isTrain])
+        y_trains.append(y_route[isTrain])
+        y_train_prices.append(y_route_price[isTrain])
+
+        # choose date before "20160508(20160220)" as test data
+        isTest = (departure >= util.getDateOrdinal("20160229")) & (departure < util.getDateOrdinal("20160508"))
+        X_tests.append(X_route[isTest])
+        y_tests.append(y_route[isTest])
+        y_test_prices.append(y_route_price[isTest])
     # end of for routes
 
+    X_train = np.concatenate(X_trains, axis=0)
+    y_train = np.concatenate(y_trains, axis=0)
+    y_train_price = np.concatenate(y_train_prices, axis=0)
+    X_test = np.concatenate(X_tests, axis=0)
+    y_test = np.concatenate(y_tests, axis=0)
+    y_test_price = np.concatenate(y_test_prices, axis=0)
+
 
     """
     remove duplicate rows for train
     """
     tmp_train = np.concatenate((X_train, y_train, y_train_price), axis=1)
-    new_array = [tuple(row) for row in tmp_train]
-    tmp_train = np.unique(new_array)
+    tmp_train = util.remove_duplicate_rows(tmp_train, isKeepOrder=True)
 
     # get the result
-    X_train = tmp_train[:, 0:12]
-    y_train = tmp_train[:, 12]
-    y_train_price = tmp_train[:, 13]
+    X_train = tmp_train[:, 0:dim]
+    y_train = tmp_train[:, dim:dim+1]
+    y_train_price = tmp_train[:, dim+1:dim+2]
 
     """
     remove duplicate rows for test
     """
     tmp_test = np.concatenate((X_test, y_test, y_test_price), axis=1)
-    new_array = [tuple(row) for row in tmp_test]
-    tmp_test = np.unique(new_array)
+    tmp_test = util.remove_duplicate_rows(tmp_test, isKeepOrder=True)
 
     # get the result
-    X_test = tmp_test[:, 0:12]
-    y_test = tmp_test[:, 12]
-    y_test_price = tmp_test[:, 13]
-
-    # save the result
-    np.save('inputSpecificRaw/X_train', X_train)
-    np.save('inputSpecificRaw/y_train', y_train)
-    np.save('inputSpecificRaw/y_train_price', y_train_price)
-    np.save('inputSpecificRaw/X_test', X_test)
-    np.save('inputSpecificRaw/y_test', y_test)
-    np.save('inputSpecificRaw/y_test_price', y_test_price)
+    X_test = tmp_test[:, 0:dim]
+    y_test = tmp_test[:, dim:dim+1]
+    y_test_price = tmp_test[:, dim+1:dim+2]
 
-    return X_train, y_train, X_test, y_test
+    return X_train, y_train, y_train_price, X_test, y_test, y_test_price
 
-"""
-# step 1. The main data load function - for classification for the general dataset
-"""
-def load_for_classification_for_General(dataset="General", routes=routes_general):
+def load_for_classification_for_Specific(dataset="Specific", routes=routes_specific, processes=1):
     """
     Load the data for classification
     :param dataset: dataset name('Specific' or 'General')
+    :param processes: number of worker processes to parse the dataset and to construct the routes,
+        the routes are merged in order, so the result is the same for any number of processes
     :return: X_train, y_train, X_test, y_test
     """
-    isOneOptimalState = False
-    # Construct the input data
-    dim = routes.__len__() + 4
-    X_train = np.empty(shape=(0, dim))
-    y_train = np.empty(shape=(0,1))
-    y_train_price = np.empty(shape=(0,1))
+    X_train, y_train, y_train_price, X_test, y_test, y_test_price = \
+        get_classification_input_for_Specific(dataset, routes, processes)
+
+    # save the result
+    save_inputs('inputSpecificRaw', [("X_train", X_train), ("y_train", y_train), ("y_train_price", y_train_price),
+                                     ("X_test", X_test), ("y_test", y_test), ("y_test_price", y_test_price)])
 
-    for filePrefix in routes:
+    return X_train, y_train, X_test, y_test
+
+"""
+# step 1. The main data load function - for classification for the general dataset
+"""
+def get_classification_input_for_General(dataset="General", routes=routes_general, processes=1):
+    """
+    Construct the classification input in memory, see load_for_classification_for_General
+    :return: X_train, y_train, y_train_price, and their concatenation tmp
+    """
+    # Construct the input data, one block per route, joined once
+    dim = len(feature_schema.get_classification_schema(routes))
+    X_trains = [np.empty(shape=(0, dim))]
+    y_trains = [np.empty(shape=(0,1))]
+    y_train_prices = [np.empty(shape=(0,1))]
+
+    # parse the dataset once for all the routes, only the departure dates observed since the last time
+    # get new price features, then construct every route on its own
+    load_price_features(dataset, routes, processes)
+    routeFeatures = map_jobs(construct_route_features, [(dataset, routes, filePrefix) for filePrefix in routes], processes)
+    for filePrefix, (X_route, y_route, y_route_price, departure) in zip(routes, routeFeatures):
         print filePrefix
-        datas = load_data_with_prefix_and_dataset(filePrefix, dataset)
-        for data in datas:
-            print "Construct route {}, State {}, departureDate {}...".format(filePrefix, data["State"], data["Date"])
-            x_i = []
-            # feature 1: flight number -> dummy variables
-            for i in range(len(routes)):
-                """
-                !!!need to change!
-                """
-                if i == routes.index(filePrefix):
-                    x_i.append(1)
-                else:
-                    x_i.append(0)
-
-            # feature 2: departure date interval from "20151109", because the first observed date is 20151109
-            departureDate = data["Date"]
-            """
-            !!!maybe need to change the first observed date
-            """
-            departureDateGap = util.days_between(departureDate, "20151109")
-            x_i.append(departureDateGap)
-
-            # feature 3: observed days before departure date
-            state = data["State"]
-            x_i.append(state)
-
-            # feature 4: minimum price before the observed date
-            minimumPreviousPrice = getMinimumPreviousPrice(data["Date"], state, datas)
-            x_i.append(minimumPreviousPrice)
-
-            # feature 5: maximum price before the observed date
-            maximumPreviousPrice = getMaximumPreviousPrice(data["Date"], state, datas)
-            x_i.append(maximumPreviousPrice)
-
-            # output
-            y_i = [0]
-            specificDatas = []
-            specificDatas = [data2 for data2 in datas if data2["Date"]==departureDate]
-
-            minPrice = getMinimumPrice(specificDatas)
-            if util.getPrice(data["MinimumPrice"]) == minPrice:
-                y_i = [1]
-
-
-            # keep price info
-            y_price = [util.getPrice(data["MinimumPrice"])]
-
-            X_train = np.concatenate((X_train, [x_i]), axis=0)
-            y_train = np.concatenate((y_train, [y_i]), axis=0)
-            y_train_price = np.concatenate((y_train_price, [y_price]), axis=0)
-
-        # end of for datas
+        print "Construct route {}, {} entries...".format(filePrefix, len(departure))
+
+        X_trains.append(X_route)
+        y_trains.append(y_route)
+        y_train_prices.append(y_route_price)
     # end of for routes
 
+    X_train = np.concatenate(X_trains, axis=0)
+    y_train = np.concatenate(y_trains, axis=0)
+    y_train_price = np.concatenate(y_train_prices, axis=0)
+
 
     """
     remove duplicate rows
     """
     tmp = np.concatenate((X_train, y_train, y_train_price), axis=1)
-    new_array = [tuple(row) for row in tmp]
-    tmp = np.unique(new_array)
+    tmp = util.remove_duplicate_rows(tmp, isKeepOrder=True)
+
+    # get the result
+    X_train = tmp[:, 0:dim]
+    y_train = tmp[:, dim:dim+1]
+    y_train_price = tmp[:, dim+1:dim+2]
 
-    # # get the result
-    # X_train = tmp[:, 0:16]
-    # y_train = tmp[:, 16]
-    # y_train_price = tmp[:, 17]
+    return X_train, y_train, y_train_price, tmp
+
+def load_for_classification_for_General(dataset="General", routes=routes_general, processes=1):
+    """
+    Load the data for classification
+    :param dataset: dataset name('Specific' or 'General')
+    :param processes: number of worker processes to parse the dataset and to construct the routes,
+        the routes are merged in order, so the result is the same for any number of processes
+    :return: X_train, y_train, y_train_price
+    """
+    X_train, y_train, y_train_price, tmp = get_classification_input_for_General(dataset, routes, processes)
 
     # save the result
-    np.save('inputGeneralRaw/X_train', X_train)
-    np.save('inputGeneralRaw/y_train', y_train)
-    np.save('inputGeneralRaw/y_train_price', y_train_price)
-    np.save('inputGeneralRaw/tmp', tmp)
+    save_inputs('inputGeneralRaw', [("X_train", X_train), ("y_train", y_train), ("y_train_price", y_train_price), ("tmp", tmp)])
 
     return X_train, y_train, y_train_price
 
 
 """
-# step 2. price normalize for the classification input - for specific
+# step 2. price normalize for the classification input
 """
-def priceNormalize_for_Specific(routes=routes_specific, currency=currency_specific):
+def get_currency_rates(matrix, schema, currency):
     """
-    Different routes have different units for the price, normalize it as Euro.
-    :return: NA
-    example: priceNormalize_for_Specific()
+    Get the rate to Euro of every row, the route of a row is found from its flight number dummy variables
+    :param matrix: matrix of the schema, one flight number dummy variable is 1 in every row
+    :param schema: feature schema of the matrix
+    :param currency: rate of every route; or a date-dependent rate table (dates, rates),
+        rates[k][i] is the rate of route i for the prices observed from dates[k] on,
+        dates are days after "20151109"(the first observed date) in increasing order
+    :return: rate of every row
     """
+    routeIds = np.argmax(matrix[:, 0:len(schema.routes)], axis=1)
+    if not isinstance(currency, tuple):
+        return np.asarray(currency, dtype=np.float64)[routeIds]
+
+    dates, rates = currency
+    # observed date = departure date - observed days before departure - 1
+    observedDates = matrix[:, schema.index("departureDate")] - matrix[:, schema.index("state")] - 1
+    periods = np.maximum(np.searchsorted(dates, observedDates, side='right') - 1, 0)
+    return np.asarray(rates, dtype=np.float64)[periods, routeIds]
+
+def normalize_currency(matrix, schema, priceColumns, currency):
     """
-    Get the input specific clf data for the training data set
+    Normalize the price columns of the matrix as Euro in place, in one pass, the rows keep their order
+    :param priceColumns: column indexs of the prices
+    :param currency: see get_currency_rates
+    :return: matrix
     """
-    # feature 0~7: flight number dummy variables
-    # feature 8: departure date; feature 9: observed date state;
-    # feature 10: minimum price; feature 11: maximum price
-    X_train = np.load('inputSpecificRaw/X_train.npy')
-    y_train = np.load('inputSpecificRaw/y_train.npy')
-    y_train_price = np.load('inputSpecificRaw/y_train_price.npy')
+    rates = get_currency_rates(matrix, schema, currency)
+    matrix[:, priceColumns] *= rates[:, np.newaxis]
+    return matrix
 
-    # normalize feature 10, feature 11, feature 13
+def normalize_price(X, y, y_price, routes, currency, minDepartureDate=None):
+    """
+    Different routes have different units for the price, normalize it as Euro.
+    :param X, y, y_price: classification input
+    :param currency: see get_currency_rates
+    :param minDepartureDate: only keep the entries departing at least minDepartureDate days
+        after the first observed date, None to keep all
+    :return: X, y, y_price, in the order of the input
+    """
+    # normalize feature minimumPrice, maximumPrice, outputPrice
     # feature 0~7: flight number dummy variables
     # feature 8: departure date; feature 9: observed date state;
     # feature 10: minimum price; feature 11: maximum price
     # fearure 12: prediction(buy or wait); feature 13: price
-    evalMatrix_train = np.concatenate((X_train, y_train, y_train_price), axis=1)
-
-    matrixTrain = np.empty(shape=(0, evalMatrix_train.shape[1]))
-    for i in range(len(routes)):
-        evalMatrix = evalMatrix_train[np.where(evalMatrix_train[:, i]==1)[0], :]
-        evalMatrix[:, 10] *= currency[i]
-        evalMatrix[:, 11] *= currency[i]
-        evalMatrix[:, 13] *= currency[i]
-        matrixTrain = np.concatenate((matrixTrain, evalMatrix), axis=0)
+    evalMatrix_all = np.concatenate((X, y, y_price), axis=1)
+    schema = feature_schema.get_classification_schema(routes)
+    evalSchema = feature_schema.get_evaluation_schema(schema)
+    priceColumns = evalSchema.indexs(["minimumPrice", "maximumPrice", "outputPrice"])
+    if minDepartureDate is not None:
+        evalMatrix_all = evalMatrix_all[np.where(evalMatrix_all[:, evalSchema.index("departureDate")]>=minDepartureDate)[0], :]
+    normalize_currency(evalMatrix_all, evalSchema, priceColumns, currency)
 
-    X_train = matrixTrain[:, 0:12]
-    y_train = matrixTrain[:, 12]
-    y_train_price = matrixTrain[:, 13]
+    X = evalMatrix_all[:, 0:len(schema)]
+    y = evalMatrix_all[:, evalSchema.index("output")]
+    y_price = evalMatrix_all[:, evalSchema.index("outputPrice")]
 
-    y_train = y_train.reshape((y_train.shape[0], 1))
-    y_train_price = y_train_price.reshape((y_train_price.shape[0], 1))
+    y = y.reshape((y.shape[0], 1))
+    y_price = y_price.reshape((y_price.shape[0], 1))
 
+    return X, y, y_price
 
-    np.save('../Classification/inputClf_small/X_train', X_train)
-    np.save('../Classification/inputClf_small/y_train', y_train)
-    np.save('../Classification/inputClf_small/y_train_price', y_train_price)
-
+"""
+# step 2. price normalize for the classification input - for specific
+"""
+def priceNormalize_for_Specific(routes=routes_specific, currency=currency_specific):
     """
-    Get the input specific clf data for the test data set
+    Different routes have different units for the price, normalize it as Euro.
+    :return: NA
+    example: priceNormalize_for_Specific()
+    """
+    """
+    Get the input specific clf data for the training data set
     """
     # feature 0~7: flight number dummy variables
     # feature 8: departure date; feature 9: observed date state;
     # feature 10: minimum price; feature 11: maximum price
-    X_test = np.load('inputSpecificRaw/X_test.npy')
-    y_test = np.load('inputSpecificRaw/y_test.npy')
-    y_test_price = np.load('inputSpecificRaw/y_test_price.npy')
-
-    # normalize feature 10, feature 11, feature 13
-    # feature 0~7: flight number dummy variables
-    # feature 8: departure date; feature 9: observed date state;
-    # feature 10: minimum price; feature 11: maximum price
-    # fearure 12: prediction(buy or wait); feature 13: price
-    evalMatrix_test = np.concatenate((X_test, y_test, y_test_price), axis=1)
-    evalMatrix_test = evalMatrix_test[np.where(evalMatrix_test[:,8]>=20)[0], :]
-
-    matrixTest = np.empty(shape=(0, evalMatrix_test.shape[1]))
-    for i in range(len(routes)):
-        evalMatrix = evalMatrix_test[np.where(evalMatrix_test[:, i]==1)[0], :]
-        evalMatrix[:, 10] *= currency[i]
-        evalMatrix[:, 11] *= currency[i]
-        evalMatrix[:, 13] *= currency[i]
-        matrixTest = np.concatenate((matrixTest, evalMatrix), axis=0)
+    X_train = load_array('inputSpecificRaw/X_train')
+    y_train = load_array('inputSpecificRaw/y_train')
+    y_train_price = load_array('inputSpecificRaw/y_train_price')
 
-    X_test = matrixTest[:, 0:12]
-    y_test = matrixTest[:, 12]
-    y_test_price = matrixTest[:, 13]
-
-    y_test = y_test.reshape((y_test.shape[0], 1))
-    y_test_price = y_test_price.reshape((y_test_price.shape[0], 1))
+    X_train, y_train, y_train_price = normalize_price(X_train, y_train, y_train_price, routes, currency)
+    save_inputs('../Classification/inputClf_small', [("X_train", X_train), ("y_train", y_train), ("y_train_price", y_train_price)])
 
+    """
+    Get the input specific clf data for the test data set
+    """
+    X_test = load_array('inputSpecificRaw/X_test')
+    y_test = load_array('inputSpecificRaw/y_test')
+    y_test_price = load_array('inputSpecificRaw/y_test_price')
 
-    np.save('../Classification/inputClf_small/X_test', X_test)
-    np.save('../Classification/inputClf_small/y_test', y_test)
-    np.save('../Classification/inputClf_small/y_test_price', y_test_price)
+    X_test, y_test, y_test_price = normalize_price(X_test, y_test, y_test_price, routes, currency, minDepartureDate=20)
+    save_inputs('../Classification/inputClf_small', [("X_test", X_test), ("y_test", y_test), ("y_test_price", y_test_price)])
 
 """
 # step 2. price normalize for the classification input - for general
@@ -635,167 +1561,109 @@ def priceNormalize_for_General(routes=routes_general, currency=currency_general)
     # feature 0~11: flight number dummy variables
     # feature 12: departure date; feature 13: observed date state;
     # feature 14: minimum price; feature 15: maximum price
-    X_train = np.load('inputGeneralRaw/X_train.npy')
-    y_train = np.load('inputGeneralRaw/y_train.npy')
-    y_train_price = np.load('inputGeneralRaw/y_train_price.npy')
-
-    # normalize feature 14, feature 15, feature 17
-    # feature 0~11: flight number dummy variables
-    # feature 12: departure date; feature 13: observed date state;
-    # feature 14: minimum price; feature 15: maximum price
-    # fearure 16: prediction(buy or wait); feature 17: price
-    evalMatrix_train = np.concatenate((X_train, y_train, y_train_price), axis=1)
-
-    matrixTrain = np.empty(shape=(0, evalMatrix_train.shape[1]))
-    for i in range(len(routes)):
-        evalMatrix = evalMatrix_train[np.where(evalMatrix_train[:, i]==1)[0], :]
-        evalMatrix[:, 14] *= currency[i]
-        evalMatrix[:, 15] *= currency[i]
-        evalMatrix[:, 17] *= currency[i]
-        matrixTrain = np.concatenate((matrixTrain, evalMatrix), axis=0)
+    X_train = load_array('inputGeneralRaw/X_train')
+    y_train = load_array('inputGeneralRaw/y_train')
+    y_train_price = load_array('inputGeneralRaw/y_train_price')
 
-    X_train = matrixTrain[:, 0:16]
-    y_train = matrixTrain[:, 16]
-    y_train_price = matrixTrain[:, 17]
-
-    y_train = y_train.reshape((y_train.shape[0], 1))
-    y_train_price = y_train_price.reshape((y_train_price.shape[0], 1))
-
-    #self.X_train = np.concatenate((self.X_train, self.y_train_price), axis=1)
-    #self.X_test = np.concatenate((self.X_test, self.y_test_price), axis=1)
-
-    np.save('../Classification/inputGeneralClf_small/X_train', X_train)
-    np.save('../Classification/inputGeneralClf_small/y_train', y_train)
-    np.save('../Classification/inputGeneralClf_small/y_train_price', y_train_price)
+    X_train, y_train, y_train_price = normalize_price(X_train, y_train, y_train_price, routes, currency)
+    save_inputs('../Classification/inputGeneralClf_small', [("X_train", X_train), ("y_train", y_train), ("y_train_price", y_train_price)])
 
 """
-# step 3. get the regression input and output from classification inputs - for specific
+# step 3. get the regression input and output from classification inputs
 """
-def getRegressionOutput_for_SpecificTrain(routes=routes_specific):
-    """
-    Get the regression output formula from the classification datasets.
-    :return: Save the regression datasets into inputGeneralReg
+def set_departure_minimum_price(evalMatrix, evalSchema):
+    """
+    Set the output of every entry to the minimum price of its route and departure date.
+    The entries are sorted by (route, departure date) once, the minimum of every group is reduced
+    at the group starts and repeated over the group.
+    :param evalMatrix: matrix of the classification evaluation schema
+    :param evalSchema: its feature schema
+    :return: the entries grouped by route, then by departure date, the entries of one departure date keep their order;
+        the entries without a flight number are left out
+    """
+    idx_departureDate = evalSchema.index("departureDate")
+    routeIds = np.argmax(evalMatrix[:, 0:len(evalSchema.routes)], axis=1)
+    rows = np.where(evalMatrix[np.arange(evalMatrix.shape[0]), routeIds]==1)[0]
+    # lexsort is stable, the last key is the primary one
+    rows = rows[np.lexsort((evalMatrix[rows, idx_departureDate], routeIds[rows]))]
+    result = evalMatrix[rows, :]
+    if len(rows) == 0:
+        return result
+
+    # starts of the (route, departure date) groups
+    routeIds = routeIds[rows]
+    isStart = np.ones(len(rows), dtype=bool)
+    isStart[1:] = (routeIds[1:] != routeIds[:-1]) | (result[1:, idx_departureDate] != result[:-1, idx_departureDate])
+    starts = np.where(isStart)[0]
+    minimumPrices = np.minimum.reduceat(result[:, evalSchema.index("minimumPrice")], starts)
+    result[:, evalSchema.index("output")] = np.repeat(minimumPrices, np.diff(np.append(starts, len(rows))))
+
+    return result
+
+def get_regression_output(X, y, y_price, routes):
+    """
+    Get the regression output formula from the classification datasets,
+    the output of an entry is the minimum price of its departure date.
+    :param X, y, y_price: classification input after normalizing the prices
+    :return: X, y, y_price of the regression input
     """
-    X_train = np.load('../Classification/inputClf_small/X_train.npy')
-    y_train = np.load('../Classification/inputClf_small/y_train.npy')
-    y_train_price = np.load('../Classification/inputClf_small/y_train_price.npy')
-
     # concatenate the buy or wait info to get the total datas
-    y_train = y_train.reshape((y_train.shape[0],1))
-    y_train_price = y_train_price.reshape((y_train_price.shape[0],1))
+    y = y.reshape((y.shape[0],1))
+    y_price = y_price.reshape((y_price.shape[0],1))
 
     # feature 0~7: flight numbers
     # feature 8: departure date;  feature 9: observed date state
     # feature 10: minimum price; feature 11: maximum price
     # feature 12: prediction(buy or wait); feature 13: current price
-    X_train = np.concatenate((X_train, y_train, y_train_price), axis=1)
+    X = np.concatenate((X, y, y_price), axis=1)
 
     """
     # define the variables needed to be changed
     """
-    dim = 14
-    idx_departureDate = 8
-    idx_minimumPrice = 10
-    idx_output = 12
-    idx_currentPrice = 13
-
-    # Construct train data
-    X_tmp = np.empty(shape=(0, dim))
-    for flightNum in range(len(routes)):
-
-        # choose one route datas
-        X_flightNum = X_train[np.where(X_train[:, flightNum]==1)[0], :]
-
-        # group by the feature: departure date
-        departureDates_train = np.unique(X_flightNum[:, idx_departureDate])
-
-        # get the final datas, the observed data state should be from large to small(i.e. for time series)
-        for departureDate in departureDates_train:
-            indexs = np.where(X_flightNum[:, idx_departureDate]==departureDate)[0]
-            datas = X_flightNum[indexs, :]
-            minPrice = min(datas[:, idx_minimumPrice]) # get the minimum price for the output
-            datas[:, idx_output] = minPrice
-            """
-            print departureDate
-            print minPrice
-            print datas
-            """
-            X_tmp = np.concatenate((X_tmp, datas), axis=0)
-
-    X_train = X_tmp[:, 0:idx_output]
-    y_train = X_tmp[:, idx_output]
-    y_train_price = X_tmp[:, idx_currentPrice]
-    y_train = y_train.reshape((y_train.shape[0], 1))
-    y_train_price = y_train_price.reshape((y_train_price.shape[0], 1))
+    evalSchema = feature_schema.get_evaluation_schema(feature_schema.get_classification_schema(routes))
+    idx_output = evalSchema.index("output")
+    idx_currentPrice = evalSchema.index("outputPrice")
+
+    # the output is the minimum price of the departure date
+    X_tmp = set_departure_minimum_price(X, evalSchema)
+
+    X = X_tmp[:, 0:idx_output]
+    y = X_tmp[:, idx_output]
+    y_price = X_tmp[:, idx_currentPrice]
+    y = y.reshape((y.shape[0], 1))
+    y_price = y_price.reshape((y_price.shape[0], 1))
 
     # regression has one more feature than classification
-    X_train = np.concatenate((X_train, y_train_price), axis=1)
-    np.save('../Regression/inputReg_small/X_train', X_train)
-    np.save('../Regression/inputReg_small/y_train', y_train)
-    np.save('../Regression/inputReg_small/y_train_price', y_train_price)
+    X = np.concatenate((X, y_price), axis=1)
 
-def getRegressionOutput_for_SpecificTest(routes=routes_specific):
+    return X, y, y_price
+
+"""
+# step 3. get the regression input and output from classification inputs - for specific
+"""
+def getRegressionOutput_for_SpecificTrain(routes=routes_specific):
     """
     Get the regression output formula from the classification datasets.
-    :return: Save the regression datasets into inputGeneralReg
+    :return: Save the regression datasets into inputReg_small
     """
-    X_test = np.load('../Classification/inputClf_small/X_test.npy')
-    y_test = np.load('../Classification/inputClf_small/y_test.npy')
-    y_test_price = np.load('../Classification/inputClf_small/y_test_price.npy')
+    X_train = load_array('../Classification/inputClf_small/X_train')
+    y_train = load_array('../Classification/inputClf_small/y_train')
+    y_train_price = load_array('../Classification/inputClf_small/y_train_price')
 
-    # concatenate the buy or wait info to get the total datas
-    y_test = y_test.reshape((y_test.shape[0],1))
-    y_test_price = y_test_price.reshape((y_test_price.shape[0],1))
-
-    # feature 0~7: flight numbers
-    # feature 8: departure date;  feature 9: observed date state
-    # feature 10: minimum price; feature 11: maximum price
-    # feature 12: prediction(buy or wait); feature 13: current price
-    X_test = np.concatenate((X_test, y_test, y_test_price), axis=1)
+    X_train, y_train, y_train_price = get_regression_output(X_train, y_train, y_train_price, routes)
+    save_inputs('../Regression/inputReg_small', [("X_train", X_train), ("y_train", y_train), ("y_train_price", y_train_price)])
 
+def getRegressionOutput_for_SpecificTest(routes=routes_specific):
     """
-    # define the variables needed to be changed
+    Get the regression output formula from the classification datasets.
+    :return: Save the regression datasets into inputReg_small
     """
-    dim = 14
-    idx_departureDate = 8
-    idx_minimumPrice = 10
-    idx_output = 12
-    idx_currentPrice = 13
-
-    # Construct train data
-    X_tmp = np.empty(shape=(0, dim))
-    for flightNum in range(len(routes)):
-
-        # choose one route datas
-        X_flightNum = X_test[np.where(X_test[:, flightNum]==1)[0], :]
-
-        # group by the feature: departure date
-        departureDates_test = np.unique(X_flightNum[:, idx_departureDate])
-
-        # get the final datas, the observed data state should be from large to small(i.e. for time series)
-        for departureDate in departureDates_test:
-            indexs = np.where(X_flightNum[:, idx_departureDate]==departureDate)[0]
-            datas = X_flightNum[indexs, :]
-            minPrice = min(datas[:, idx_minimumPrice]) # get the minimum price for the output
-            datas[:, idx_output] = minPrice
-            """
-            print departureDate
-            print minPrice
-            print datas
-            """
-            X_tmp = np.concatenate((X_tmp, datas), axis=0)
-
-    X_test = X_tmp[:, 0:idx_output]
-    y_test = X_tmp[:, idx_output]
-    y_test_price = X_tmp[:, idx_currentPrice]
-    y_test = y_test.reshape((y_test.shape[0], 1))
-    y_test_price = y_test_price.reshape((y_test_price.shape[0], 1))
+    X_test = load_array('../Classification/inputClf_small/X_test')
+    y_test = load_array('../Classification/inputClf_small/y_test')
+    y_test_price = load_array('../Classification/inputClf_small/y_test_price')
 
-    # regression has one more feature than classification
-    X_test = np.concatenate((X_test, y_test_price), axis=1)
-    np.save('../Regression/inputReg_small/X_test', X_test)
-    np.save('../Regression/inputReg_small/y_test', y_test)
-    np.save('../Regression/inputReg_small/y_test_price', y_test_price)
+    X_test, y_test, y_test_price = get_regression_output(X_test, y_test, y_test_price, routes)
+    save_inputs('../Regression/inputReg_small', [("X_test", X_test), ("y_test", y_test), ("y_test_price", y_test_price)])
 
 
 """
@@ -804,65 +1672,74 @@ def getRegressionOutput_for_SpecificTest(routes=routes_specific):
 def getRegressionOutput_for_General(routes=routes_general):
     """
     Get the regression output formula from the classification datasets.
-    :return: Save the regression datasets into inputGeneralReg
+    :return: Save the regression datasets into inputGeneralReg_small
     """
-    X_train = np.load('../Classification/inputGeneralClf_small/X_train.npy')
-    y_train = np.load('../Classification/inputGeneralClf_small/y_train.npy')
-    y_train_price = np.load('../Classification/inputGeneralClf_small/y_train_price.npy')
+    X_train = load_array('../Classification/inputGeneralClf_small/X_train')
+    y_train = load_array('../Classification/inputGeneralClf_small/y_train')
+    y_train_price = load_array('../Classification/inputGeneralClf_small/y_train_price')
 
-    # concatenate the buy or wait info to get the total datas
-    y_train = y_train.reshape((y_train.shape[0],1))
-    y_train_price = y_train_price.reshape((y_train_price.shape[0],1))
+    X_train, y_train, y_train_price = get_regression_output(X_train, y_train, y_train_price, routes)
+    save_inputs('../Regression/inputGeneralReg_small', [("X_train", X_train), ("y_train", y_train), ("y_train_price", y_train_price)])
 
-    # feature 0~11: flight numbers
-    # feature 12: departure date;  feature 3: observed date state
-    # feature 14: minimum price; feature 15: maximum price
-    # feature 16: prediction(buy or wait); feature 17: current price
-    X_train = np.concatenate((X_train, y_train, y_train_price), axis=1)
+"""
+# step 1~3 in memory - for specific
+"""
+def run_pipeline_for_Specific(dataset="Specific", routes=routes_specific, currency=currency_specific, processes=1):
+    """
+    Run step 1~3 in memory: construct the classification input, normalize the prices and get the regression output,
+    no step reads back what the step before saved. The inputs of every step are saved once at the end,
+    relative to the utils directory, so it can run from any working directory.
+    :param dataset: dataset name('Specific' or 'General')
+    :param processes: number of worker processes to parse the dataset and to construct the routes
+    :return: NA
+    example: run_pipeline_for_Specific()
+    """
+    # step 1
+    X_train, y_train, y_train_price, X_test, y_test, y_test_price = \
+        get_classification_input_for_Specific(dataset, routes, processes)
+    rawInput = [("X_train", X_train), ("y_train", y_train), ("y_train_price", y_train_price),
+                ("X_test", X_test), ("y_test", y_test), ("y_test_price", y_test_price)]
+
+    # step 2
+    X_train, y_train, y_train_price = normalize_price(X_train, y_train, y_train_price, routes, currency)
+    X_test, y_test, y_test_price = normalize_price(X_test, y_test, y_test_price, routes, currency, minDepartureDate=20)
+    clfInput = [("X_train", X_train), ("y_train", y_train), ("y_train_price", y_train_price),
+                ("X_test", X_test), ("y_test", y_test), ("y_test_price", y_test_price)]
+
+    # step 3
+    X_train, y_train, y_train_price = get_regression_output(X_train, y_train, y_train_price, routes)
+    X_test, y_test, y_test_price = get_regression_output(X_test, y_test, y_test_price, routes)
+    regInput = [("X_train", X_train), ("y_train", y_train), ("y_train_price", y_train_price),
+                ("X_test", X_test), ("y_test", y_test), ("y_test_price", y_test_price)]
+
+    save_inputs('inputSpecificRaw', rawInput)
+    save_inputs('../Classification/inputClf_small', clfInput)
+    save_inputs('../Regression/inputReg_small', regInput)
 
+"""
+# step 1~3 in memory - for general
+"""
+def run_pipeline_for_General(dataset="General", routes=routes_general, currency=currency_general, processes=1):
     """
-    # define the variables needed to be changed
+    Run step 1~3 in memory, see run_pipeline_for_Specific
+    :return: NA
+    example: run_pipeline_for_General()
     """
-    dim = 18
-    idx_departureDate = 12
-    idx_minimumPrice = 14
-    idx_output = 16
-    idx_currentPrice = 17
-
-    # Construct train data
-    X_tmp = np.empty(shape=(0, dim))
-    for flightNum in range(len(routes)):
-
-        # choose one route datas
-        X_flightNum = X_train[np.where(X_train[:, flightNum]==1)[0], :]
-
-        # group by the feature: departure date
-        departureDates_train = np.unique(X_flightNum[:, idx_departureDate])
-
-        # get the final datas, the observed data state should be from large to small(i.e. for time series)
-        for departureDate in departureDates_train:
-            indexs = np.where(X_flightNum[:, idx_departureDate]==departureDate)[0]
-            datas = X_flightNum[indexs, :]
-            minPrice = min(datas[:, idx_minimumPrice]) # get the minimum price for the output
-            datas[:, idx_output] = minPrice
-            """
-            print departureDate
-            print minPrice
-            print datas
-            """
-            X_tmp = np.concatenate((X_tmp, datas), axis=0)
-
-    X_train = X_tmp[:, 0:idx_output]
-    y_train = X_tmp[:, idx_output]
-    y_train_price = X_tmp[:, idx_currentPrice]
-    y_train = y_train.reshape((y_train.shape[0], 1))
-    y_train_price = y_train_price.reshape((y_train_price.shape[0], 1))
+    # step 1
+    X_train, y_train, y_train_price, tmp = get_classification_input_for_General(dataset, routes, processes)
+    rawInput = [("X_train", X_train), ("y_train", y_train), ("y_train_price", y_train_price), ("tmp", tmp)]
 
-    # regression has one more feature than classification
-    X_train = np.concatenate((X_train, y_train_price), axis=1)
-    np.save('../Regression/inputGeneralReg_small/X_train', X_train)
-    np.save('../Regression/inputGeneralReg_small/y_train', y_train)
-    np.save('../Regression/inputGeneralReg_small/y_train_price', y_train_price)
+    # step 2
+    X_train, y_train, y_train_price = normalize_price(X_train, y_train, y_train_price, routes, currency)
+    clfInput = [("X_train", X_train), ("y_train", y_train), ("y_train_price", y_train_price)]
+
+    # step 3
+    X_train, y_train, y_train_price = get_regression_output(X_train, y_train, y_train_price, routes)
+    regInput = [("X_train", X_train), ("y_train", y_train), ("y_train_price", y_train_price)]
+
+    save_inputs('inputGeneralRaw', rawInput)
+    save_inputs('../Classification/inputGeneralClf_small', clfInput)
+    save_inputs('../Regression/inputGeneralReg_small', regInput)
 
 """
 # step 4. visualize for classification - for specific
@@ -875,13 +1752,13 @@ def visualizeData_for_SpecificClassification(filePrefix, isTrain=True, routes=ro
     example: visualizeData_for_SpecificClassification(routes_specific[1], routes_specific)
     """
     if isTrain:
-        X_train = np.load('../Classification/inputClf_small/X_train.npy')
-        y_train = np.load('../Classification/inputClf_small/y_train.npy')
-        y_train_price = np.load('../Classification/inputClf_small/y_train_price.npy')
+        X_train = load_array('../Classification/inputClf_small/X_train')
+        y_train = load_array('../Classification/inputClf_small/y_train')
+        y_train_price = load_array('../Classification/inputClf_small/y_train_price')
     else:
-        X_train = np.load('../Classification/inputClf_small/X_test.npy')
-        y_train = np.load('../Classification/inputClf_small/y_test.npy')
-        y_train_price = np.load('../Classification/inputClf_small/y_test_price.npy')
+        X_train = load_array('../Classification/inputClf_small/X_test')
+        y_train = load_array('../Classification/inputClf_small/y_test')
+        y_train_price = load_array('../Classification/inputClf_small/y_test_price')
 
     # route index
     flightNum = routes.index(filePrefix)
@@ -903,7 +1780,8 @@ def visualizeData_for_SpecificClassification(filePrefix, isTrain=True, routes=ro
     # feature 0: departure date;  feature 1: observed date state
     # feature 2: minimum price; feature 3: maximum price
     # feature 4: prediction(buy or wait); feature 5:price
-    X_train = X_train[:, 8:14]
+    evalSchema = feature_schema.get_evaluation_schema(feature_schema.get_classification_schema(routes))
+    X_train = X_train[:, evalSchema.index("departureDate"):len(evalSchema)]
 
     # group by the feature: departure date
     departureDates_train = np.unique(X_train[:, 0])
@@ -927,9 +1805,9 @@ def visualizeTrainData_for_GeneralClassification(filePrefix, routes):
     :return: NA
     example: visualizeTrainData_for_General(routes_general[1], routes_general)
     """
-    X_train = np.load('../Classification/inputGeneralClf_small/X_train.npy')
-    y_train = np.load('../Classification/inputGeneralClf_small/y_train.npy')
-    y_train_price = np.load('../Classification/inputGeneralClf_small/y_train_price.npy')
+    X_train = load_array('../Classification/inputGeneralClf_small/X_train')
+    y_train = load_array('../Classification/inputGeneralClf_small/y_train')
+    y_train_price = load_array('../Classification/inputGeneralClf_small/y_train_price')
 
 
     # route index
@@ -953,7 +1831,8 @@ def visualizeTrainData_for_GeneralClassification(filePrefix, routes):
     # feature 0: departure date;  feature 1: observed date state
     # feature 2: minimum price; feature 3: maximum price
     # feature 4: prediction(buy or wait); feature 5:price
-    X_train = X_train[:, 12:18]
+    evalSchema = feature_schema.get_evaluation_schema(feature_schema.get_classification_schema(routes))
+    X_train = X_train[:, evalSchema.index("departureDate"):len(evalSchema)]
 
     # group by the feature: departure date
     departureDates_train = np.unique(X_train[:, 0])
@@ -977,15 +1856,16 @@ def visualizeTrainData_for_GeneralRegression(filePrefix, routes):
     :return: NA
     example: visualizeTrainData_for_General(routes_general[1], routes_general)
     """
-    X_train = np.load('../Regression/inputGeneralReg_small/X_train.npy')
-    y_train = np.load('../Regression/inputGeneralReg_small/y_train.npy')
-    y_train_price = np.load('../Regression/inputGeneralReg_small/y_train_price.npy')
+    X_train = load_array('../Regression/inputGeneralReg_small/X_train')
+    y_train = load_array('../Regression/inputGeneralReg_small/y_train')
+    y_train_price = load_array('../Regression/inputGeneralReg_small/y_train_price')
 
     """
     define the variables to be changed
     """
-    dim = 19
-    idx_departureDate = 12
+    evalSchema = feature_schema.get_evaluation_schema(feature_schema.get_regression_schema(routes))
+    dim = len(evalSchema)
+    idx_departureDate = evalSchema.index("departureDate")
 
 
     # route index
@@ -1010,7 +1890,7 @@ def visualizeTrainData_for_GeneralRegression(filePrefix, routes):
     # feature 2: minimum price by now; feature 3: maximum price by now
     # feature 4: current price;
     # feature 5: minimum price; feature 6: current price
-    X_train = X_train[:, 12:dim]
+    X_train = X_train[:, idx_departureDate:dim]
 
     # group by the feature: departure date
     departureDates_train = np.unique(X_train[:, 0])
@@ -1034,13 +1914,13 @@ def visualizeTrainData_for_SpecificRegression(filePrefix, routes):
     :return: NA
     example: visualizeTrainData_for_SpecificRegression(routes_general[1], routes_general)
     """
-    X_train = np.load('../Regression/inputReg_small/X_train.npy')
-    y_train = np.load('../Regression/inputReg_small/y_train.npy')
-    y_train_price = np.load('../Regression/inputReg_small/y_train_price.npy')
+    X_train = load_array('../Regression/inputReg_small/X_train')
+    y_train = load_array('../Regression/inputReg_small/y_train')
+    y_train_price = load_array('../Regression/inputReg_small/y_train_price')
 
-    X_train2 = np.load('../Regression/inputReg_small/X_test.npy')
-    y_train2 = np.load('../Regression/inputReg_small/y_test.npy')
-    y_train2_price = np.load('../Regression/inputReg_small/y_test_price.npy')
+    X_train2 = load_array('../Regression/inputReg_small/X_test')
+    y_train2 = load_array('../Regression/inputReg_small/y_test')
+    y_train2_price = load_array('../Regression/inputReg_small/y_test_price')
 
     X_train = np.concatenate((X_train, X_train2), axis=0)
     y_train = np.concatenate((y_train, y_train2), axis=0)
@@ -1049,8 +1929,9 @@ def visualizeTrainData_for_SpecificRegression(filePrefix, routes):
     """
     define the variables to be changed
     """
-    dim = 15
-    idx_departureDate = 8
+    evalSchema = feature_schema.get_evaluation_schema(feature_schema.get_regression_schema(routes))
+    dim = len(evalSchema)
+    idx_departureDate = evalSchema.index("departureDate")
 
 
     # route index
@@ -1099,22 +1980,11 @@ if __name__ == "__main__":
     #visualizeTrainData_for_SpecificRegression(routes_specific[1], routes_specific)
 
     """
-    STEP 1: load raw data
-    """
-    load_for_classification_for_Specific()
-    load_for_classification_for_General()
-
-    """
-    STEP 2: get the data for the classification problem
-    """
-    priceNormalize_for_Specific()
-    priceNormalize_for_General()
-
-    """
-    STEP 3: get the data for the regression problem
+    STEP 1~3: load raw data, get the data for the classification problem and for the regression problem,
+    step by step: load_for_classification_for_*, priceNormalize_for_*, getRegressionOutput_for_*
     """
-    getRegressionOutput_for_SpecificTrain()
-    getRegressionOutput_for_SpecificTest()
+    run_pipeline_for_Specific()
+    run_pipeline_for_General()
 
     """
     STEP 4: visualize the data set for classification problem
@@ -1126,7 +1996,7 @@ if __name__ == "__main__":
     """
     STEP 5: visualize the data set, but you can do this step at the classification object
     """
-    visualizeTrainData_for_SpecificRegression(routes_general[1], routes_general)
+    visualizeTrainData_for_SpecificRegression(routes_specific[1], routes_specific)
 
 
 
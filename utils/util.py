@@ -2,6 +2,8 @@
 from datetime import datetime
 import random
 import json
+import os
+import hashlib
 from numpy import *
 import math
 import numpy as np
@@ -9,6 +11,7 @@ import numpy as np
 
 # import user-library
 import load_data
+import feature_schema
 
 
 
@@ -23,6 +26,39 @@ routes_specific = ["BCN_BUD",  # route 1
           "SKP_MLH",  # route 7
           "SKP_MMX"]  # route 8
 
+# the baseline prices read the regression layout, i.e. the classification input with the current price
+specificSchema = feature_schema.get_regression_schema(routes_specific)
+
+# keep the day ordinal of every date string seen, the distinct dates are only a few hundreds
+dateOrdinals = {}
+
+def getDateOrdinal(date):
+    """
+    Get the day ordinal of the date, every distinct date is only parsed once
+    :param date: date string, e.g. "20151109"
+    :return: day ordinal
+    """
+    try:
+        return dateOrdinals[date]
+    except KeyError:
+        ordinal = datetime.strptime(date, "%Y%m%d").toordinal()
+        dateOrdinals[date] = ordinal
+        return ordinal
+
+def getDateOrdinals(dates):
+    """
+    Get the day ordinals of a column of date strings, only the distinct dates are parsed
+    :param dates: date strings
+    :return: day ordinals as int32 array
+    """
+    dates = np.asarray(dates)
+    if dates.shape[0] == 0:
+        return np.empty(0, dtype=np.int32)
+    distinctDates, inverse = np.unique(dates, return_inverse=True)
+    ordinals = np.array([getDateOrdinal(date) for date in distinctDates], dtype=np.int32)
+
+    return ordinals[inverse]
+
 def days_between(d1, d2):
     """
     get the days interval between two dates
@@ -30,9 +66,7 @@ def days_between(d1, d2):
     :param d2: date2
     :return: days interval
     """
-    d1 = datetime.strptime(d1, "%Y%m%d")
-    d2 = datetime.strptime(d2, "%Y%m%d")
-    return abs((d2 - d1).days)
+    return abs(getDateOrdinal(d2) - getDateOrdinal(d1))
 
 
 def remove_duplicates(values):
@@ -51,15 +85,173 @@ def remove_duplicates(values):
             seen.add(value)
     return output
 
+def remove_duplicate_rows(matrix, isKeepOrder=False):
+    """
+    remove duplicate rows in a matrix, the rows are compared as numbers with one sort of the matrix
+    :param matrix: input 2-D array
+    :param isKeepOrder: True to keep the first one of the duplicate rows in the original order,
+        False to return the rows sorted by the columns(the first column is the primary key)
+    :return: no duplicate row matrix, the dtype and the columns are kept
+    """
+    matrix = np.asarray(matrix)
+    if matrix.shape[0] < 2:
+        return matrix.copy()
+
+    # lexsort is stable, so the first one of the duplicate rows comes first
+    order = np.lexsort(matrix.T[::-1])
+    sortedMatrix = matrix[order]
+    isFirst = np.ones(matrix.shape[0], dtype=bool)
+    isFirst[1:] = np.any(sortedMatrix[1:] != sortedMatrix[:-1], axis=1)
+
+    if isKeepOrder:
+        return matrix[np.sort(order[isFirst])]
+    return sortedMatrix[isFirst]
+
 def getPrice(price):
     """
     Get the numeric price in a string format, which contains currency symbol
     :param price:
     :return:
     """
+    if not isinstance(price, basestring):
+        # already parsed, e.g. the entries from load_data.get_records
+        return float(price)
     price = float( filter( lambda x: x in '0123456789.', price) )
     return price
 
+# the characters kept by getPrice, and the separators which are not part of the currency
+priceChars = np.array([ord(x) for x in '0123456789.'], dtype=np.uint32)
+separatorChars = np.array([0] + [ord(x) for x in u' ,\xa0'], dtype=np.uint32)
+
+def getPrices(prices):
+    """
+    Get the numeric prices of a column of price strings in one pass,
+    every price is the same as getPrice(price).
+    :param prices: price strings, which contain currency symbols, e.g. [u"45.99 \u20ac", u"12345 Ft"]
+    :return: (prices as float64 array, currency symbol of every price as unicode array)
+    """
+    prices = np.asarray(prices, dtype=np.unicode_)
+    if prices.shape[0] == 0:
+        return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.unicode_)
+
+    # one row of unicode code points per price, padded with 0
+    width = prices.dtype.itemsize // 4
+    chars = np.ascontiguousarray(prices).view(np.uint32).reshape((prices.shape[0], width))
+    rows = np.arange(chars.shape[0]).reshape((chars.shape[0], 1))
+
+    # move the kept characters to the front of every row(keep their order), and parse them all at once
+    isPrice = np.in1d(chars, priceChars).reshape(chars.shape)
+    order = np.argsort(~isPrice, axis=1, kind='mergesort')
+    numbers = np.where(isPrice, chars, 0)[rows, order].astype(np.uint8)
+    numbers = numbers.view('S%d' % width).reshape((chars.shape[0], ))
+    numbers = numbers.astype(np.float64)
+
+    # the rest, without the separators, is the currency
+    isCurrency = ~isPrice & ~np.in1d(chars, separatorChars).reshape(chars.shape)
+    order = np.argsort(~isCurrency, axis=1, kind='mergesort')
+    currencies = np.where(isCurrency, chars, 0)[rows, order]
+    currencies = np.ascontiguousarray(currencies).view('U%d' % width).reshape((chars.shape[0], ))
+
+    return numbers, currencies
+
+def simulateBuyPolicy(output, price, state, departureOffsets, latestBuyDate=11, routeDepartureOffsets=None):
+    """
+    Simulate the buy policy of evaluateOneRoute for every departure date at once:
+    buy the first entry predicted to be buy(the largest state) whose state is at least latestBuyDate,
+    if no entry is buy, buy the latest price, i.e. the last entry with the state latestBuyDate
+    of the departure date, or of the previous departure dates if the departure date has none.
+    :param output: prediction of every row, 1 for buy,
+        or a matrix with one row of predictions per grid point(e.g. per price tolerance)
+    :param price: price of every row
+    :param state: observed date state of every row
+    :param departureOffsets: the rows of departure date g are departureOffsets[g]:departureOffsets[g+1],
+        sorted by state(stable), the departure dates are increasing, see load_data.get_segment_index
+    :param latestBuyDate: the latest buy date state
+    :param routeDepartureOffsets: the departure dates of route i are routeDepartureOffsets[i]:routeDepartureOffsets[i+1],
+        to simulate several routes at once, None for one route
+    :return: chosen price of every departure date, nan if there is no entry to buy,
+        a (grid points x departure dates) matrix for a matrix of predictions
+    """
+    price = np.asarray(price, dtype=np.float64).reshape(-1)
+    state = np.asarray(state).reshape(-1)
+    output = np.asarray(output)
+    if output.shape[-1] != price.shape[0]:
+        # a column of predictions
+        output = output.reshape(-1)
+    departureOffsets = np.asarray(departureOffsets)
+    if len(departureOffsets) < 2:
+        return np.empty(output.shape[:-1] + (0, ), dtype=np.float64)
+    rowIndexs = np.arange(price.shape[0])
+
+    # the rows of a departure date are sorted by state, the last buy row has the largest state,
+    # and it is the last one of the table order among the rows with that state
+    isBuy = (output == 1) & (state >= latestBuyDate)
+    lastBuy = np.maximum.reduceat(np.where(isBuy, rowIndexs, -1), departureOffsets[:-1], axis=-1)
+
+    # the latest price is kept from the previous departure dates, the row indexs are increasing
+    isLatest = state == latestBuyDate
+    lastLatest = np.maximum.reduceat(np.where(isLatest, rowIndexs, -1), departureOffsets[:-1])
+    lastLatest = np.maximum.accumulate(lastLatest)
+    if routeDepartureOffsets is not None:
+        # the latest price is not kept from the departure dates of the previous route
+        routeDepartureOffsets = np.asarray(routeDepartureOffsets)
+        routeIds = np.repeat(np.arange(len(routeDepartureOffsets)-1), np.diff(routeDepartureOffsets))
+        routeFirstRows = departureOffsets[routeDepartureOffsets[:-1]]
+        lastLatest[lastLatest < routeFirstRows[routeIds]] = -1
+
+    chosen = np.where(lastBuy >= 0, lastBuy, lastLatest)
+    chosenPrices = np.where(chosen >= 0, price[chosen], np.nan)
+
+    return chosenPrices
+
+def getRouteAvgPrices(chosenPrices, routeDepartureOffsets):
+    """
+    Get the average chosen price of every route
+    :param chosenPrices: chosen price of every departure date, or a matrix with one row per grid point,
+        see simulateBuyPolicy
+    :param routeDepartureOffsets: the departure dates of route i are routeDepartureOffsets[i]:routeDepartureOffsets[i+1]
+    :return: average price of every route, the last axis is the route
+    """
+    chosenPrices = np.asarray(chosenPrices)
+    avgPrices = np.empty(chosenPrices.shape[:-1] + (len(routeDepartureOffsets)-1, ))
+    for i in range(len(routeDepartureOffsets)-1):
+        first, last = routeDepartureOffsets[i], routeDepartureOffsets[i+1]
+        avgPrices[..., i] = np.sum(chosenPrices[..., first:last], axis=-1) * 1.0 / (last - first)
+    return avgPrices
+
+# the model evaluated by evaluateSeeds, the forked worker processes inherit it,
+# and share its memory-mapped inputs read-only
+seedModel = None
+
+def evaluateSeed(args):
+    """
+    Fit the model of evaluateSeeds with one seed, and evaluate all the routes
+    :param args: (seed, keyword arguments of seedModel.getRouteAvgPrices)
+    :return: average price of every route
+    """
+    seed, evaluateArgs = args
+    np.random.seed(seed) # do not forget to set seed for the weight initialization
+    seedModel.training()
+    seedModel.predict()
+    return seedModel.getRouteAvgPrices(**evaluateArgs)
+
+def evaluateSeeds(model, seeds, processes=1, **evaluateArgs):
+    """
+    Fit and evaluate a model once per seed, the seeds run in worker processes
+    :param model: model with training, predict and getRouteAvgPrices, e.g. ClassificationNN
+    :param seeds: seed of every run
+    :param processes: number of worker processes, 1 to run the seeds in this process
+    :param evaluateArgs: keyword arguments of model.getRouteAvgPrices, e.g. priceTolerance
+    :return: average price of every (seed, route), as a seeds x routes array
+    """
+    global seedModel
+    seedModel = model
+    try:
+        jobs = [(seed, evaluateArgs) for seed in seeds]
+        return np.array(load_data.map_jobs(evaluateSeed, jobs, processes))
+    finally:
+        seedModel = None
+
 def pickRandomTicket(filePrefix="BCN_BUD", dataset="large data set"):
     """
     pick 50 tickets randomly for one route
@@ -94,18 +286,18 @@ def getRandomTicketPriceForAllRoutes():
 
 
 def pickRandomTicketByNumpy(flightNum):
-    evalMatrix = np.load('inputReg/X_test.npy')
+    evalMatrix = np.load('inputReg/X_test.npy', mmap_mode='r')
     # take the departure date 20 days after the first observed date
-    evalMatrix = evalMatrix[np.where(evalMatrix[:, 8]>20)[0], :]
-    # take one route
-    evalMatrix = evalMatrix[np.where(evalMatrix[:, flightNum]==1)[0], :]
+    evalMatrix = evalMatrix[np.where(evalMatrix[:, specificSchema.index("departureDate")]>20)[0], :]
+    # take one route, grouped by departure date in the table order
+    segmentIndex = load_data.get_input_segment_index(evalMatrix, specificSchema, isState=False)
+    rows, departureDates, departureOffsets = load_data.get_route_segments(segmentIndex, flightNum)
+    prices = evalMatrix[rows, specificSchema.index("price")]
 
     totalPrice = 0;
     len = 0;
-    departureDates = np.unique(evalMatrix[:, 8])
-    for departureDate in departureDates:
-        tmpMatrix = evalMatrix[np.where(evalMatrix[:, 8]==departureDate)[0], :]
-        tmpMatrix = tmpMatrix[:, 12]
+    for departureIndex in range(departureDates.shape[0]):
+        tmpMatrix = prices[departureOffsets[departureIndex]:departureOffsets[departureIndex+1]]
         if tmpMatrix.shape[0] > 30:
             np.random.shuffle(tmpMatrix)
             tmpMatrix = tmpMatrix.reshape((tmpMatrix.shape[0], 1))
@@ -130,18 +322,18 @@ def getRandomTicketPriceForAllRoutesByNumpy():
 
 
 def pickMinTicketByNumpy(flightNum):
-    evalMatrix = np.load('inputReg/X_train.npy')
+    evalMatrix = np.load('inputReg/X_train.npy', mmap_mode='r')
     # take the departure date 20 days after the first observed date
-    evalMatrix = evalMatrix[np.where(evalMatrix[:, 8]>20)[0], :]
-    # take one route
-    evalMatrix = evalMatrix[np.where(evalMatrix[:, flightNum]==1)[0], :]
+    evalMatrix = evalMatrix[np.where(evalMatrix[:, specificSchema.index("departureDate")]>20)[0], :]
+    # take one route, grouped by departure date
+    segmentIndex = load_data.get_input_segment_index(evalMatrix, specificSchema, isState=False)
+    rows, departureDates, departureOffsets = load_data.get_route_segments(segmentIndex, flightNum)
+    prices = evalMatrix[rows, specificSchema.index("price")]
 
     totalPrice = 0;
     len = 0;
-    departureDates = np.unique(evalMatrix[:, 8])
-    for departureDate in departureDates:
-        tmpMatrix = evalMatrix[np.where(evalMatrix[:, 8]==departureDate)[0], :]
-        tmpMatrix = tmpMatrix[:, 12]
+    for departureIndex in range(departureDates.shape[0]):
+        tmpMatrix = prices[departureOffsets[departureIndex]:departureOffsets[departureIndex+1]]
         tmpMatrix = tmpMatrix.reshape((tmpMatrix.shape[0], 1))
         totalPrice += tmpMatrix.max()
 
@@ -160,355 +352,181 @@ def getMinTicketPriceForAllRoutesByNumpy():
 
 
 """
-Get the random price for the general routes
+Baseline prices of every route: the minimum, maximum and randomly picked prices
 """
-def getRandomPriceForGeneral():
-    randomPrices = []
-    for flightNum in range(12):
-        # feature 0~11: flight number dummy variables
-        # feature 12: departure date; feature 13: observed date state;
-        # feature 14: minimum price; feature 15: maximum price
-        # fearure 16: current price;
-        evalMatrix = np.load('inputGeneralReg/X_train.npy')
-
-        # take the departure date 20 days after the first observed date
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, 12]>20)[0], :]
-        # take one route
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, flightNum]==1)[0], :]
-
-        totalPrice = 0;
-        len = 0;
-        departureDates = np.unique(evalMatrix[:, 12])
-        for departureDate in departureDates:
-            tmpMatrix = evalMatrix[np.where(evalMatrix[:, 12]==departureDate)[0], :]
-            tmpMatrix = tmpMatrix[:, 16]
-            if tmpMatrix.shape[0] > 30:
-                np.random.shuffle(tmpMatrix)
-                tmpMatrix = tmpMatrix.reshape((tmpMatrix.shape[0], 1))
-                totalPrice += np.sum(tmpMatrix[0:30, :])
-                len += 30
-            else:
-                totalPrice += np.sum(tmpMatrix)
-                len += tmpMatrix.shape[0]
-
-        avgPrice = totalPrice * 1.0 / len
-        randomPrices.append(avgPrice)
-    print randomPrices
+# change it when the baseline prices change
+baselineVersion = 1
 
-"""
-Get the minimum price for the specific routes
-"""
-def getMinPriceForSpecific_train():
+# number of tickets randomly picked from every departure date, for the train and test datasets
+baselineRandomLens = {"train": 30, "test": 60}
+
+def getBaselinePrices(X, price, schema, randomLen=30):
     """
-    Get the minimum price for the general routes
-    :return:
+    Get the baseline prices of every route in one pass, only the departure dates 20 days after the first
+    observed date are used. For every route:
+    minimum/maximum price: the minimum/maximum price of every departure date, averaged over the departure dates;
+    random price: the average price of randomLen tickets randomly picked from every departure date(all of them
+        if it has fewer), it is the expectation of the random picks, so it does not depend on a seed.
+    :param X: input of the schema, or a matrix which starts with the columns of the schema, it can be memory-mapped
+    :param price: current price of every row
+    :param schema: feature_schema.FeatureSchema of the input
+    :param randomLen: number of tickets randomly picked from every departure date
+    :return: dict of lists "minPrices", "maxPrices", "randomPrices", one price per route,
+        nan for a route without departure dates
     """
-    #print "TRAIN"
-    minPrices = []
-    for flightNum in range(8):
-        # feature 0~7: flight number dummy variables
-        # feature 8: departure date; feature 9: observed date state;
-        # feature 10: minimum price; feature 11: maximum price
-        # fearure 12: current price;
-        evalMatrix = np.load('inputSpecificClf2/X_train.npy')
-        y_train_price = np.load('inputSpecificClf2/y_train_price.npy')
-        evalMatrix = np.concatenate((evalMatrix, y_train_price), axis=1)
-
-        # take the departure date 20 days after the first observed date
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, 8]>20)[0], :]
-        # take one route
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, flightNum]==1)[0], :]
-
-        totalPrice = 0;
-        departureDates = np.unique(evalMatrix[:, 8])
-        for departureDate in departureDates:
-            tmpMatrix = evalMatrix[np.where(evalMatrix[:, 8]==departureDate)[0], :]
-            tmpMatrix = tmpMatrix[:, 12]
-            tmpMatrix = tmpMatrix.reshape((tmpMatrix.shape[0], 1))
-            totalPrice += tmpMatrix.min()
-
-        avgPrice = totalPrice * 1.0 / departureDates.shape[0]
-        minPrices.append(avgPrice)
-    return minPrices
+    routeLen = len(schema.routes)
+    price = np.asarray(price, dtype=np.float64).reshape(-1)
+    departure = X[:, schema.index("departureDate")]
+
+    # the rows of the departure dates left out have no route, so they are not in the segment index
+    routeIds = load_data.get_route_ids(X, routeLen)
+    routeIds[departure <= 20] = routeLen
+    rows, departureOffsets, departureDates, routeDepartureOffsets = \
+        load_data.get_segment_index(routeIds, departure, None, routeLen)
+    if len(rows) == 0:
+        nanPrices = [np.nan] * routeLen
+        return {"minPrices": nanPrices, "maxPrices": list(nanPrices), "randomPrices": list(nanPrices)}
+    prices = price[rows]
+    starts = departureOffsets[:-1]
+    departureLens = np.diff(departureOffsets)
+
+    # the random picks of a departure date sum to randomCount times its average price on expectation
+    randomCounts = np.minimum(departureLens, randomLen)
+    randomSums = np.add.reduceat(prices, starts) * randomCounts / departureLens
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        minPrices = getRouteAvgPrices(np.minimum.reduceat(prices, starts), routeDepartureOffsets)
+        maxPrices = getRouteAvgPrices(np.maximum.reduceat(prices, starts), routeDepartureOffsets)
+        randomPrices = getRouteAvgPrices(randomSums, routeDepartureOffsets) / \
+                       getRouteAvgPrices(randomCounts, routeDepartureOffsets)
+
+    return {"minPrices": minPrices.tolist(), "maxPrices": maxPrices.tolist(), "randomPrices": randomPrices.tolist()}
+
+def getBaselineCachePath(filePath):
+    """
+    The baseline prices of an input are kept in baselines.json next to it
+    :param filePath: absolute path of the .npy file of the input
+    """
+    return os.path.join(os.path.dirname(filePath), "baselines.json")
 
-def getMinPriceForSpecific_test():
+def loadBaselinePrices(filePath, schema, priceFilePath=None, randomLen=30):
     """
-    Get the minimum price for the general routes
-    :return:
+    Get the baseline prices of a saved input, see getBaselinePrices. They are kept in baselines.json
+    next to the input with the checksums of the files they are computed from, and they are only computed
+    again when a file changes. The checksum of a file is only computed again when its size or mtime changed.
+    :param filePath: .npy file of the input, relative to the utils directory, see load_data.get_input_path
+    :param schema: feature_schema.FeatureSchema of the input
+    :param priceFilePath: .npy file of the current prices(relative to the utils directory),
+        None to use the "price" feature of the input
+    :param randomLen: number of tickets randomly picked from every departure date
+    :return: dict of lists "minPrices", "maxPrices", "randomPrices", one price per route
     """
-    #print "TEST:"
-    minPrices = []
-    for flightNum in range(8):
-        # feature 0~7: flight number dummy variables
-        # feature 8: departure date; feature 9: observed date state;
-        # feature 10: minimum price; feature 11: maximum price
-        # fearure 12: current price;
-        evalMatrix = np.load('inputSpecificClf2/X_test.npy')
-        y_train_price = np.load('inputSpecificClf2/y_test_price.npy')
-        evalMatrix = np.concatenate((evalMatrix, y_train_price), axis=1)
-
-        # take the departure date 20 days after the first observed date
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, 8]>20)[0], :]
-        # take one route
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, flightNum]==1)[0], :]
-
-        totalPrice = 0;
-        departureDates = np.unique(evalMatrix[:, 8])
-        for departureDate in departureDates:
-            tmpMatrix = evalMatrix[np.where(evalMatrix[:, 8]==departureDate)[0], :]
-            tmpMatrix = tmpMatrix[:, 12]
-            tmpMatrix = tmpMatrix.reshape((tmpMatrix.shape[0], 1))
-            totalPrice += tmpMatrix.min()
+    filePath = load_data.get_input_path(filePath)
+    if priceFilePath is not None:
+        priceFilePath = load_data.get_input_path(priceFilePath)
+    cachePath = getBaselineCachePath(filePath)
+    cacheDir = os.path.dirname(cachePath)
+    meta = {"version": baselineVersion, "files": {}, "baselines": {}}
+    if os.path.exists(cachePath):
+        with open(cachePath, 'r') as fp:
+            previousMeta = json.load(fp)
+        if previousMeta.get("version") == baselineVersion:
+            meta = previousMeta
+
+    # checksum of every source file, relative to the cache directory
+    sources = []
+    for sourcePath in [filePath] if priceFilePath is None else [filePath, priceFilePath]:
+        relativePath = os.path.relpath(sourcePath, cacheDir)
+        fileStat = os.stat(sourcePath)
+        previousEntry = meta["files"].get(relativePath)
+        if previousEntry is not None and previousEntry[0:2] == [fileStat.st_size, fileStat.st_mtime]:
+            checksum = previousEntry[2]
+        else:
+            checksum = load_data.get_file_checksum(sourcePath)
+            meta["files"][relativePath] = [fileStat.st_size, fileStat.st_mtime, checksum]
+        sources.append([relativePath, checksum])
+
+    key = json.dumps([sources, schema.routes, schema.index("departureDate"), randomLen])
+    key = hashlib.md5(key).hexdigest()
+    if key in meta["baselines"]:
+        return meta["baselines"][key]["prices"]
+
+    X = np.load(filePath, mmap_mode='r')
+    if priceFilePath is None:
+        price = X[:, schema.index("price")]
+    else:
+        price = np.load(priceFilePath, mmap_mode='r')
+    baselinePrices = getBaselinePrices(X, price, schema, randomLen)
+
+    # the baselines of the files which changed since are dropped
+    meta["baselines"] = dict((previousKey, baseline) for previousKey, baseline in meta["baselines"].items()
+                             if [meta["files"][path][2] for path, checksum in baseline["sources"]] ==
+                             [checksum for path, checksum in baseline["sources"]])
+    meta["baselines"][key] = {"sources": sources, "prices": baselinePrices}
+    with open(cachePath + ".tmp", 'w') as fp:
+        json.dump(meta, fp)
+    os.rename(cachePath + ".tmp", cachePath)
+
+    return baselinePrices
+
+def baselineProperty(kind, split):
+    """
+    A property of the baseline prices of a model, e.g. baselineProperty("minPrices", "train") for minPrices_train,
+    they are computed by instance.getBaselinePrices(split) when they are first used
+    """
+    return property(lambda self: self.getBaselinePrices(split)[kind])
 
-        avgPrice = totalPrice * 1.0 / departureDates.shape[0]
-        minPrices.append(avgPrice)
-    return minPrices
+def getSpecificBaselinePrices(split):
+    """
+    Get the baseline prices of the specific routes, from the classification input of the split("train" or "test")
+    """
+    schema = feature_schema.get_classification_schema(routes_specific)
+    return loadBaselinePrices('../Classification/inputClf_small/X_{}.npy'.format(split), schema,
+                              '../Classification/inputClf_small/y_{}_price.npy'.format(split), baselineRandomLens[split])
 
-def getMinPriceForGeneral():
+def getGeneralBaselinePrices():
     """
-    Get the minimum price for the general routes
-    :return:
+    Get the baseline prices of the general routes, from the classification input
     """
-    #print "TEST:"
-    minPrices = []
-    for flightNum in range(12):
-        # feature 0~11: flight number dummy variables
-        # feature 12: departure date; feature 3: observed date state;
-        # feature 14: minimum price; feature 15: maximum price
-        # fearure 16: current price;
-        evalMatrix = np.load('inputGeneralClf_small/X_train.npy')
-        y_train_price = np.load('inputGeneralClf_small/y_train_price.npy')
-        evalMatrix = np.concatenate((evalMatrix, y_train_price), axis=1)
-
-        # take the departure date 20 days after the first observed date
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, 12]>20)[0], :]
-        # take one route
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, flightNum]==1)[0], :]
-
-        totalPrice = 0;
-        departureDates = np.unique(evalMatrix[:, 12])
-        for departureDate in departureDates:
-            tmpMatrix = evalMatrix[np.where(evalMatrix[:, 12]==departureDate)[0], :]
-            tmpMatrix = tmpMatrix[:, 16]
-            tmpMatrix = tmpMatrix.reshape((tmpMatrix.shape[0], 1))
-            totalPrice += tmpMatrix.min()
+    schema = feature_schema.get_classification_schema(load_data.routes_general)
+    return loadBaselinePrices('../Classification/inputGeneralClf_small/X_train.npy', schema,
+                              '../Classification/inputGeneralClf_small/y_train_price.npy', baselineRandomLens["train"])
 
-        avgPrice = totalPrice * 1.0 / departureDates.shape[0]
-        minPrices.append(avgPrice)
-    return minPrices
+"""
+Get the minimum price for the specific routes
+"""
+def getMinPriceForSpecific_train():
+    return getSpecificBaselinePrices("train")["minPrices"]
+
+def getMinPriceForSpecific_test():
+    return getSpecificBaselinePrices("test")["minPrices"]
+
+def getMinPriceForGeneral():
+    return getGeneralBaselinePrices()["minPrices"]
 
 """
 Get the maximum price for the specific routes
 """
 def getMaxPriceForSpecific_train():
-    """
-    Get the minimum price for the general routes
-    :return:
-    """
-    #print "TRAIN"
-    maxPrices = []
-    for flightNum in range(8):
-        # feature 0~7: flight number dummy variables
-        # feature 8: departure date; feature 9: observed date state;
-        # feature 10: minimum price; feature 11: maximum price
-        # fearure 12: current price;
-        evalMatrix = np.load('inputSpecificClf2/X_train.npy')
-        y_train_price = np.load('inputSpecificClf2/y_train_price.npy')
-        evalMatrix = np.concatenate((evalMatrix, y_train_price), axis=1)
-
-        # take the departure date 20 days after the first observed date
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, 8]>20)[0], :]
-        # take one route
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, flightNum]==1)[0], :]
-
-        totalPrice = 0;
-        departureDates = np.unique(evalMatrix[:, 8])
-        for departureDate in departureDates:
-            tmpMatrix = evalMatrix[np.where(evalMatrix[:, 8]==departureDate)[0], :]
-            tmpMatrix = tmpMatrix[:, 12]
-            tmpMatrix = tmpMatrix.reshape((tmpMatrix.shape[0], 1))
-            totalPrice += tmpMatrix.max()
-
-        avgPrice = totalPrice * 1.0 / departureDates.shape[0]
-        maxPrices.append(avgPrice)
-    return maxPrices
+    return getSpecificBaselinePrices("train")["maxPrices"]
 
 def getMaxPriceForSpecific_test():
-    """
-    Get the minimum price for the general routes
-    :return:
-    """
-    #print "TEST"
-    maxPrices = []
-    for flightNum in range(8):
-        # feature 0~7: flight number dummy variables
-        # feature 8: departure date; feature 9: observed date state;
-        # feature 10: minimum price; feature 11: maximum price
-        # fearure 12: current price;
-        evalMatrix = np.load('inputSpecificClf2/X_test.npy')
-        y_train_price = np.load('inputSpecificClf2/y_test_price.npy')
-        evalMatrix = np.concatenate((evalMatrix, y_train_price), axis=1)
-
-        # take the departure date 20 days after the first observed date
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, 8]>20)[0], :]
-        # take one route
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, flightNum]==1)[0], :]
-
-        totalPrice = 0;
-        departureDates = np.unique(evalMatrix[:, 8])
-        for departureDate in departureDates:
-            tmpMatrix = evalMatrix[np.where(evalMatrix[:, 8]==departureDate)[0], :]
-            tmpMatrix = tmpMatrix[:, 12]
-            tmpMatrix = tmpMatrix.reshape((tmpMatrix.shape[0], 1))
-            totalPrice += tmpMatrix.max()
-
-        avgPrice = totalPrice * 1.0 / departureDates.shape[0]
-        maxPrices.append(avgPrice)
-    return maxPrices
+    return getSpecificBaselinePrices("test")["maxPrices"]
 
 def getMaxPriceForGeneral():
-    """
-    Get the minimum price for the general routes
-    :return:
-    """
-    #print "TEST:"
-    maxPrices = []
-    for flightNum in range(12):
-        # feature 0~11: flight number dummy variables
-        # feature 12: departure date; feature 3: observed date state;
-        # feature 14: minimum price; feature 15: maximum price
-        # fearure 16: current price;
-        evalMatrix = np.load('inputGeneralClf_small/X_train.npy')
-        y_train_price = np.load('inputGeneralClf_small/y_train_price.npy')
-        evalMatrix = np.concatenate((evalMatrix, y_train_price), axis=1)
-
-        # take the departure date 20 days after the first observed date
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, 12]>20)[0], :]
-        # take one route
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, flightNum]==1)[0], :]
-
-        totalPrice = 0;
-        departureDates = np.unique(evalMatrix[:, 12])
-        for departureDate in departureDates:
-            tmpMatrix = evalMatrix[np.where(evalMatrix[:, 12]==departureDate)[0], :]
-            tmpMatrix = tmpMatrix[:, 16]
-            tmpMatrix = tmpMatrix.reshape((tmpMatrix.shape[0], 1))
-            totalPrice += tmpMatrix.max()
-
-        avgPrice = totalPrice * 1.0 / departureDates.shape[0]
-        maxPrices.append(avgPrice)
-    return maxPrices
+    return getGeneralBaselinePrices()["maxPrices"]
 
 """
 Get the random price for the specific routes
 """
 def getRandomPriceForSpecific_train():
-    #print "TRAIN"
-    randomPrices = []
-    for flightNum in range(8):
-        # feature 0~7: flight number dummy variables
-        # feature 8: departure date; feature 9: observed date state;
-        # feature 10: minimum price; feature 11: maximum price
-        # fearure 12: current price;
-        evalMatrix = np.load('inputSpecificClf2/X_train.npy')
-        y_train_price = np.load('inputSpecificClf2/y_train_price.npy')
-        evalMatrix = np.concatenate((evalMatrix, y_train_price), axis=1)
-
-        # take the departure date 20 days after the first observed date
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, 8]>20)[0], :]
-        # take one route
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, flightNum]==1)[0], :]
-
-        totalPrice = 0;
-        len = 0;
-        departureDates = np.unique(evalMatrix[:, 8])
-        for departureDate in departureDates:
-            tmpMatrix = evalMatrix[np.where(evalMatrix[:, 8]==departureDate)[0], :]
-            tmpMatrix = tmpMatrix[:, 12]
-            if tmpMatrix.shape[0] > 30:
-                np.random.shuffle(tmpMatrix)
-                tmpMatrix = tmpMatrix.reshape((tmpMatrix.shape[0], 1))
-                totalPrice += np.sum(tmpMatrix[0:30, :])
-                len += 30
-            else:
-                totalPrice += np.sum(tmpMatrix)
-                len += tmpMatrix.shape[0]
-        avgPrice = totalPrice * 1.0 / len
-        randomPrices.append(avgPrice)
-
-    return randomPrices
+    return getSpecificBaselinePrices("train")["randomPrices"]
 
 def getRandomPriceForSpecific_test():
-    #print "TEST"
-    randomPrices = []
-    for flightNum in range(8):
-        # feature 0~7: flight number dummy variables
-        # feature 8: departure date; feature 9: observed date state;
-        # feature 10: minimum price; feature 11: maximum price
-        # fearure 12: current price;
-        evalMatrix = np.load('inputSpecificClf2/X_test.npy')
-        y_train_price = np.load('inputSpecificClf2/y_test_price.npy')
-        evalMatrix = np.concatenate((evalMatrix, y_train_price), axis=1)
-
-        # take the departure date 20 days after the first observed date
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, 8]>20)[0], :]
-        # take one route
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, flightNum]==1)[0], :]
-
-        totalPrice = 0;
-        len = 0;
-        departureDates = np.unique(evalMatrix[:, 8])
-        for departureDate in departureDates:
-            tmpMatrix = evalMatrix[np.where(evalMatrix[:, 8]==departureDate)[0], :]
-            tmpMatrix = tmpMatrix[:, 12]
-            if tmpMatrix.shape[0] > 60:
-                np.random.shuffle(tmpMatrix)
-                tmpMatrix = tmpMatrix.reshape((tmpMatrix.shape[0], 1))
-                totalPrice += np.sum(tmpMatrix[0:60, :])
-                len += 60
-            else:
-                totalPrice += np.sum(tmpMatrix)
-                len += tmpMatrix.shape[0]
-        avgPrice = totalPrice * 1.0 / len
-        randomPrices.append(avgPrice)
-
-    return randomPrices
+    return getSpecificBaselinePrices("test")["randomPrices"]
 
 def getRandomPriceForGeneral():
-    #print "TEST"
-    randomPrices = []
-    for flightNum in range(12):
-        # feature 0~11: flight number dummy variables
-        # feature 12: departure date; feature 13: observed date state;
-        # feature 14: minimum price; feature 15: maximum price
-        # fearure 16: current price;
-        evalMatrix = np.load('inputGeneralClf_small/X_train.npy')
-        y_train_price = np.load('inputGeneralClf_small/y_train_price.npy')
-        evalMatrix = np.concatenate((evalMatrix, y_train_price), axis=1)
-
-        # take the departure date 20 days after the first observed date
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, 12]>20)[0], :]
-        # take one route
-        evalMatrix = evalMatrix[np.where(evalMatrix[:, flightNum]==1)[0], :]
-
-        totalPrice = 0;
-        len = 0;
-        departureDates = np.unique(evalMatrix[:, 12])
-        for departureDate in departureDates:
-            tmpMatrix = evalMatrix[np.where(evalMatrix[:, 12]==departureDate)[0], :]
-            tmpMatrix = tmpMatrix[:, 16]
-            if tmpMatrix.shape[0] > 30:
-                np.random.shuffle(tmpMatrix)
-                tmpMatrix = tmpMatrix.reshape((tmpMatrix.shape[0], 1))
-                totalPrice += np.sum(tmpMatrix[0:30, :])
-                len += 30
-            else:
-                totalPrice += np.sum(tmpMatrix)
-                len += tmpMatrix.shape[0]
-        avgPrice = totalPrice * 1.0 / len
-        randomPrices.append(avgPrice)
-
-    return randomPrices
+    return getGeneralBaselinePrices()["randomPrices"]
 
 
 